@@ -0,0 +1,124 @@
+"""
+Season analytics over every archived rally.
+
+A ``SeasonQuery`` names filters (teams, opponents, dates, rotations,
+jerseys, touch types, roster positions) and the keys to group by. Match
+and rotation filters are pushed down to the scan, as a pyarrow dataset
+filter over the Parquet archive or a SQL ``WHERE`` over the SQLite
+fallback, and only the columns the query needs are read: a question
+about serves never loads the rally touch columns. Touch-level filters
+then run on the unpacked int codes and ``stats.aggregate`` does the
+group-by.
+"""
+
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import archive
+from roster import RosterIndex
+from stats import STAT_COLUMNS, aggregate, touch_table
+from storage import Store
+from touches import TOUCH_COLUMNS, TouchType, type_label
+
+GROUP_KEYS = ["our_team", "opponent", "date", "match_id", "set", "rotation",
+              "jersey", "type"]
+ANALYTIC_COLUMNS = STAT_COLUMNS + ["kill_pct"]
+
+# Touch columns that can hold each touch type.
+_TYPE_COLUMNS = {
+    TouchType.SERVE: ["touch_serve"],
+    TouchType.BLOCK: ["touch_block", "touch_block_asst"],
+}
+_RALLY_TOUCHES = ["touch_1", "touch_2", "touch_3"]
+_TYPE_BY_LABEL = {type_label(t): t for t in TouchType}
+
+
+@dataclass
+class SeasonQuery:
+    teams: Sequence[str] = ()
+    opponents: Sequence[str] = ()
+    start: Optional[str] = None
+    end: Optional[str] = None
+    rotations: Sequence[int] = ()
+    jerseys: Sequence[int] = ()
+    touch_types: Sequence[str] = ()
+    positions: Sequence[str] = ()
+    group_by: Sequence[str] = ("jersey",)
+
+    def touch_columns(self) -> List[str]:
+        """The touch columns that can hold the requested touch types."""
+        if not self.touch_types:
+            return list(TOUCH_COLUMNS)
+        wanted = set()
+        for label in self.touch_types:
+            wanted.update(_TYPE_COLUMNS.get(_TYPE_BY_LABEL[label],
+                                            _RALLY_TOUCHES))
+        return [c for c in TOUCH_COLUMNS if c in wanted]
+
+    def row_keys(self) -> List[str]:
+        """Rally-level columns needed for grouping and filtering."""
+        keys = [k for k in self.group_by if k not in ("jersey", "type")]
+        if self.positions and "our_team" not in keys:
+            keys.append("our_team")
+        return keys
+
+    def filters(self) -> Dict[str, Sequence]:
+        filters = {"our_team": self.teams, "opponent": self.opponents,
+                   "rotation": [int(r) for r in self.rotations]}
+        return {k: v for k, v in filters.items() if len(v)}
+
+
+def load(query: SeasonQuery, data_dir: Path,
+         store: Optional[Store] = None) -> pd.DataFrame:
+    """Read the rallies ``query`` needs: pruned columns, pushed filters."""
+    columns = query.touch_columns() + query.row_keys()
+    if archive.available():
+        return archive.scan(data_dir, columns,
+                            archive.where(query.filters(), query.start,
+                                          query.end))
+    store = store or Store(Path(data_dir) / "vstat.db")
+    rows = store.scan_rallies(columns, query.filters(), query.start,
+                              query.end)
+    return pd.DataFrame(rows, columns=columns)
+
+
+def run(query: SeasonQuery, data_dir: Path, store: Optional[Store] = None,
+        roster: Optional[RosterIndex] = None) -> pd.DataFrame:
+    """Answer ``query`` with ``ANALYTIC_COLUMNS`` per group."""
+    unknown = set(query.group_by) - set(GROUP_KEYS)
+    if unknown:
+        raise ValueError(f"cannot group by {sorted(unknown)}")
+    rallies = load(query, data_dir, store)
+    touches = touch_table(rallies, query.row_keys())
+    keep = np.ones(len(touches), dtype=bool)
+    if query.touch_types:
+        codes = [int(_TYPE_BY_LABEL[t]) for t in query.touch_types]
+        keep &= np.isin(touches["type"].to_numpy(), codes)
+    if query.jerseys:
+        keep &= np.isin(touches["jersey"].to_numpy(),
+                        [int(j) for j in query.jerseys])
+    if query.positions:
+        if roster is None:
+            raise ValueError("filtering by position needs a roster")
+        players = [k for p in query.positions for k in roster.player_keys(p)]
+        on_roster = pd.MultiIndex.from_arrays(
+            [touches["our_team"].astype(object),
+             touches["jersey"].astype(np.int64)])
+        keep &= on_roster.isin(players)
+    touches = touches[keep]
+
+    group_by = list(query.group_by) or ["all"]
+    if "all" in group_by:
+        touches = touches.assign(all="all")
+    totals = aggregate(touches, group_by)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        totals["kill_pct"] = totals["attack_kills"] / totals["attacks"]
+    if "type" in group_by:
+        totals = totals.rename(index=type_label,
+                               level=group_by.index("type"))
+    return totals[ANALYTIC_COLUMNS]
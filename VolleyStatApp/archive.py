@@ -0,0 +1,204 @@
+"""
+Columnar Parquet archive for completed matches.
+
+Each archived match is one zstd-compressed Parquet file under
+``<data dir>/archive``. Touches are stored as their packed int32 codes,
+the rotation as a small int, and the match fields (id, teams, date) as
+dictionary-encoded columns so a season can be scanned as one dataset.
+Positions are interned: each rally stores a ``lineup_id`` and the file's
+lineup table rides in the schema metadata, so reads that ask for
+``position_N`` columns expand them per file. Each rally also keeps its
+``set`` number. Reads are memory-mapped and fetch only the requested
+columns; CSV is produced only when an export asks for it.
+
+pyarrow is optional: ``available()`` reports whether it is installed and
+callers fall back to the SQLite rallies table without it.
+"""
+
+
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import pandas as pd
+
+from lineups import POSITION_COLUMNS, LineupTable, expand_frame, intern_frame
+from models import ARCHIVE_COLUMNS, RALLY_COLUMNS, INT_COLUMNS, match_id
+from touches import TOUCH_COLUMNS, encode_frame, decode_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = ds = pafs = pq = None
+
+MATCH_COLUMNS = ["match_id", "our_team", "opponent", "date"]
+LINEUPS_KEY = b"vstat.lineups"
+
+
+def available() -> bool:
+    return pq is not None
+
+
+def _require() -> None:
+    if pq is None:
+        raise ImportError("pyarrow is required for the Parquet archive; "
+                          "pip install pyarrow")
+
+
+def archive_dir(data_dir: Path) -> Path:
+    return Path(data_dir) / "archive"
+
+
+def match_path(data_dir: Path, mid: str) -> Path:
+    return archive_dir(data_dir) / f"{mid}.parquet"
+
+
+def _schema() -> "pa.Schema":
+    fields = [pa.field(name, pa.dictionary(pa.int8(), pa.string()))
+              for name in MATCH_COLUMNS]
+    fields.append(pa.field("lineup_id", pa.int16()))
+    for name in RALLY_COLUMNS:
+        if name in POSITION_COLUMNS:
+            continue
+        if name in INT_COLUMNS:
+            fields.append(pa.field(name, pa.int8()))
+        elif name in TOUCH_COLUMNS:
+            fields.append(pa.field(name, pa.int32()))
+        else:
+            fields.append(pa.field(name, pa.dictionary(pa.int8(),
+                                                       pa.string())))
+    fields.append(pa.field("set", pa.int8()))
+    return pa.schema(fields)
+
+
+def to_table(match: dict,
+             events: Union[pd.DataFrame, Iterable[dict]]) -> "pa.Table":
+    """Build the archive table for one match from its rally rows."""
+    _require()
+    df = events if isinstance(events, pd.DataFrame) else pd.DataFrame(
+        list(events), columns=ARCHIVE_COLUMNS)
+    df, lineups = intern_frame(
+        encode_frame(df.reindex(columns=ARCHIVE_COLUMNS)))
+    df["set"] = df["set"].fillna(1).astype("int8")
+    for name in INT_COLUMNS:
+        if name in df.columns:
+            df[name] = df[name].fillna(0).astype("int8")
+    for name in RALLY_COLUMNS:
+        if name not in INT_COLUMNS and name not in TOUCH_COLUMNS:
+            df[name] = df[name].astype(object).where(df[name].notna(), None)
+    fixed = {"match_id": match_id(match), "our_team": match.get("our_team"),
+             "opponent": match.get("opponent"), "date": match.get("date")}
+    for name, value in fixed.items():
+        df.insert(MATCH_COLUMNS.index(name), name, [value] * len(df))
+    schema = _schema().with_metadata(
+        {LINEUPS_KEY: json.dumps(lineups.to_list())})
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def write_match(data_dir: Path, match: dict,
+                events: Union[pd.DataFrame, Iterable[dict]]) -> Path:
+    """Write (or replace) a match's archive file atomically."""
+    path = match_path(data_dir, match_id(match))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(to_table(match, events), tmp, compression="zstd")
+    tmp.replace(path)
+    return path
+
+
+def has_match(data_dir: Path, mid: str) -> bool:
+    return match_path(data_dir, mid).exists()
+
+
+def rally_count(data_dir: Path, mid: str) -> int:
+    """Return the number of rallies from the file footer alone."""
+    _require()
+    return pq.ParquetFile(match_path(data_dir, mid)).metadata.num_rows
+
+
+def lineups(path: Path) -> LineupTable:
+    """Return an archive file's lineup table."""
+    _require()
+    metadata = pq.read_schema(path, memory_map=True).metadata
+    return LineupTable(json.loads(metadata[LINEUPS_KEY]))
+
+
+def _read(path: Path, columns: Optional[Sequence[str]],
+          where: Optional["ds.Expression"] = None) -> pd.DataFrame:
+    wide = columns is None or any(c in POSITION_COLUMNS for c in columns)
+    read = columns
+    if columns is not None:
+        read = [c for c in columns if c not in POSITION_COLUMNS]
+        if wide and "lineup_id" not in read:
+            read.append("lineup_id")
+    df = pq.read_table(path, columns=read, filters=where,
+                       memory_map=True).to_pandas()
+    if wide:
+        df = expand_frame(df, lineups(path))
+    return df if columns is None else df[list(columns)]
+
+
+def read_match(data_dir: Path, mid: str,
+               columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Read selected columns of one match, touches still int-coded and
+    positions expanded to the wide schema (default: ``ARCHIVE_COLUMNS``)."""
+    _require()
+    return _read(match_path(data_dir, mid),
+                 list(columns) if columns else ARCHIVE_COLUMNS)
+
+
+def read_events(data_dir: Path, mid: str) -> List[dict]:
+    """Return one match's rallies as decoded ``Rally`` dicts plus ``set``."""
+    df = decode_frame(read_match(data_dir, mid))
+    df = df.astype(object).where(df.notna(), None)
+    return df.to_dict("records")
+
+
+def to_csv(data_dir: Path, mid: str) -> bytes:
+    """Return one match as CSV in the app's string touch format."""
+    df = decode_frame(read_match(data_dir, mid))
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def where(filters: Optional[Dict[str, Sequence]] = None,
+          start: Optional[str] = None,
+          end: Optional[str] = None) -> Optional["ds.Expression"]:
+    """Build a scan filter: each column in one of its values, and the
+    match date within ``start``..``end``."""
+    _require()
+    terms = [ds.field(name).isin(list(values))
+             for name, values in (filters or {}).items()]
+    date = ds.field("date").cast(pa.string())
+    if start:
+        terms.append(date >= start)
+    if end:
+        terms.append(date <= end)
+    expr = None
+    for term in terms:
+        expr = term if expr is None else expr & term
+    return expr
+
+
+def scan(data_dir: Path, columns: Sequence[str],
+         where: Optional["ds.Expression"] = None) -> pd.DataFrame:
+    """Read ``columns`` across every archived match (int-coded touches).
+
+    ``where`` is a pyarrow dataset expression pushed down to the scan.
+    Position columns are expanded file by file, since lineup ids are per
+    match; scans without them read the whole season as one dataset.
+    """
+    _require()
+    folder = archive_dir(data_dir)
+    files = sorted(folder.glob("*.parquet")) if folder.exists() else []
+    if not files:
+        return pd.DataFrame(columns=list(columns))
+    if any(c in POSITION_COLUMNS for c in columns):
+        return pd.concat([_read(f, list(columns), where) for f in files],
+                         ignore_index=True)
+    data = ds.dataset([str(f) for f in files], schema=_schema(),
+                      format="parquet",
+                      filesystem=pafs.LocalFileSystem(use_mmap=True))
+    return data.to_table(columns=list(columns), filter=where).to_pandas()
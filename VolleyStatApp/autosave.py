@@ -0,0 +1,154 @@
+"""
+Debounced background saving of roster edits.
+
+``Autosaver`` listens to a ``RosterIndex`` and remembers which teams
+changed. One long-lived worker thread flushes them ``delay`` seconds after
+the last edit (and at most ``max_delay`` after the first), so a burst of
+clicks becomes one write; an edit only moves the deadline and wakes the
+worker, it never starts a thread. Bulk imports hold the saver ``paused``
+and flush once at the end. A flush saves only the dirty teams, plus
+deletions, in a single store transaction; if it fails the teams stay
+dirty for the next try.
+"""
+
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Set
+
+from roster import RosterIndex
+from storage import Store
+
+AUTOSAVE_SECONDS = float(os.environ.get("VSTAT_AUTOSAVE_SECONDS", "2"))
+AUTOSAVE_MAX_SECONDS = 10.0
+
+
+class Autosaver:
+    """Tracks dirty teams of a roster and flushes them to a ``Store``.
+
+    ``clock`` returns seconds (``time.monotonic`` by default). With
+    ``background=False`` no worker runs and the caller drives
+    ``flush_due``.
+    """
+
+    def __init__(self, roster: RosterIndex, store: Store,
+                 delay: float = AUTOSAVE_SECONDS,
+                 max_delay: float = AUTOSAVE_MAX_SECONDS,
+                 clock: Callable[[], float] = time.monotonic,
+                 background: bool = True) -> None:
+        self.roster = roster
+        self.store = store
+        self.delay = delay
+        self.max_delay = max(delay, max_delay)
+        self.clock = clock
+        self.saves = 0
+        self.last_error: Optional[Exception] = None
+        self._dirty: Set[str] = set()
+        self._first_dirty = 0.0
+        self._last_dirty = 0.0
+        self._paused = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        if background:
+            self._worker = threading.Thread(target=self._run,
+                                            name="vstat-autosave",
+                                            daemon=True)
+            self._worker.start()
+        roster.listeners.append(self.mark)
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def mark(self, team: str) -> None:
+        """Note a change to ``team`` and push the flush deadline back."""
+        with self._cond:
+            now = self.clock()
+            if not self._dirty:
+                self._first_dirty = now
+            self._last_dirty = now
+            self._dirty.add(team)
+            self._cond.notify()
+
+    def _deadline(self) -> Optional[float]:
+        """When the dirty teams are due, or None if nothing is."""
+        if not self._dirty or self._paused:
+            return None
+        return min(self._last_dirty + self.delay,
+                   self._first_dirty + self.max_delay)
+
+    def flush_due(self) -> int:
+        """Flush if the debounce deadline has passed; return teams written."""
+        with self._cond:
+            deadline = self._deadline()
+            if deadline is None or self.clock() < deadline:
+                return 0
+        return self.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed:
+                    deadline = self._deadline()
+                    if deadline is not None and self.clock() >= deadline:
+                        break
+                    self._cond.wait(None if deadline is None
+                                    else deadline - self.clock())
+                if self._closed:
+                    return
+            self.flush()
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """Hold back background flushes, then flush once on exit."""
+        with self._cond:
+            self._paused += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._paused -= 1
+                resume = not self._paused
+            if resume:
+                self.flush()
+
+    def flush(self) -> int:
+        """Save every dirty team now; return how many were written."""
+        with self._cond:
+            names, self._dirty = self._dirty, set()
+        if not names:
+            return 0
+        teams, deleted = [], []
+        for name in names:
+            team = self.roster.team(name)
+            if team is None:
+                deleted.append(name)
+            else:
+                # Copy so UI edits during the write can't tear it.
+                teams.append({**team,
+                              "players": [dict(p) for p in team["players"]]})
+        try:
+            self.store.upsert_teams(teams, deleted)
+        except Exception as e:
+            with self._cond:
+                self._dirty |= names
+                # Retry after another ``delay``, not in a tight loop.
+                self._first_dirty = self._last_dirty = self.clock()
+            self.last_error = e
+            return 0
+        self.last_error = None
+        self.saves += 1
+        return len(names)
+
+    def close(self) -> None:
+        if self.mark in self.roster.listeners:
+            self.roster.listeners.remove(self.mark)
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._worker is not None:
+            self._worker.join()
+        self.flush()
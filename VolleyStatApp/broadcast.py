@@ -0,0 +1,169 @@
+"""
+Publish/subscribe channel for live-score updates.
+
+The scorer's ``Journal`` feeds a ``Broadcaster``: every recorded event
+(point, rally, sub, rotation, set, undo/redo) becomes one small delta
+message, serialized once and handed to every viewer of that match.
+
+Each ``Subscription`` has a bounded queue, so publishing never blocks on
+a slow viewer. When a viewer falls ``max_pending`` messages behind, its
+backlog is dropped and replaced by a single snapshot of the current
+score; a phone on a bad connection skips ahead instead of replaying
+every rally it missed, and memory per viewer stays bounded.
+"""
+
+
+import json
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional, Set
+
+MAX_PENDING = 32
+
+
+def _dumps(message: dict) -> str:
+    return json.dumps(message, separators=(",", ":"))
+
+
+def delta(record: dict, snapshot: dict) -> dict:
+    """Build the delta message for one journal listener record.
+
+    ``snapshot`` is the engine state after the record was applied.
+    """
+    kind = record.get("kind")
+    message = {"kind": kind, "version": snapshot["version"],
+               "score": [snapshot["score_us"], snapshot["score_them"]],
+               "set_number": snapshot["set_number"],
+               "rotation": snapshot["rotation"],
+               "serving": snapshot["serving"]}
+    if kind == "libero" or snapshot["libero"] is not None:
+        # Points and rotations can swap a libero off automatically.
+        message["lineup"] = snapshot["lineup"]
+    if kind == "point":
+        message["side"] = record["side"]
+    elif kind == "rally":
+        message["point"] = record["row"].get("point")
+    elif kind == "sub":
+        message.update(position=record["position"],
+                       jersey_in=record["jersey_in"],
+                       jersey_out=record.get("jersey_out"))
+    elif kind == "end_set":
+        message.update(set_scores=snapshot["set_scores"],
+                       winner=snapshot["winner"])
+    return message
+
+
+class Subscription:
+    """One viewer's bounded queue of encoded messages."""
+
+    def __init__(self, snapshot: Callable[[], dict],
+                 max_pending: int = MAX_PENDING,
+                 on_put: Optional[Callable[[], None]] = None) -> None:
+        self.snapshot = snapshot
+        self.max_pending = max_pending
+        # Wakes a reader that doesn't block in ``get`` (an event loop).
+        self.on_put = on_put
+        self.coalesced = 0
+        self.closed = False
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def put(self, message: str) -> None:
+        with self._cond:
+            if self.closed:
+                return
+            if len(self._queue) >= self.max_pending:
+                # Too far behind: skip the backlog, resync from a snapshot.
+                self._queue.clear()
+                self._queue.append(self._snapshot_message())
+                self.coalesced += 1
+            else:
+                self._queue.append(message)
+            self._cond.notify()
+        if self.on_put is not None:
+            self.on_put()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Return the next message, or None on timeout or close."""
+        with self._cond:
+            if not self._queue and not self.closed:
+                self._cond.wait(timeout)
+            return self._queue.popleft() if self._queue else None
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._queue.clear()
+            self._cond.notify_all()
+        if self.on_put is not None:
+            self.on_put()
+
+    def _snapshot_message(self) -> str:
+        return _dumps({"kind": "snapshot", **self.snapshot()})
+
+
+class Broadcaster:
+    """Fan-out of per-match messages to any number of subscriptions."""
+
+    def __init__(self, max_pending: int = MAX_PENDING) -> None:
+        self.max_pending = max_pending
+        self.published = 0
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._snapshots: Dict[str, Callable[[], dict]] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, mid: str, engine) -> None:
+        """Publish every journal change of ``engine`` under ``mid``."""
+        self._snapshots[mid] = engine.snapshot
+
+        def listener(record: dict) -> None:
+            self.publish(mid, delta(record, engine.snapshot()))
+
+        engine.journal.listeners.append(listener)
+
+    def watch(self, registry) -> None:
+        """Attach every match ``registry`` opens or recovers from now on.
+
+        Call it before ``registry.recover()`` so resumed matches publish too.
+        """
+        registry.on_open.append(
+            lambda mid, shared: self.attach(mid, shared.engine))
+
+    def subscribe(self, mid: str,
+                  on_put: Optional[Callable[[], None]] = None
+                  ) -> Subscription:
+        """Subscribe to ``mid``; the first message is a full snapshot."""
+        snapshot = self._snapshots.get(mid, dict)
+        sub = Subscription(snapshot, self.max_pending, on_put)
+        sub.put(sub._snapshot_message())
+        with self._lock:
+            self._topics.setdefault(mid, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, mid: str, sub: Subscription) -> None:
+        sub.close()
+        with self._lock:
+            subs = self._topics.get(mid)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._topics[mid]
+
+    def publish(self, mid: str, message: dict) -> int:
+        """Send ``message`` to every viewer of ``mid``; return how many."""
+        with self._lock:
+            subs = list(self._topics.get(mid, ()))
+        if not subs:
+            return 0
+        encoded = _dumps(message)
+        for sub in subs:
+            sub.put(encoded)
+        self.published += 1
+        return len(subs)
+
+    def viewers(self, mid: str) -> int:
+        with self._lock:
+            return len(self._topics.get(mid, ()))
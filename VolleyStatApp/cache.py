@@ -0,0 +1,139 @@
+"""
+Size-bounded LRU caches for values the app would otherwise rebuild on
+every Streamlit rerun.
+"""
+
+
+import os
+import sys
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+EXPORT_CACHE_BYTES = int(
+    float(os.environ.get("VSTAT_EXPORT_CACHE_MB", "32")) * 1024 * 1024)
+
+
+def default_sizeof(value: Any) -> int:
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Least-recently-used mapping capped by the total size of its values."""
+
+    def __init__(self, max_bytes: int,
+                 sizeof: Callable[[Any], int] = default_sizeof) -> None:
+        self.max_bytes = int(max_bytes)
+        self.sizeof = sizeof
+        self._items: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = self.sizeof(value)
+        self.pop(key)
+        if size > self.max_bytes:
+            # Never let one oversized value flush everything else.
+            return
+        self._items[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, old_size) = self._items.popitem(last=False)
+            self.bytes -= old_size
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        item = self._items.pop(key, None)
+        if item is None:
+            return None
+        self.bytes -= item[1]
+        return item[0]
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key``, building it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = build()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        self._items.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self._items), "bytes": self.bytes,
+                "max_bytes": self.max_bytes, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+
+class VersionedCache(LRUCache):
+    """Values keyed by ``(match id, content version, kind)``.
+
+    A new version (e.g. the journal's) makes older entries for that match
+    unreachable; they are dropped eagerly so the budget goes to live data.
+    """
+
+    def __init__(self, max_bytes: int,
+                 sizeof: Callable[[Any], int] = default_sizeof) -> None:
+        super().__init__(max_bytes, sizeof)
+        self._latest: dict = {}
+
+    def fetch(self, mid: str, version: Hashable, kind: Hashable,
+              build: Callable[[], Any]) -> Any:
+        self._drop_stale(mid, version)
+        return self.get_or_build((mid, version, kind), build)
+
+    def peek(self, mid: str, version: Hashable, kind: Hashable) -> Any:
+        """Return a cached value without building or counting a miss."""
+        item = self._items.get((mid, version, kind))
+        return item[0] if item else None
+
+    def invalidate(self, mid: str) -> None:
+        """Drop every cached value for ``mid``."""
+        for key in [k for k in self._items if k[0] == mid]:
+            self.pop(key)
+        self._latest.pop(mid, None)
+
+    def clear(self) -> None:
+        super().clear()
+        self._latest.clear()
+
+    def _drop_stale(self, mid: str, version: Hashable) -> None:
+        old = self._latest.get(mid)
+        if old is not None and old != version:
+            self.invalidate(mid)
+        self._latest[mid] = version
+
+
+class ExportCache(VersionedCache):
+    """Download payloads keyed by ``(match id, content version, format)``."""
+
+    def __init__(self, max_bytes: int = EXPORT_CACHE_BYTES) -> None:
+        super().__init__(max_bytes)
+
+    def payload(self, mid: str, version: Hashable, build: Callable[[], bytes],
+                fmt: str = "csv") -> bytes:
+        return self.fetch(mid, version, fmt, build)
+
+    def peek(self, mid: str, version: Hashable,
+             fmt: str = "csv") -> Optional[bytes]:
+        return super().peek(mid, version, fmt)
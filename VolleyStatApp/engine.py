@@ -0,0 +1,261 @@
+"""
+Headless volleyball scoring engine.
+
+``MatchEngine`` owns a ``Journal`` and exposes the scoring actions the
+Live Track view offers (points, serves, rallies, subs, rotation, sets,
+undo/redo) as plain method calls, including the rules for which side a
+serve or rally scores for and when a set or the match is won (see
+``sets``): a winning point is followed by an automatic ``EndSet``, which
+undo and redo treat as one step with it. It has no Streamlit dependency,
+so the same core can back the Streamlit UI, an HTTP API, tests and bulk
+replays.
+"""
+
+
+from dataclasses import asdict
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from journal import (EndSet, Journal, Libero, MatchState, Point, RecordRally,
+                     Rotate, SetServing, Substitution)
+from models import Rally
+from rotation import FRONT_ROW, check_slot, server_slot
+from sets import SetRules
+
+# (jersey, touch type label, result label), e.g. (10, "Attack", "Kill").
+Touch = Tuple[int, str, str]
+SIDES = ("us", "them")
+
+
+def check_side(side: Optional[str], optional: bool = False) -> None:
+    """Raise ValueError unless ``side`` is "us" or "them" (or None if
+    ``optional``)."""
+    if side not in SIDES and not (optional and side is None):
+        raise ValueError(f"side must be one of {SIDES}, got {side!r}")
+
+
+def serve_point(result: str) -> Optional[str]:
+    """Return the side a serve result scores for, if it ends the rally."""
+    if result == "Ace":
+        return "us"
+    if result == "Error":
+        return "them"
+    return None
+
+
+def rally_point(results: Iterable[str]) -> Optional[str]:
+    """Any error gives the point away; otherwise any kill wins it."""
+    results = list(results)
+    if "Error" in results:
+        return "them"
+    if "Kill" in results:
+        return "us"
+    return None
+
+
+class MatchEngine:
+    """Score, rotation, sets, lineup and rally log for one match."""
+
+    def __init__(self, match: Optional[dict] = None,
+                 lineup: Optional[dict] = None,
+                 journal: Optional[Journal] = None) -> None:
+        self.match = match
+        if journal is None:
+            state = MatchState()
+            if lineup:
+                state.lineup.update(lineup)
+            journal = Journal(state)
+        self.journal = journal
+        self.rules = SetRules.from_match(match)
+
+    # --- State ---
+    @property
+    def state(self) -> MatchState:
+        return self.journal.state
+
+    @property
+    def score(self) -> Tuple[int, int]:
+        return self.state.score_us, self.state.score_them
+
+    @property
+    def rotation(self) -> int:
+        return self.state.rotation
+
+    @property
+    def lineup(self) -> dict:
+        return self.state.lineup
+
+    @property
+    def rally_log(self):
+        return self.state.rally_log
+
+    @property
+    def version(self) -> int:
+        return self.journal.version
+
+    @property
+    def winner(self) -> Optional[str]:
+        """``"us"`` or ``"them"`` once the match is decided."""
+        return self.rules.match_winner(self.state.set_scores)
+
+    @property
+    def finished(self) -> bool:
+        return self.winner is not None
+
+    def set_target(self) -> int:
+        return self.rules.target(self.state.set_number)
+
+    def snapshot(self) -> dict:
+        """Return the score, set, rotation and lineup as plain JSON data."""
+        state = self.state
+        return {
+            "score_us": state.score_us,
+            "score_them": state.score_them,
+            "set_number": state.set_number,
+            "set_scores": [list(s) for s in state.set_scores],
+            "set_target": self.set_target(),
+            "winner": self.winner,
+            "rotation": state.rotation,
+            "lineup": dict(state.lineup),
+            "serving": state.serving,
+            "libero": state.libero,
+            "libero_slot": state.libero_slot,
+            "libero_for": state.libero_for,
+            "subs": state.subs,
+            "rallies": len(state.rally_log),
+            "version": self.version,
+        }
+
+    def server(self, position: Optional[int] = None) -> Optional[int]:
+        """Return the jersey serving from ``position`` (default: the
+        rotation's server)."""
+        if position is None:
+            position = server_slot(self.rotation)
+        return self.lineup.get(f"position_{check_slot(position)}")
+
+    def front_row(self) -> List[Optional[int]]:
+        """Jerseys at the net, zones 4, 3, 2."""
+        return [self.lineup.get(f"position_{slot}")
+                for slot in FRONT_ROW[self.rotation - 1]]
+
+    def _row(self, **touches) -> Rally:
+        return Rally(**self.lineup, rotation=self.rotation, **touches)
+
+    # --- Actions ---
+    def _score(self, command) -> None:
+        """Apply a scoring command, closing the set if it was won."""
+        if self.finished:
+            raise ValueError("The match is over")
+        self.journal.do(command)
+        state = self.state
+        if self.rules.set_winner(state.set_number, state.score_us,
+                                 state.score_them):
+            self.journal.do(EndSet(auto=True))
+
+    def point(self, side: str) -> None:
+        check_side(side)
+        self._score(Point(side))
+
+    def record_serve(self, result: str,
+                     position: Optional[int] = None) -> Rally:
+        """Record a serve by the player at ``position`` (default: server)."""
+        row = self._row(touch_serve=f"{self.server(position)}:{result}")
+        row.point = serve_point(result)
+        self._score(RecordRally(asdict(row)))
+        return row
+
+    def record_rally(self, touches: Sequence[Touch],
+                     point: Optional[str] = None) -> Rally:
+        """Record up to three touches; the point follows the results
+        unless ``point`` is given."""
+        check_side(point, optional=True)
+        row = self._row()
+        for i, (jersey, ttype, result) in enumerate(touches[:3], start=1):
+            setattr(row, f"touch_{i}", f"{jersey}:{ttype}:{result}")
+        row.point = point or rally_point(t[2] for t in touches)
+        self._score(RecordRally(asdict(row)))
+        return row
+
+    def record(self, row: dict) -> None:
+        """Record an already built ``Rally`` dict as is."""
+        self._score(RecordRally(row))
+
+    def substitute(self, position: int, jersey: int) -> bool:
+        """Put ``jersey`` in at ``position``; False if already there.
+
+        Raises ValueError for a position outside 1-6.
+        """
+        check_slot(position)
+        state = self.state
+        current = (state.libero_for if position == state.libero_slot
+                   else self.lineup.get(f"position_{position}"))
+        if current == jersey:
+            return False
+        self.journal.do(Substitution(position, jersey))
+        return True
+
+    def rotate(self, steps: int = 1) -> None:
+        self.journal.do(Rotate(steps))
+
+    def set_serving(self, serving: bool) -> None:
+        """Set whether we serve the next rally (no rotation)."""
+        if serving != self.state.serving:
+            self.journal.do(SetServing(serving))
+
+    def libero_in(self, slot: int, jersey: Optional[int] = None) -> None:
+        """Put the libero (``jersey`` or the one named before) in at a
+        back-row ``slot``; raises ValueError for a front-row slot or one
+        outside 1-6."""
+        check_slot(slot)
+        if jersey is None and self.state.libero is None:
+            raise ValueError("No libero named")
+        self.journal.do(Libero(jersey, slot))
+
+    def libero_out(self) -> None:
+        if self.state.libero_slot is not None:
+            self.journal.do(Libero())
+
+    def end_set(self) -> None:
+        """Close the set early at its current score."""
+        self.journal.do(EndSet())
+
+    def undo(self):
+        """Undo the last action; a set won on it is reopened too."""
+        command = self.journal.undo()
+        if isinstance(command, EndSet) and command.auto:
+            command = self.journal.undo()
+        return command
+
+    def redo(self):
+        command = self.journal.redo()
+        following = self.journal.next()
+        if isinstance(following, EndSet) and following.auto:
+            self.journal.redo()
+        return command
+
+    @property
+    def can_undo(self) -> bool:
+        return self.journal.can_undo
+
+    @property
+    def can_redo(self) -> bool:
+        return self.journal.can_redo
+
+    # --- Replay ---
+    def apply_records(self, records: Iterable[dict]) -> int:
+        """Apply serialized journal records; return how many were applied."""
+        apply = self.journal.apply_record
+        n = 0
+        for record in records:
+            apply(record)
+            n += 1
+        return n
+
+    @classmethod
+    def replay(cls, records: Iterable[dict], match: Optional[dict] = None,
+               lineup: Optional[dict] = None) -> "MatchEngine":
+        engine = cls(match, lineup)
+        engine.apply_records(records)
+        return engine
+
+    def to_records(self) -> List[dict]:
+        return self.journal.to_records()
@@ -0,0 +1,397 @@
+"""
+Reversible command journal for a live match.
+
+Every scoring action is a ``Command`` that knows how to apply itself to a
+``MatchState`` and how to revert itself. The ``Journal`` keeps the applied
+commands plus a redo tail, so undo/redo are O(1) and never copy the rally
+table; score, rotation, lineup and rally log are always exactly the result
+of replaying the journal.
+
+Scoring follows the side-out rule: when we win a point on their serve we
+take the serve and rotate one place, and a libero rotated into the front
+row goes off for the player they replaced. Commands that trigger those
+knock-on changes remember what they changed in ``_``-prefixed fields,
+which are not serialized, so revert can restore it exactly.
+"""
+
+
+from dataclasses import asdict, dataclass, field
+from typing import Callable, ClassVar, Dict, Iterable, List, Optional, Type
+
+from lineups import POSITION_COLUMNS, lineup_key
+from rally_log import MatchLog
+from rotation import is_front_row, next_rotation
+from stats import LiveStats
+
+
+def default_lineup() -> dict:
+    return {f"position_{i}": i for i in range(1, 7)}
+
+
+@dataclass
+class MatchState:
+    """Everything the live match view shows, derived from the journal."""
+    lineup: dict = field(default_factory=default_lineup)
+    rotation: int = 1
+    score_us: int = 0
+    score_them: int = 0
+    rally_log: MatchLog = field(default_factory=MatchLog)
+    live_stats: LiveStats = field(default_factory=LiveStats)
+    set_number: int = 1
+    # Final (us, them) score of each completed set.
+    set_scores: List[tuple] = field(default_factory=list)
+    # True while we hold serve; drives the side-out rotation.
+    serving: bool = True
+    # Libero jersey, the slot they are playing in and who they replaced.
+    libero: Optional[int] = None
+    libero_slot: Optional[int] = None
+    libero_for: Optional[int] = None
+    # Substitutions made in the current set.
+    subs: int = 0
+
+    def add_point(self, side: Optional[str], sign: int = 1) -> None:
+        if side == "us":
+            self.score_us += sign
+        elif side == "them":
+            self.score_them += sign
+
+    def _libero_off(self) -> Optional[tuple]:
+        """Send the libero off if their slot is now in the front row."""
+        slot = self.libero_slot
+        if slot is None or not is_front_row(slot, self.rotation):
+            return None
+        swap = (slot, self.libero_for)
+        self.lineup[f"position_{slot}"] = self.libero_for
+        self.libero_slot = self.libero_for = None
+        return swap
+
+    def rotate(self, steps: int = 1) -> Optional[tuple]:
+        """Rotate ``steps`` places; return the libero swap it forced."""
+        self.rotation = next_rotation(self.rotation, steps)
+        return self._libero_off()
+
+    def unrotate(self, steps: int, swap: Optional[tuple]) -> None:
+        if swap is not None:
+            slot, self.libero_for = swap
+            self.lineup[f"position_{slot}"] = self.libero
+            self.libero_slot = slot
+        self.rotation = next_rotation(self.rotation, -steps)
+
+    def score(self, side: Optional[str]) -> tuple:
+        """Award a rally to ``side`` with side-out; return the undo token."""
+        token = (self.serving, False, None)
+        self.add_point(side)
+        if side == "us" and not self.serving:
+            self.serving = True
+            token = (False, True, self.rotate(1))
+        elif side == "them":
+            self.serving = False
+        return token
+
+    def unscore(self, side: Optional[str], token: tuple) -> None:
+        serving, rotated, swap = token
+        self.add_point(side, -1)
+        if rotated:
+            self.unrotate(1, swap)
+        self.serving = serving
+
+
+class Command:
+    """Base class for a reversible match action."""
+    kind: ClassVar[str] = ""
+
+    def apply(self, state: MatchState) -> None:
+        raise NotImplementedError
+
+    def revert(self, state: MatchState) -> None:
+        raise NotImplementedError
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind,
+                **{k: v for k, v in asdict(self).items()
+                   if not k.startswith("_")}}
+
+
+COMMANDS: Dict[str, Type[Command]] = {}
+
+
+def register(cls: Type[Command]) -> Type[Command]:
+    COMMANDS[cls.kind] = cls
+    return cls
+
+
+def command_from_dict(data: dict) -> Command:
+    data = dict(data)
+    cls = COMMANDS[data.pop("kind")]
+    return cls(**data)
+
+
+@register
+@dataclass
+class Point(Command):
+    """A point awarded without a recorded rally ("Point Us"/"Point Them")."""
+    kind: ClassVar[str] = "point"
+    side: str
+    _undo: tuple = field(default=(), repr=False, compare=False)
+
+    def apply(self, state: MatchState) -> None:
+        self._undo = state.score(self.side)
+
+    def revert(self, state: MatchState) -> None:
+        state.unscore(self.side, self._undo)
+
+
+@register
+@dataclass
+class RecordRally(Command):
+    """A serve or rally row; its ``point`` field scores the rally.
+
+    A row played by the lineup on court is serialized without its six
+    position columns; they are filled back in from the lineup on replay.
+    """
+    kind: ClassVar[str] = "rally"
+    row: dict
+    _undo: tuple = field(default=(), repr=False, compare=False)
+    _on_court: bool = field(default=False, repr=False, compare=False)
+
+    def apply(self, state: MatchState) -> None:
+        if POSITION_COLUMNS[0] not in self.row:
+            self.row = {**state.lineup, **self.row}
+        self._on_court = lineup_key(self.row) == lineup_key(state.lineup)
+        state.rally_log.append(self.row)
+        state.live_stats.add(self.row)
+        self._undo = state.score(self.row.get("point"))
+
+    def revert(self, state: MatchState) -> None:
+        state.rally_log.pop()
+        state.live_stats.remove(self.row)
+        state.unscore(self.row.get("point"), self._undo)
+
+    def to_dict(self) -> dict:
+        row = self.row
+        if self._on_court:
+            row = {k: v for k, v in row.items() if k not in POSITION_COLUMNS}
+        return {"kind": self.kind, "row": row}
+
+
+@register
+@dataclass
+class Substitution(Command):
+    """Put ``jersey_in`` on court at ``position``.
+
+    If the libero is playing in that slot the sub replaces the player
+    waiting on the bench for them, and the libero stays on.
+    """
+    kind: ClassVar[str] = "sub"
+    position: int
+    jersey_in: int
+    jersey_out: Optional[int] = None
+
+    def apply(self, state: MatchState) -> None:
+        if self.position == state.libero_slot:
+            self.jersey_out = state.libero_for
+            state.libero_for = self.jersey_in
+        else:
+            key = f"position_{self.position}"
+            self.jersey_out = state.lineup.get(key)
+            state.lineup[key] = self.jersey_in
+        state.subs += 1
+
+    def revert(self, state: MatchState) -> None:
+        state.subs -= 1
+        if self.position == state.libero_slot:
+            state.libero_for = self.jersey_out
+        else:
+            state.lineup[f"position_{self.position}"] = self.jersey_out
+
+
+@register
+@dataclass
+class Rotate(Command):
+    """Advance the rotation by ``steps`` (negative to go back)."""
+    kind: ClassVar[str] = "rotate"
+    steps: int = 1
+    _undo: Optional[tuple] = field(default=None, repr=False, compare=False)
+
+    def apply(self, state: MatchState) -> None:
+        self._undo = state.rotate(self.steps)
+
+    def revert(self, state: MatchState) -> None:
+        state.unrotate(self.steps, self._undo)
+
+
+@register
+@dataclass
+class SetServing(Command):
+    """Say which side serves next, e.g. after the coin toss."""
+    kind: ClassVar[str] = "serving"
+    serving: bool
+    _undo: bool = field(default=True, repr=False, compare=False)
+
+    def apply(self, state: MatchState) -> None:
+        self._undo = state.serving
+        state.serving = self.serving
+
+    def revert(self, state: MatchState) -> None:
+        state.serving = self._undo
+
+
+@register
+@dataclass
+class Libero(Command):
+    """Name the libero and put them in at back-row ``slot``, or take them
+    off (``slot`` None) for the player they replaced."""
+    kind: ClassVar[str] = "libero"
+    jersey: Optional[int] = None
+    slot: Optional[int] = None
+    _undo: tuple = field(default=(), repr=False, compare=False)
+
+    def apply(self, state: MatchState) -> None:
+        if self.slot is not None and is_front_row(self.slot, state.rotation):
+            raise ValueError("The libero can only replace a back-row player")
+        self._undo = (state.libero, state.libero_slot, state.libero_for,
+                      dict(state.lineup))
+        if state.libero_slot is not None:
+            state.lineup[f"position_{state.libero_slot}"] = state.libero_for
+            state.libero_slot = state.libero_for = None
+        if self.jersey is not None:
+            state.libero = self.jersey
+        if self.slot is not None:
+            key = f"position_{self.slot}"
+            state.libero_for = state.lineup.get(key)
+            state.lineup[key] = state.libero
+            state.libero_slot = self.slot
+
+    def revert(self, state: MatchState) -> None:
+        (state.libero, state.libero_slot, state.libero_for,
+         lineup) = self._undo
+        state.lineup.clear()
+        state.lineup.update(lineup)
+
+
+@register
+@dataclass
+class EndSet(Command):
+    """Close the current set at its score and start the next at 0-0.
+
+    The new set starts a new rally log segment, back in rotation 1 with
+    the libero off court and no subs used. ``auto`` marks a set the
+    engine closed on a winning point.
+    """
+    kind: ClassVar[str] = "end_set"
+    auto: bool = False
+    _undo: tuple = field(default=(), repr=False, compare=False)
+
+    def apply(self, state: MatchState) -> None:
+        self._undo = (state.subs, state.rotation, state.libero_slot,
+                      state.libero_for, dict(state.lineup))
+        state.set_scores.append((state.score_us, state.score_them))
+        state.score_us = state.score_them = 0
+        state.set_number += 1
+        state.rally_log.new_set()
+        if state.libero_slot is not None:
+            state.lineup[f"position_{state.libero_slot}"] = state.libero_for
+            state.libero_slot = state.libero_for = None
+        state.subs, state.rotation = 0, 1
+
+    def revert(self, state: MatchState) -> None:
+        state.score_us, state.score_them = state.set_scores.pop()
+        state.set_number -= 1
+        state.rally_log.drop_set()
+        (state.subs, state.rotation, state.libero_slot, state.libero_for,
+         lineup) = self._undo
+        state.lineup.clear()
+        state.lineup.update(lineup)
+
+
+class Journal:
+    """Applied commands plus a redo tail over one ``MatchState``."""
+
+    def __init__(self, state: Optional[MatchState] = None) -> None:
+        self.state = state if state is not None else MatchState()
+        self._commands: List[Command] = []
+        self._cursor = 0
+        # Bumped on every change, including undo/redo, for cache keys.
+        self.version = 0
+        # Called with a small record ({"kind": ...}) after every change.
+        self.listeners: List[Callable[[dict], None]] = []
+
+    def _notify(self, record: dict) -> None:
+        for listener in self.listeners:
+            listener(record)
+
+    def __len__(self) -> int:
+        return self._cursor
+
+    @property
+    def can_undo(self) -> bool:
+        return self._cursor > 0
+
+    @property
+    def can_redo(self) -> bool:
+        return self._cursor < len(self._commands)
+
+    def do(self, command: Command) -> Command:
+        """Apply ``command`` and drop any redo tail."""
+        command.apply(self.state)
+        if self.can_redo:
+            del self._commands[self._cursor:]
+        self._commands.append(command)
+        self._cursor += 1
+        self.version += 1
+        if self.listeners:
+            self._notify(command.to_dict())
+        return command
+
+    def undo(self) -> Optional[Command]:
+        if not self.can_undo:
+            return None
+        self._cursor -= 1
+        command = self._commands[self._cursor]
+        command.revert(self.state)
+        self.version += 1
+        self._notify({"kind": "undo"})
+        return command
+
+    def redo(self) -> Optional[Command]:
+        if not self.can_redo:
+            return None
+        command = self._commands[self._cursor]
+        command.apply(self.state)
+        self._cursor += 1
+        self.version += 1
+        self._notify({"kind": "redo"})
+        return command
+
+    def last(self) -> Optional[Command]:
+        return self._commands[self._cursor - 1] if self.can_undo else None
+
+    def next(self) -> Optional[Command]:
+        """The command ``redo`` would apply, if any."""
+        return self._commands[self._cursor] if self.can_redo else None
+
+    def commands(self) -> List[Command]:
+        """Return the applied commands, oldest first."""
+        return self._commands[: self._cursor]
+
+    def to_records(self) -> List[dict]:
+        return [c.to_dict() for c in self.commands()]
+
+    def apply_record(self, record: dict) -> None:
+        """Apply one listener record: a command, "undo" or "redo"."""
+        kind = record.get("kind")
+        if kind == "undo":
+            self.undo()
+        elif kind == "redo":
+            self.redo()
+        else:
+            self.do(command_from_dict(record))
+
+    @classmethod
+    def replay(cls, records: Iterable[dict],
+               state: Optional[MatchState] = None) -> "Journal":
+        """Rebuild a journal by re-applying serialized records."""
+        journal = cls(state)
+        for record in records:
+            journal.apply_record(record)
+        return journal
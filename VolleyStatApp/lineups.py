@@ -0,0 +1,96 @@
+"""
+Interned six-player lineups.
+
+A lineup only changes on a substitution, a libero swap or a new set, so a
+match repeats the same few lineups for hundreds of rallies. ``LineupTable``
+stores each distinct ``(position_1, ..., position_6)`` tuple once and hands
+out a small integer id for it; rallies keep the id and the six position
+columns are expanded back from the table on read.
+
+The same split is used on disk: archived rallies store ``lineup_id`` and
+each match keeps its own small lineup table. ``intern_frame`` and
+``expand_frame`` convert a rally DataFrame between the wide
+``position_N`` schema (what exports and the UI see) and the narrow one.
+"""
+
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+POSITION_COLUMNS = [f"position_{i}" for i in range(1, 7)]
+
+Lineup = Tuple[int, ...]
+
+
+def lineup_key(row: dict) -> Lineup:
+    """The six jerseys of a rally or lineup dict, 0 for an empty slot."""
+    return tuple(int(row.get(name) or 0) for name in POSITION_COLUMNS)
+
+
+class LineupTable:
+    """Distinct lineups in first-seen order; an id is a row index."""
+
+    def __init__(self, lineups: Iterable[Sequence[int]] = ()) -> None:
+        self._ids: Dict[Lineup, int] = {}
+        self._rows = np.zeros((8, 6), dtype=np.int16)
+        for lineup in lineups:
+            self.intern(lineup)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def intern(self, lineup: Sequence[int]) -> int:
+        """Return the id of ``lineup``, adding it on first sight."""
+        key = tuple(int(j or 0) for j in lineup)
+        lid = self._ids.get(key)
+        if lid is None:
+            lid = len(self._ids)
+            if lid == len(self._rows):
+                self._rows = np.concatenate([self._rows,
+                                             np.zeros_like(self._rows)])
+            self._rows[lid] = key
+            self._ids[key] = lid
+        return lid
+
+    def intern_row(self, row: dict) -> int:
+        return self.intern(lineup_key(row))
+
+    def lineup(self, lid: int) -> dict:
+        """Return lineup ``lid`` as ``position_N`` -> jersey."""
+        return dict(zip(POSITION_COLUMNS, map(int, self._rows[lid])))
+
+    def expand(self, ids: np.ndarray) -> np.ndarray:
+        """Return an ``(len(ids), 6)`` array of jerseys for ``ids``."""
+        return self._rows[np.asarray(ids, dtype=np.intp)]
+
+    def to_list(self) -> List[List[int]]:
+        return self._rows[: len(self)].tolist()
+
+
+def intern_frame(frame: pd.DataFrame, table: Optional[LineupTable] = None
+                 ) -> Tuple[pd.DataFrame, LineupTable]:
+    """Replace a frame's position columns with ``lineup_id``.
+
+    Returns the narrow frame and the table its ids point into (``table``
+    if given, extended with any new lineups).
+    """
+    table = table if table is not None else LineupTable()
+    keys = (frame.reindex(columns=POSITION_COLUMNS).fillna(0)
+            .to_numpy(dtype=np.int64))
+    distinct, inverse = np.unique(keys, axis=0, return_inverse=True)
+    ids = np.array([table.intern(row) for row in distinct], dtype=np.int16)
+    narrow = frame.drop(columns=POSITION_COLUMNS, errors="ignore")
+    narrow.insert(0, "lineup_id", ids[inverse.reshape(-1)])
+    return narrow, table
+
+
+def expand_frame(frame: pd.DataFrame, table: LineupTable) -> pd.DataFrame:
+    """Replace ``lineup_id`` with the six position columns, in place of it."""
+    jerseys = table.expand(frame["lineup_id"].to_numpy())
+    at = frame.columns.get_loc("lineup_id")
+    wide = frame.drop(columns="lineup_id")
+    for slot, name in enumerate(POSITION_COLUMNS):
+        wide.insert(at + slot, name, jerseys[:, slot])
+    return wide
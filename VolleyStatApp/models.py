@@ -0,0 +1,54 @@
+"""
+Core data model shared by the VolleyStat app and its helper modules.
+Kept free of Streamlit so it can be imported by tests and back ends.
+"""
+
+
+import re
+from dataclasses import dataclass, fields
+from typing import Optional, TypedDict, List
+
+
+@dataclass
+class Rally:
+    """Data class representing a single rally sequence."""
+    position_1: int
+    position_2: int
+    position_3: int
+    position_4: int
+    position_5: int
+    position_6: int
+    rotation: int
+    touch_serve: Optional[str] = None
+    touch_block: Optional[str] = None
+    touch_block_asst: Optional[str] = None
+    touch_1: Optional[str] = None
+    touch_2: Optional[str] = None
+    touch_3: Optional[str] = None
+    sanctions: Optional[str] = None
+    point: Optional[str] = None
+
+class Player(TypedDict):
+    name: str
+    jersey: int
+    position: str
+
+class Team(TypedDict):
+    name: str
+    season: str
+    players: List[Player]
+
+
+RALLY_COLUMNS = [f.name for f in fields(Rally)]
+INT_COLUMNS = [f"position_{i}" for i in range(1, 7)] + ["rotation"]
+# Archived rallies also keep the set each was played in.
+ARCHIVE_COLUMNS = RALLY_COLUMNS + ["set"]
+
+
+def match_id(match: dict) -> str:
+    """Return a stable file-safe id for a scheduled match dict."""
+    if match.get("id"):
+        return str(match["id"])
+    raw = f"{match.get('our_team', '')}-{match.get('date', '')}-" \
+          f"{match.get('opponent', '')}"
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", raw).strip("_")
@@ -0,0 +1,110 @@
+"""
+Lightweight rerun profiler for the Streamlit app.
+
+Wrap a section of the script in ``profiler.section(name)`` (or decorate a
+function with ``profiler.timed(name)``) to record its wall time and the
+change in ``sys.getallocatedblocks()`` across it. That is a net block
+count, not an allocation count: blocks allocated and freed inside the
+section cancel out, and it is process-wide, so other threads (other
+sessions' reruns) leak into it. It is a cheap hint of a section's memory
+growth; use ``tracemalloc`` when real allocation counts are needed.
+
+Samples are kept in a rolling window per section so ``summary()`` can
+report p50/p95, and ``dump()`` appends them to a JSON-lines file for
+offline comparison. Each browser session keeps its own ``Profiler`` in
+its session state, so one session's toggle or samples never affect
+another's. Nothing is recorded unless ``enabled`` is set
+(``VSTAT_PROFILE=1`` turns it on for every session).
+"""
+
+
+import functools
+import json
+import os
+import sys
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+PROFILE_WINDOW = 200
+
+
+class Profiler:
+    """Per-section rolling samples of (seconds, net block delta)."""
+
+    def __init__(self, window: int = PROFILE_WINDOW,
+                 enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start,
+                        sys.getallocatedblocks() - blocks)
+
+    def timed(self, name: str) -> Callable:
+        """Decorator form of ``section``."""
+        def wrap(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def inner(*args, **kwargs):
+                with self.section(name):
+                    return func(*args, **kwargs)
+            return inner
+        return wrap
+
+    def record(self, name: str, seconds: float, net_blocks: int = 0) -> None:
+        self.samples[name].append((time.time(), seconds, net_blocks))
+
+    def summary(self) -> pd.DataFrame:
+        """Return n, p50/p95 ms, last ms and p50 net block delta per
+        section."""
+        rows = []
+        for name, samples in self.samples.items():
+            ms = np.array([s[1] for s in samples]) * 1000.0
+            blocks = np.array([s[2] for s in samples])
+            rows.append({
+                "section": name,
+                "n": len(ms),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "last_ms": float(ms[-1]),
+                "p50_net_blocks": int(np.percentile(blocks, 50)),
+            })
+        frame = pd.DataFrame(rows, columns=["section", "n", "p50_ms",
+                                            "p95_ms", "last_ms",
+                                            "p50_net_blocks"])
+        return frame.sort_values("p50_ms", ascending=False,
+                                 ignore_index=True)
+
+    def dump(self, path: Path) -> int:
+        """Append every sample to ``path`` as JSON lines; return the count."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines: List[str] = []
+        for name, samples in self.samples.items():
+            for ts, seconds, net_blocks in samples:
+                lines.append(json.dumps({"section": name, "ts": ts,
+                                         "ms": seconds * 1000.0,
+                                         "net_blocks": net_blocks}))
+        with path.open("a", encoding="utf-8") as f:
+            f.write("".join(line + "\n" for line in lines))
+        return len(lines)
+
+    def clear(self) -> None:
+        self.samples.clear()
+
+
+PROFILE_ENV = os.environ.get("VSTAT_PROFILE", "") not in ("", "0", "false")
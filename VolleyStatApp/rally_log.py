@@ -0,0 +1,311 @@
+"""
+Append-only columnar store for the live rally log.
+
+Rallies are written into preallocated column buffers that double in size
+when full, so recording a rally is amortized O(1) instead of the O(n)
+``pd.concat`` the app used to do per rally. A DataFrame view is built only
+when the UI or an export asks for one and is cached until the next write.
+Touch columns are held as packed int32 codes (see ``touches``) and only
+turned back into ``"jersey:Type:Result"`` strings for that view. The six
+``position_N`` columns are not stored per rally: each rally keeps a
+``lineup_id`` into a ``LineupTable`` and positions are expanded on read.
+
+A live match keeps a ``MatchLog``: one ``RallyLog`` segment per set, so
+recording, undoing, per-set stats and per-set exports only touch the
+current set's buffers.
+"""
+
+
+from dataclasses import asdict
+from typing import Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from lineups import POSITION_COLUMNS, LineupTable
+from models import Rally, RALLY_COLUMNS, INT_COLUMNS
+from touches import (TOUCH_COLUMNS, encode_touch, decode_touch,
+                     decode_column)
+
+_OBJECT_COLUMNS = [name for name in RALLY_COLUMNS
+                   if name not in INT_COLUMNS and name not in TOUCH_COLUMNS]
+_INT_STORED = [name for name in INT_COLUMNS if name not in POSITION_COLUMNS]
+_STORED_COLUMNS = (["lineup_id"] + _INT_STORED + list(TOUCH_COLUMNS)
+                   + _OBJECT_COLUMNS)
+
+
+class RallyLog:
+    """Growable column buffers keyed by the ``Rally`` fields."""
+
+    def __init__(self, capacity: int = 64) -> None:
+        self._capacity = max(1, int(capacity))
+        self._size = 0
+        self._cols = {name: self._new_buffer(name, self._capacity)
+                      for name in _STORED_COLUMNS}
+        self.lineups = LineupTable()
+        self._frame: Optional[pd.DataFrame] = None
+        # Bumped on every change, so caches can key derived data on it.
+        self.version = 0
+
+    @staticmethod
+    def _new_buffer(name: str, capacity: int) -> np.ndarray:
+        if name in INT_COLUMNS or name == "lineup_id":
+            return np.zeros(capacity, dtype=np.int16)
+        if name in TOUCH_COLUMNS:
+            return np.zeros(capacity, dtype=np.int32)
+        return np.empty(capacity, dtype=object)
+
+    def _grow(self) -> None:
+        self._capacity *= 2
+        for name, buf in self._cols.items():
+            new = self._new_buffer(name, self._capacity)
+            new[: self._size] = buf[: self._size]
+            self._cols[name] = new
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def empty(self) -> bool:
+        return self._size == 0
+
+    def append(self, row: Union[Rally, dict]) -> None:
+        """Append one rally in amortized O(1)."""
+        data = asdict(row) if isinstance(row, Rally) else row
+        if self._size == self._capacity:
+            self._grow()
+        i = self._size
+        cols = self._cols
+        cols["lineup_id"][i] = self.lineups.intern_row(data)
+        for name in _INT_STORED:
+            value = data.get(name)
+            cols[name][i] = 0 if value is None else value
+        for name, default in TOUCH_COLUMNS.items():
+            cols[name][i] = encode_touch(data.get(name), default)
+        for name in _OBJECT_COLUMNS:
+            cols[name][i] = data.get(name)
+        self._size += 1
+        self._frame = None
+        self.version += 1
+
+    def extend(self, rows: Iterable[Union[Rally, dict]]) -> None:
+        for row in rows:
+            self.append(row)
+
+    def pop(self) -> Optional[dict]:
+        """Remove and return the last rally as a dict, or None if empty."""
+        if self._size == 0:
+            return None
+        self._size -= 1
+        i = self._size
+        row = self._row(i)
+        for name in _OBJECT_COLUMNS:
+            self._cols[name][i] = None
+        self._frame = None
+        self.version += 1
+        return row
+
+    def clear(self) -> None:
+        self._size = 0
+        for name in _OBJECT_COLUMNS:
+            self._cols[name][:] = None
+        self._frame = None
+        self.version += 1
+
+    def _row(self, i: int) -> dict:
+        cols = self._cols
+        row = self.lineups.lineup(cols["lineup_id"][i])
+        for name in _INT_STORED:
+            row[name] = int(cols[name][i])
+        for name, default in TOUCH_COLUMNS.items():
+            row[name] = decode_touch(cols[name][i], default)
+        for name in _OBJECT_COLUMNS:
+            row[name] = cols[name][i]
+        return {name: row[name] for name in RALLY_COLUMNS}
+
+    def row(self, i: int) -> dict:
+        """Return rally ``i`` (negative indexes allowed) as a dict."""
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError("rally index out of range")
+        return self._row(i)
+
+    def lineup(self, i: int) -> dict:
+        """Return the ``position_N`` lineup of rally ``i``."""
+        return self.lineups.lineup(self._cols["lineup_id"][i])
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a read-only view of one column's filled region.
+
+        Touch columns come back as their packed int32 codes; position
+        columns are expanded from ``lineup_id`` into a new array.
+        """
+        if name in POSITION_COLUMNS:
+            slot = POSITION_COLUMNS.index(name)
+            view = self.lineups.expand(self._cols["lineup_id"][: self._size])
+            view = view[:, slot]
+        else:
+            view = self._cols[name][: self._size]
+        view.flags.writeable = False
+        return view
+
+    def _slice_frame(self, start: int, stop: int) -> pd.DataFrame:
+        data = {}
+        lineups = self.lineups.expand(self._cols["lineup_id"][start:stop])
+        for slot, name in enumerate(POSITION_COLUMNS):
+            data[name] = lineups[:, slot]
+        for name in RALLY_COLUMNS:
+            if name in POSITION_COLUMNS:
+                continue
+            buf = self._cols[name][start:stop]
+            if name in TOUCH_COLUMNS:
+                data[name] = decode_column(buf, TOUCH_COLUMNS[name])
+            else:
+                data[name] = buf.copy()
+        return pd.DataFrame(data, columns=RALLY_COLUMNS)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return the whole log as a DataFrame, cached until the next write."""
+        if self._frame is None:
+            self._frame = self._slice_frame(0, self._size)
+        return self._frame
+
+    def tail(self, n: int = 10) -> pd.DataFrame:
+        """Return the last ``n`` rallies without materializing the full log."""
+        start = max(0, self._size - n)
+        frame = self._slice_frame(start, self._size)
+        frame.index = range(start, self._size)
+        return frame
+
+    def to_records(self) -> list:
+        return [self.row(i) for i in range(self._size)]
+
+    @classmethod
+    def from_records(cls, rows: Iterable[Union[Rally, dict]]) -> "RallyLog":
+        rows = list(rows)
+        log = cls(capacity=max(64, len(rows)))
+        log.extend(rows)
+        return log
+
+
+class MatchLog:
+    """A match's rallies partitioned into one ``RallyLog`` per set."""
+
+    def __init__(self) -> None:
+        self.sets: List[RallyLog] = [RallyLog()]
+        self._frame: Optional[pd.DataFrame] = None
+        # Bumped on every change, so caches can key derived data on it.
+        self.version = 0
+
+    def _changed(self) -> None:
+        self._frame = None
+        self.version += 1
+
+    @property
+    def current(self) -> RallyLog:
+        """The segment of the set being played."""
+        return self.sets[-1]
+
+    def segment(self, set_number: int) -> RallyLog:
+        """Return the rallies of set ``set_number`` (1-based)."""
+        return self.sets[set_number - 1]
+
+    def new_set(self) -> None:
+        log = RallyLog()
+        # Start past every version an earlier segment for this set (since
+        # undone) could have had, so per-set cache keys never collide.
+        log.version = self.version
+        self.sets.append(log)
+        self._changed()
+
+    def drop_set(self) -> None:
+        """Remove the current set's segment, which must be empty."""
+        if len(self.sets) == 1 or not self.current.empty:
+            raise ValueError("only an empty later set can be dropped")
+        self.sets.pop()
+        self._changed()
+
+    def __len__(self) -> int:
+        return sum(len(log) for log in self.sets)
+
+    @property
+    def empty(self) -> bool:
+        return all(log.empty for log in self.sets)
+
+    def append(self, row: Union[Rally, dict]) -> None:
+        self.current.append(row)
+        self._changed()
+
+    def extend(self, rows: Iterable[Union[Rally, dict]]) -> None:
+        for row in rows:
+            self.append(row)
+
+    def pop(self) -> Optional[dict]:
+        """Remove and return the current set's last rally, if any."""
+        row = self.current.pop()
+        if row is not None:
+            self._changed()
+        return row
+
+    def row(self, i: int) -> dict:
+        """Return rally ``i`` of the match (negative indexes allowed)."""
+        size = len(self)
+        if i < 0:
+            i += size
+        if not 0 <= i < size:
+            raise IndexError("rally index out of range")
+        for log in self.sets:
+            if i < len(log):
+                return log.row(i)
+            i -= len(log)
+        raise IndexError("rally index out of range")
+
+    def column(self, name: str) -> np.ndarray:
+        """Return one column across every set, read-only."""
+        if len(self.sets) == 1:
+            return self.current.column(name)
+        view = np.concatenate([log.column(name) for log in self.sets])
+        view.flags.writeable = False
+        return view
+
+    def set_column(self) -> np.ndarray:
+        """The set number of every rally, aligned with ``column``."""
+        return np.repeat(np.arange(1, len(self.sets) + 1, dtype=np.int16),
+                         [len(log) for log in self.sets])
+
+    def to_frame(self, set_number: Optional[int] = None) -> pd.DataFrame:
+        """Return one set's rallies, or the whole match with a ``set``
+        column; the whole-match frame is cached until the next write."""
+        if set_number is not None:
+            return self.segment(set_number).to_frame()
+        if self._frame is None:
+            frames = [log.to_frame() for log in self.sets]
+            frame = pd.concat(frames, ignore_index=True) \
+                if len(frames) > 1 else frames[0].copy()
+            frame["set"] = self.set_column()
+            self._frame = frame
+        return self._frame
+
+    def tail(self, n: int = 10) -> pd.DataFrame:
+        """Return the last ``n`` rallies, reading only the sets they span."""
+        parts, start, stop = [], len(self), len(self)
+        for number in range(len(self.sets), 0, -1):
+            log = self.sets[number - 1]
+            if not n:
+                break
+            if log.empty:
+                continue
+            part = log.tail(n)
+            part["set"] = number
+            start -= len(part)
+            n -= len(part)
+            parts.append(part)
+        if not parts:
+            return self.to_frame().iloc[0:0]
+        frame = pd.concat(parts[::-1])
+        frame.index = range(start, stop)
+        return frame
+
+    def to_records(self) -> list:
+        return [row for log in self.sets for row in log.to_records()]
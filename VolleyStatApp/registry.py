@@ -0,0 +1,203 @@
+"""
+In-process registry of live matches shared by every scorer session.
+
+Streamlit gives each browser tab its own ``st.session_state``; the
+registry lives outside it (one per server process) so several tabs can
+score the same match, e.g. one on serves and one on rallies.
+
+Writes to a ``SharedMatch`` are serialized by its lock. After each write
+the match publishes a fresh immutable ``snapshot`` dict, so readers that
+only need the score never take the lock. Every session keeps a cursor,
+the journal version it last saw; actions that depend on what the scorer
+was looking at (undo, redo, subs, rotation, ending a set) raise
+``Conflict`` when someone else changed the match since, while appends
+such as points and rallies always go through.
+"""
+
+
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from engine import MatchEngine
+from journal import MatchState
+from models import match_id
+import wal
+
+T = TypeVar("T")
+
+
+class Conflict(Exception):
+    """The match changed since the session last looked at it."""
+
+    def __init__(self, snapshot: dict, message: str = "") -> None:
+        super().__init__(message or "match changed by another scorer")
+        self.snapshot = snapshot
+
+
+class MatchClosed(Conflict):
+    """The match was archived or closed by another session."""
+
+    def __init__(self, snapshot: dict) -> None:
+        super().__init__(snapshot, "match is no longer live")
+
+
+class SharedMatch:
+    """One live match: its engine, journal file and session cursors."""
+
+    def __init__(self, engine: MatchEngine,
+                 match_wal: Optional[wal.MatchWAL] = None) -> None:
+        self.engine = engine
+        self.wal = match_wal
+        self.closed = False
+        self.cursors: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self.snapshot = engine.snapshot()
+
+    @property
+    def match(self) -> Optional[dict]:
+        return self.engine.match
+
+    @property
+    def version(self) -> int:
+        return self.snapshot["version"]
+
+    def submit(self, session: str, action: Callable[[MatchEngine], T],
+               check: bool = False, expected: Optional[int] = None) -> T:
+        """Run ``action`` on the engine under the write lock.
+
+        With ``check``, raise ``Conflict`` if the match moved on since
+        ``session`` last saw it (or since version ``expected``).
+        """
+        with self._lock:
+            if self.closed:
+                raise MatchClosed(self.snapshot)
+            before = self.engine.version
+            seen = self.cursors.get(session, before)
+            if expected is not None:
+                seen = expected
+            if check and seen != before:
+                raise Conflict(self.snapshot)
+            try:
+                return action(self.engine)
+            finally:
+                self.snapshot = self.engine.snapshot()
+                if seen == before:
+                    # Still up to date; otherwise others' changes stay unseen.
+                    self.cursors[session] = self.engine.version
+
+    def read(self, reader: Callable[[MatchEngine], T]) -> T:
+        """Run ``reader`` against a consistent engine state.
+
+        Only needed for data outside ``snapshot`` (rally log, stats).
+        """
+        with self._lock:
+            return reader(self.engine)
+
+    def seen(self, session: str) -> int:
+        """Mark the current version as seen by ``session``; return it."""
+        version = self.snapshot["version"]
+        self.cursors[session] = version
+        return version
+
+    def behind(self, session: str) -> int:
+        """How many changes ``session`` has not seen yet."""
+        return self.version - self.cursors.get(session, self.version)
+
+    def leave(self, session: str) -> None:
+        self.cursors.pop(session, None)
+
+    @property
+    def sessions(self) -> int:
+        return len(self.cursors)
+
+    def close(self, finished: bool = False) -> None:
+        with self._lock:
+            self.closed = True
+            if self.wal is not None:
+                if finished:
+                    self.wal.finish()
+                else:
+                    self.wal.close()
+                self.wal = None
+
+
+class MatchRegistry:
+    """Live matches keyed by match id, journaled under ``data_dir``.
+
+    A registry with a ``data_dir`` holds that dir's journal lock until
+    ``release``; a second one raises ``wal.JournalDirBusy``.
+    """
+
+    def __init__(self, data_dir: Optional[Path] = None) -> None:
+        self.data_dir = Path(data_dir) if data_dir is not None else None
+        self._dir_lock = (wal.lock(self.data_dir)
+                          if self.data_dir is not None else None)
+        self.on_open: List[Callable[[str, SharedMatch], None]] = []
+        self._matches: Dict[str, SharedMatch] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, mid: str) -> bool:
+        return mid in self._matches
+
+    def __len__(self) -> int:
+        return len(self._matches)
+
+    def get(self, mid: str) -> Optional[SharedMatch]:
+        return self._matches.get(mid)
+
+    def live(self) -> List[SharedMatch]:
+        return list(self._matches.values())
+
+    def open(self, match: dict,
+             state: Optional[MatchState] = None) -> SharedMatch:
+        """Join ``match`` if it is live, else start (or resume) it."""
+        mid = match_id(match)
+        with self._lock:
+            shared = self._matches.get(mid)
+            if shared is None:
+                state = state or MatchState()
+                journal, match_wal = None, None
+                if self.data_dir is not None:
+                    journal, match_wal = wal.open_match(self.data_dir,
+                                                        match, state)
+                engine = MatchEngine(match, state.lineup, journal=journal)
+                shared = self._add(mid, SharedMatch(engine, match_wal))
+            return shared
+
+    def recover(self) -> int:
+        """Re-open every unfinished journal on disk; return how many."""
+        if self.data_dir is None:
+            return 0
+        count = 0
+        with self._lock:
+            # Oldest first, so ``live()`` stays in the order matches opened.
+            for path in reversed(wal.unfinished(self.data_dir)):
+                match, journal, _ = wal.load(path)
+                if match is None or match_id(match) in self._matches:
+                    continue
+                match_wal = wal.MatchWAL(path)
+                journal.listeners.append(match_wal)
+                self._add(match_id(match),
+                          SharedMatch(MatchEngine(match, journal=journal),
+                                      match_wal))
+                count += 1
+        return count
+
+    def close(self, mid: str, finished: bool = False) -> None:
+        with self._lock:
+            shared = self._matches.pop(mid, None)
+        if shared is not None:
+            shared.close(finished)
+
+    def release(self) -> None:
+        """Give up the data dir's journal lock (e.g. on shutdown)."""
+        if self._dir_lock is not None:
+            self._dir_lock.close()
+            self._dir_lock = None
+
+    def _add(self, mid: str, shared: SharedMatch) -> SharedMatch:
+        self._matches[mid] = shared
+        for hook in self.on_open:
+            hook(mid, shared)
+        return shared
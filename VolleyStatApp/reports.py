@@ -0,0 +1,73 @@
+"""
+Stat reports over a match's rallies, memoized per rally-log version.
+
+Each report in ``REPORTS`` turns a rally source into a small DataFrame.
+``ReportCache`` keys results by ``(match id, rally version, report)``:
+``RallyLog.version`` changes only when a rally is recorded, undone or
+redone, so points, subs and rotations keep cached reports, while any
+rally change makes every report for that match rebuild on next use.
+"""
+
+
+import os
+from typing import Any, Callable, Dict, Hashable
+
+import numpy as np
+import pandas as pd
+
+from cache import VersionedCache
+from rally_log import MatchLog, RallyLog
+from stats import RallySource, player_stats
+
+REPORT_CACHE_BYTES = int(
+    float(os.environ.get("VSTAT_REPORT_CACHE_MB", "16")) * 1024 * 1024)
+
+
+def rotation_efficiency(source: RallySource) -> pd.DataFrame:
+    """Rallies, points won and lost, and win rate per rotation."""
+    if isinstance(source, (RallyLog, MatchLog)):
+        rotation = np.asarray(source.column("rotation"))
+        point = np.asarray(source.column("point"))
+    else:
+        df = source if isinstance(source, pd.DataFrame) else pd.DataFrame(
+            list(source), columns=["rotation", "point"])
+        rotation = df["rotation"].to_numpy()
+        point = df["point"].to_numpy()
+    table = pd.DataFrame({"rotation": rotation, "rallies": 1,
+                          "won": point == "us", "lost": point == "them"})
+    totals = table.groupby("rotation").sum().astype(np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        totals["win_pct"] = totals["won"] / (totals["won"] + totals["lost"])
+    return totals
+
+
+def serve_receive(source: RallySource) -> pd.DataFrame:
+    """Pass count and average rating for every passer."""
+    stats = player_stats(source)
+    return stats.loc[stats["passes"] > 0, ["passes", "pass_rating"]]
+
+
+REPORTS: Dict[str, Callable[[RallySource], pd.DataFrame]] = {
+    "Player summary": player_stats,
+    "Rotation efficiency": rotation_efficiency,
+    "Serve receive": serve_receive,
+}
+
+
+def frame_sizeof(value: Any) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    return len(value) if isinstance(value, bytes) else 64
+
+
+class ReportCache(VersionedCache):
+    """Report frames keyed by ``(match id, rally version, report name)``."""
+
+    def __init__(self, max_bytes: int = REPORT_CACHE_BYTES) -> None:
+        super().__init__(max_bytes, frame_sizeof)
+
+    def report(self, mid: str, version: Hashable, name: str,
+               source: Callable[[], RallySource]) -> pd.DataFrame:
+        """Return report ``name``, building it from ``source()`` on a miss."""
+        return self.fetch(mid, version, name,
+                          lambda: REPORTS[name](source()))
@@ -0,0 +1,127 @@
+"""
+In-memory index over the teams and rosters.
+
+``RosterIndex`` owns the list of team dicts the app edits and keeps three
+lookup tables in step with it: team name -> team, (team, jersey) ->
+player and position -> players. Every add, remove and import goes
+through the index, so lookups are dict hits instead of list scans.
+Rosters are kept in jersey order as players are added. ``listeners`` are
+called with a team's name after every change to it.
+"""
+
+
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models import Player, Team
+
+PlayerKey = Tuple[str, int]
+
+
+class RosterIndex:
+    """Teams plus name, jersey and position lookup tables."""
+
+    def __init__(self, teams: Iterable[Team] = ()) -> None:
+        self.teams: List[Team] = []
+        self.listeners: List[Callable[[str], None]] = []
+        self._teams: Dict[str, Team] = {}
+        self._players: Dict[PlayerKey, Player] = {}
+        self._positions: Dict[str, Dict[PlayerKey, Player]] = \
+            defaultdict(dict)
+        for team in teams:
+            self.add_team(team)
+
+    def __len__(self) -> int:
+        return len(self.teams)
+
+    def __iter__(self) -> Iterator[Team]:
+        return iter(self.teams)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._teams
+
+    # --- Lookups ---
+    def names(self) -> List[str]:
+        return list(self._teams)
+
+    def team(self, name: str) -> Optional[Team]:
+        return self._teams.get(name)
+
+    def player(self, team: str, jersey: int) -> Optional[Player]:
+        return self._players.get((team, int(jersey)))
+
+    def has_jersey(self, team: str, jersey: int) -> bool:
+        return (team, int(jersey)) in self._players
+
+    def by_position(self, position: str,
+                    team: Optional[str] = None) -> List[Player]:
+        """Players at ``position``, league-wide or for one team."""
+        players = self._positions.get(position, {})
+        if team is None:
+            return list(players.values())
+        return [p for (t, _), p in players.items() if t == team]
+
+    def player_keys(self, position: str) -> List[PlayerKey]:
+        """``(team, jersey)`` of every player at ``position``."""
+        return list(self._positions.get(position, {}))
+
+    # --- Edits ---
+    def _notify(self, team: str) -> None:
+        for listener in self.listeners:
+            listener(team)
+
+    def add_team(self, team: Team) -> Team:
+        """Add a team and index its roster; the name must be new."""
+        if team["name"] in self._teams:
+            raise ValueError(f"A team named {team['name']!r} already exists")
+        team.setdefault("players", []).sort(key=lambda p: int(p["jersey"]))
+        self.teams.append(team)
+        self._teams[team["name"]] = team
+        for player in team["players"]:
+            self._index(team["name"], player)
+        self._notify(team["name"])
+        return team
+
+    def remove_team(self, name: str) -> Optional[Team]:
+        team = self._teams.pop(name, None)
+        if team is None:
+            return None
+        self.teams.remove(team)
+        for player in team["players"]:
+            self._unindex(name, player)
+        self._notify(name)
+        return team
+
+    def add_player(self, team: str, player: Player) -> Player:
+        """Add ``player`` to ``team``; raise ValueError on a used jersey."""
+        player["jersey"] = int(player["jersey"])
+        if self.has_jersey(team, player["jersey"]):
+            raise ValueError(f"Jersey {player['jersey']} is already on "
+                             f"{team}")
+        players = self._teams[team]["players"]
+        at = bisect_right([int(p["jersey"]) for p in players],
+                          player["jersey"])
+        players.insert(at, player)
+        self._index(team, player)
+        self._notify(team)
+        return player
+
+    def remove_player(self, team: str, jersey: int) -> Optional[Player]:
+        player = self._players.get((team, int(jersey)))
+        if player is None:
+            return None
+        self._teams[team]["players"].remove(player)
+        self._unindex(team, player)
+        self._notify(team)
+        return player
+
+    def _index(self, team: str, player: Player) -> None:
+        key = (team, int(player["jersey"]))
+        self._players[key] = player
+        self._positions[player.get("position", "")][key] = player
+
+    def _unindex(self, team: str, player: Player) -> None:
+        key = (team, int(player["jersey"]))
+        self._players.pop(key, None)
+        self._positions[player.get("position", "")].pop(key, None)
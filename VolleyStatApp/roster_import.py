@@ -0,0 +1,130 @@
+"""
+Bulk roster import from CSV or JSON-lines files.
+
+Files are read a line at a time and every row is validated on its own,
+so one bad row is reported (with its line number) instead of failing the
+whole league file. Rows go straight into a ``RosterIndex``, which catches
+duplicate jerseys; the caller saves the teams in ``ImportReport.touched``
+in one batch when the file is done.
+
+CSV columns: ``team, season, name, jersey, position`` (season and
+position optional). JSON lines are either one such player object or a
+whole team ``{"name", "season", "players": [...]}``.
+"""
+
+
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from typing import IO, Dict, Iterable, Iterator, List, Tuple, Union
+
+from models import Player, Team
+from roster import RosterIndex
+
+POSITIONS = ["Setter", "Outside", "Middle", "Right-Side",
+             "Libero", "Defensive", "Utility"]
+_POSITIONS = {p.lower(): p for p in POSITIONS}
+
+# (line number, row dict)
+Row = Tuple[int, dict]
+
+
+@dataclass
+class ImportReport:
+    teams_added: int = 0
+    players_added: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+    touched: Dict[str, Team] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def _text(stream: Union[IO[bytes], IO[str]]) -> IO[str]:
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+
+def csv_rows(stream: Union[IO[bytes], IO[str]]) -> Iterator[Row]:
+    reader = csv.DictReader(_text(stream))
+    for row in reader:
+        yield reader.line_num, {k.strip().lower(): (v or "").strip()
+                                for k, v in row.items() if k}
+
+
+def jsonl_rows(stream: Union[IO[bytes], IO[str]]) -> Iterator[Row]:
+    for line_num, line in enumerate(_text(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_num, {"_error": f"invalid JSON ({e.msg})"}
+            continue
+        if not isinstance(row, dict):
+            yield line_num, {"_error": "expected a JSON object"}
+        elif "players" in row:
+            # A whole team on one line: a header row, then its players.
+            yield line_num, {"team": row.get("name"),
+                             "season": row.get("season", "")}
+            for player in row.get("players") or []:
+                yield line_num, {"team": row.get("name"), **player}
+        else:
+            yield line_num, row
+
+
+def read_rows(stream: Union[IO[bytes], IO[str]],
+              filename: str = "") -> Iterator[Row]:
+    """Pick the reader from the file extension (CSV unless .jsonl)."""
+    if filename.lower().endswith((".jsonl", ".ndjson")):
+        return jsonl_rows(stream)
+    return csv_rows(stream)
+
+
+def _player(row: dict) -> Player:
+    name = str(row.get("name") or "").strip()
+    if not name:
+        raise ValueError("missing player name")
+    try:
+        jersey = int(str(row.get("jersey", "")).strip())
+    except ValueError:
+        raise ValueError(f"bad jersey {row.get('jersey')!r}") from None
+    if not 0 <= jersey <= 99:
+        raise ValueError(f"jersey {jersey} out of range")
+    position = str(row.get("position") or "Utility").strip()
+    if position.lower() not in _POSITIONS:
+        raise ValueError(f"unknown position {position!r}")
+    return {"name": name, "jersey": jersey,
+            "position": _POSITIONS[position.lower()]}
+
+
+def import_rows(roster: RosterIndex, rows: Iterable[Row]) -> ImportReport:
+    """Add every valid row to ``roster``; collect errors per row."""
+    report = ImportReport()
+    for line_num, row in rows:
+        if "_error" in row:
+            report.errors.append((line_num, row["_error"]))
+            continue
+        team_name = str(row.get("team") or "").strip()
+        if not team_name:
+            report.errors.append((line_num, "missing team"))
+            continue
+        team = roster.team(team_name)
+        if team is None:
+            team = roster.add_team({"name": team_name,
+                                    "season": str(row.get("season") or ""),
+                                    "players": []})
+            report.teams_added += 1
+        report.touched[team_name] = team
+        if not row.get("name") and not row.get("jersey"):
+            continue  # team header row
+        try:
+            roster.add_player(team_name, _player(row))
+        except ValueError as e:
+            report.errors.append((line_num, str(e)))
+            continue
+        report.players_added += 1
+    return report
@@ -0,0 +1,64 @@
+"""
+Rotation tables for a six-player lineup.
+
+The lineup is six slots, ``position_1``..``position_6``, in serving order.
+In rotation ``r`` the player in slot ``r`` serves from zone 1 and the
+others follow round the court, so every rotation's zone -> slot map is
+fixed. The tables below are built once at import: server slot, zone map,
+front and back row per rotation, so the live view and stats look them up
+instead of recomputing who is where.
+"""
+
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+ROTATIONS = range(1, 7)
+SLOTS = range(1, 7)
+FRONT_ZONES = (4, 3, 2)
+BACK_ZONES = (5, 6, 1)
+
+# ZONE_SLOT[r - 1, z - 1]: lineup slot standing in zone z in rotation r.
+ZONE_SLOT = np.array([[(r - 1 + z - 1) % 6 + 1 for z in range(1, 7)]
+                      for r in ROTATIONS], dtype=np.int8)
+# SLOT_ZONE[r - 1, s - 1]: zone of lineup slot s in rotation r.
+SLOT_ZONE = np.argsort(ZONE_SLOT, axis=1).astype(np.int8) + 1
+SERVER_SLOT = ZONE_SLOT[:, 0].copy()
+FRONT_ROW: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(int(ZONE_SLOT[r - 1, z - 1]) for z in FRONT_ZONES)
+    for r in ROTATIONS)
+BACK_ROW: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(int(ZONE_SLOT[r - 1, z - 1]) for z in BACK_ZONES)
+    for r in ROTATIONS)
+# IS_FRONT[r - 1, s - 1]: slot s is at the net in rotation r.
+IS_FRONT = np.isin(SLOT_ZONE, FRONT_ZONES)
+
+
+def check_slot(slot: int) -> int:
+    """Return ``slot`` if it names a lineup slot, else raise ValueError."""
+    if slot not in SLOTS:
+        raise ValueError(f"Lineup slot must be 1-6, not {slot!r}")
+    return slot
+
+
+def next_rotation(rotation: int, steps: int = 1) -> int:
+    return (rotation - 1 + steps) % 6 + 1
+
+
+def server_slot(rotation: int) -> int:
+    return int(SERVER_SLOT[rotation - 1])
+
+
+def zone_of(slot: int, rotation: int) -> int:
+    return int(SLOT_ZONE[rotation - 1, slot - 1])
+
+
+def is_front_row(slot: int, rotation: int) -> bool:
+    return bool(IS_FRONT[rotation - 1, slot - 1])
+
+
+def court(lineup: dict, rotation: int) -> Dict[int, Optional[int]]:
+    """Return zone -> jersey for ``lineup`` in ``rotation``."""
+    return {z: lineup.get(f"position_{int(ZONE_SLOT[rotation - 1, z - 1])}")
+            for z in range(1, 7)}
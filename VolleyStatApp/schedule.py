@@ -0,0 +1,101 @@
+"""
+Date-ordered index of scheduled matches.
+
+``ScheduleIndex`` keeps every match under its stable id and a sorted list
+of ``(date, id)`` keys, overall and per team, so "next N matches", date
+ranges and team filters are bisections rather than scans. Dates are ISO
+strings, which sort chronologically. A page of results is sliced from
+the key lists, so only the rows on screen are ever materialized.
+"""
+
+
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models import match_id
+
+Key = Tuple[str, str]
+
+
+class ScheduleIndex:
+    """Scheduled matches by id, ordered by date (ties by id)."""
+
+    def __init__(self, matches: Iterable[dict] = ()) -> None:
+        self._matches: Dict[str, dict] = {}
+        self._keys: List[Key] = []
+        self._by_team: Dict[str, List[Key]] = defaultdict(list)
+        for match in matches:
+            self.add(match)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[dict]:
+        return (self._matches[mid] for _, mid in self._keys)
+
+    def __contains__(self, mid: str) -> bool:
+        return mid in self._matches
+
+    def get(self, mid: str) -> Optional[dict]:
+        return self._matches.get(mid)
+
+    def teams(self) -> List[str]:
+        return sorted(t for t, keys in self._by_team.items() if keys)
+
+    # --- Edits ---
+    def add(self, match: dict) -> dict:
+        """Index ``match``; it keeps (or is given) its ``id``."""
+        mid = match.setdefault("id", match_id(match))
+        if mid in self._matches:
+            raise ValueError(f"Match {mid!r} is already scheduled")
+        key = (str(match.get("date") or ""), mid)
+        self._matches[mid] = match
+        insort(self._keys, key)
+        insort(self._by_team[match.get("our_team", "")], key)
+        return match
+
+    def remove(self, mid: str) -> Optional[dict]:
+        match = self._matches.pop(mid, None)
+        if match is None:
+            return None
+        key = (str(match.get("date") or ""), mid)
+        for keys in (self._keys, self._by_team[match.get("our_team", "")]):
+            del keys[bisect_left(keys, key)]
+        return match
+
+    # --- Queries ---
+    def _range(self, start: Optional[str], end: Optional[str],
+               team: Optional[str]) -> Tuple[List[Key], int, int]:
+        keys = self._keys if team is None else self._by_team.get(team, [])
+        lo = bisect_left(keys, (start, "")) if start else 0
+        hi = bisect_right(keys, (end, "\uffff")) if end else len(keys)
+        return keys, lo, max(lo, hi)
+
+    def count(self, start: Optional[str] = None, end: Optional[str] = None,
+              team: Optional[str] = None) -> int:
+        _, lo, hi = self._range(start, end, team)
+        return hi - lo
+
+    def between(self, start: Optional[str] = None, end: Optional[str] = None,
+                team: Optional[str] = None, offset: int = 0,
+                limit: Optional[int] = None) -> List[dict]:
+        """Matches dated ``start``..``end`` (inclusive), in date order."""
+        keys, lo, hi = self._range(start, end, team)
+        lo += max(0, offset)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return [self._matches[mid] for _, mid in keys[lo:hi]]
+
+    def next(self, n: int, today: str, team: Optional[str] = None
+             ) -> List[dict]:
+        """The first ``n`` matches on or after ``today``."""
+        return self.between(start=today, team=team, limit=n)
+
+    def page(self, page: int, size: int, start: Optional[str] = None,
+             end: Optional[str] = None, team: Optional[str] = None
+             ) -> Tuple[List[dict], int]:
+        """Return page ``page`` (0-based) of a query and the total count."""
+        total = self.count(start, end, team)
+        return self.between(start, end, team, offset=page * size,
+                            limit=size), total
@@ -0,0 +1,78 @@
+"""
+Set and match rules from a scheduled match.
+
+Scheduling records ``set_format`` ("Best of 5", "Best of 3" or "Always
+Play 3"), ``points_to_win`` and ``last_set_points``. ``SetRules`` turns
+those into the two questions the engine asks after every point: has
+this set been won (target reached with a two-point lead), and has the
+match?
+"""
+
+
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+SET_FORMATS = {"Best of 5": (5, False), "Best of 3": (3, False),
+               "Always Play 3": (3, True)}
+
+
+@dataclass(frozen=True)
+class SetRules:
+    sets: int = 5
+    points_to_win: int = 25
+    last_set_points: int = 15
+    # Every set is played even once the match is decided.
+    play_all: bool = False
+
+    @classmethod
+    def from_match(cls, match: Optional[dict]) -> "SetRules":
+        match = match or {}
+        sets, play_all = SET_FORMATS.get(match.get("set_format") or "",
+                                         (cls.sets, cls.play_all))
+        return cls(sets=sets,
+                   points_to_win=int(match.get("points_to_win")
+                                     or cls.points_to_win),
+                   last_set_points=int(match.get("last_set_points")
+                                       or cls.last_set_points),
+                   play_all=play_all)
+
+    @property
+    def sets_to_win(self) -> int:
+        return self.sets // 2 + 1
+
+    def target(self, set_number: int) -> int:
+        """Points needed to take set ``set_number`` (the deciding set is
+        played to ``last_set_points``)."""
+        if set_number >= self.sets:
+            return self.last_set_points
+        return self.points_to_win
+
+    def set_winner(self, set_number: int, us: int, them: int
+                   ) -> Optional[str]:
+        """``"us"``/``"them"`` once a side has the target and leads by 2."""
+        if max(us, them) < self.target(set_number) or abs(us - them) < 2:
+            return None
+        return "us" if us > them else "them"
+
+    def sets_won(self, set_scores: Iterable[Tuple[int, int]]
+                 ) -> Tuple[int, int]:
+        us = them = 0
+        for a, b in set_scores:
+            if a > b:
+                us += 1
+            elif b > a:
+                them += 1
+        return us, them
+
+    def match_winner(self, set_scores: Iterable[Tuple[int, int]]
+                     ) -> Optional[str]:
+        """The side that has won the match on ``set_scores``, if any."""
+        set_scores = list(set_scores)
+        us, them = self.sets_won(set_scores)
+        if self.play_all:
+            if len(set_scores) < self.sets or us == them:
+                return None
+            return "us" if us > them else "them"
+        if max(us, them) < self.sets_to_win:
+            return None
+        return "us" if us > them else "them"
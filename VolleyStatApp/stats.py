@@ -0,0 +1,244 @@
+"""
+Vectorized per-player stats over a rally log.
+
+The rally log's six touch columns are stacked into one long table of
+packed touch codes, unpacked with bit operations and reduced with a single
+groupby, so a season of rallies is summarized without parsing strings.
+"""
+
+
+from typing import Iterable, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from rally_log import MatchLog, RallyLog
+from touches import (TOUCH_COLUMNS, TouchType, TouchResult, encode_column,
+                     encode_touch, unpack, jerseys, types, results)
+
+STAT_COLUMNS = [
+    "kills",
+    "errors",
+    "attacks",
+    "attack_kills",
+    "attack_errors",
+    "attack_eff",
+    "serves",
+    "aces",
+    "serve_errors",
+    "passes",
+    "pass_rating",
+    "blocks",
+    "block_assists",
+]
+
+# Pass score by result code: OK is a good pass, Over gives the ball away.
+_PASS_SCORES = np.full(len(TouchResult), np.nan)
+_PASS_SCORES[TouchResult.OK] = 2.0
+_PASS_SCORES[TouchResult.OVER] = 1.0
+_PASS_SCORES[TouchResult.ERROR] = 0.0
+
+RallySource = Union[RallyLog, MatchLog, pd.DataFrame, Iterable[dict]]
+# Rally-level keys ``player_stats`` can group a live match log by.
+BY_KEYS = ["set", "rotation", "point"]
+
+
+def _as_columns(source: RallySource, keys: Sequence[str]) -> dict:
+    """Return int-coded touch columns plus ``keys`` as numpy arrays."""
+    if isinstance(source, (RallyLog, MatchLog)):
+        cols = {name: np.asarray(source.column(name))
+                for name in TOUCH_COLUMNS}
+        for key in keys:
+            if key == "set" and isinstance(source, MatchLog):
+                cols[key] = source.set_column()
+            else:
+                cols[key] = np.asarray(source.column(key))
+        return cols
+    df = source if isinstance(source, pd.DataFrame) else pd.DataFrame(
+        list(source))
+    cols = {}
+    for name, default in TOUCH_COLUMNS.items():
+        if name not in df.columns:
+            cols[name] = np.zeros(len(df), dtype=np.int32)
+        elif df[name].dtype.kind in "iu":
+            cols[name] = df[name].to_numpy(dtype=np.int32)
+        else:
+            cols[name] = encode_column(df[name], default)
+    for key in keys:
+        cols[key] = df[key].to_numpy()
+    return cols
+
+
+def touch_table(source: RallySource,
+                by: Sequence[str] = ()) -> pd.DataFrame:
+    """Return one row per touch: rally, column, jersey, type, result, *by."""
+    cols = _as_columns(source, by)
+    names = list(TOUCH_COLUMNS)
+    stacked = np.stack([cols[name] for name in names])
+    n_rallies = stacked.shape[1]
+    rally_idx = np.tile(np.arange(n_rallies), len(names))
+    column_idx = np.repeat(np.arange(len(names), dtype=np.int8), n_rallies)
+    codes = stacked.reshape(-1)
+    mask = codes != 0
+    data = {
+        "rally": rally_idx[mask],
+        "column": pd.Categorical.from_codes(column_idx[mask], names),
+        "jersey": jerseys(codes[mask]),
+        "type": types(codes[mask]),
+        "result": results(codes[mask]),
+    }
+    for key in by:
+        data[key] = np.tile(cols[key], len(names))[mask]
+    return pd.DataFrame(data)
+
+
+def player_stats(source: RallySource,
+                 by: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Return per-jersey stats, optionally also grouped by e.g. rotation/set.
+
+    Columns are listed in ``STAT_COLUMNS``; ``attack_eff`` is
+    (attack kills - attack errors) / attacks over Attack touches only
+    (``kills`` also counts e.g. a setter's dump) and ``pass_rating``
+    averages 2 for an OK pass, 1 for an overpass and 0 for an error.
+    """
+    keys = list(by or [])
+    return aggregate(touch_table(source, keys), ["jersey"] + keys)
+
+
+def aggregate(touches: pd.DataFrame,
+              group_keys: Sequence[str]) -> pd.DataFrame:
+    """Reduce a ``touch_table`` to ``STAT_COLUMNS`` per ``group_keys``."""
+    ttype = touches["type"].to_numpy()
+    result = touches["result"].to_numpy()
+    column = touches["column"].cat.codes.to_numpy()
+    names = list(TOUCH_COLUMNS)
+    is_serve = ttype == TouchType.SERVE
+    is_block = ttype == TouchType.BLOCK
+    is_attack = ttype == TouchType.ATTACK
+    is_pass = ttype == TouchType.PASS
+    pass_score = _PASS_SCORES[result]
+    flags = pd.DataFrame({
+        "kills": (result == TouchResult.KILL) & ~is_serve & ~is_block,
+        "errors": result == TouchResult.ERROR,
+        "attacks": is_attack,
+        "attack_kills": is_attack & (result == TouchResult.KILL),
+        "attack_errors": is_attack & (result == TouchResult.ERROR),
+        "serves": is_serve,
+        "aces": is_serve & (result == TouchResult.ACE),
+        "serve_errors": is_serve & (result == TouchResult.ERROR),
+        "passes": is_pass,
+        "pass_points": np.where(is_pass, np.nan_to_num(pass_score), 0.0),
+        "rated_passes": is_pass & ~np.isnan(pass_score),
+        "blocks": column == names.index("touch_block"),
+        "block_assists": column == names.index("touch_block_asst"),
+    })
+    group_keys = list(group_keys)
+    for key in group_keys:
+        flags[key] = touches[key].to_numpy()
+    totals = flags.groupby(group_keys, sort=True).sum()
+    totals = totals.astype({c: np.int64 for c in totals.columns
+                            if c != "pass_points"})
+    with np.errstate(divide="ignore", invalid="ignore"):
+        totals["attack_eff"] = (
+            (totals["attack_kills"] - totals["attack_errors"])
+            / totals["attacks"])
+        totals["pass_rating"] = totals["pass_points"] / totals["rated_passes"]
+    return totals[STAT_COLUMNS]
+
+
+_LIVE_COUNTERS = [
+    "kills",
+    "errors",
+    "attacks",
+    "attack_kills",
+    "attack_errors",
+    "serves",
+    "aces",
+    "serve_errors",
+    "passes",
+    "blocks",
+    "block_assists",
+]
+
+
+def _touch_counters(column: str, ttype: int, result: int) -> list:
+    """Return the live counters one touch contributes to."""
+    hits = []
+    if result == TouchResult.KILL and ttype not in (TouchType.SERVE,
+                                                   TouchType.BLOCK):
+        hits.append("kills")
+    if result == TouchResult.ERROR:
+        hits.append("errors")
+    if ttype == TouchType.ATTACK:
+        hits.append("attacks")
+        if result == TouchResult.KILL:
+            hits.append("attack_kills")
+        elif result == TouchResult.ERROR:
+            hits.append("attack_errors")
+    elif ttype == TouchType.SERVE:
+        hits.append("serves")
+        if result == TouchResult.ACE:
+            hits.append("aces")
+        elif result == TouchResult.ERROR:
+            hits.append("serve_errors")
+    elif ttype == TouchType.PASS:
+        hits.append("passes")
+    if column == "touch_block":
+        hits.append("blocks")
+    elif column == "touch_block_asst":
+        hits.append("block_assists")
+    return hits
+
+
+class LiveStats:
+    """Running per-player and per-rotation totals for the live match.
+
+    ``add`` and ``remove`` touch at most six counters per rally, so the
+    scoreboard can show totals at constant cost however long the match is.
+    """
+
+    def __init__(self) -> None:
+        self.players: dict = {}
+        self.rotations: dict = {}
+
+    def _apply(self, row: dict, sign: int) -> None:
+        rotation = int(row.get("rotation") or 0)
+        rot = self.rotations.get(rotation)
+        if rot is None:
+            rot = self.rotations[rotation] = dict.fromkeys(
+                _LIVE_COUNTERS + ["points_us", "points_them"], 0)
+        if row.get("point") == "us":
+            rot["points_us"] += sign
+        elif row.get("point") == "them":
+            rot["points_them"] += sign
+        for column, default in TOUCH_COLUMNS.items():
+            code = encode_touch(row.get(column), default)
+            if not code:
+                continue
+            jersey, ttype, result = unpack(code)
+            player = self.players.get(jersey)
+            if player is None:
+                player = self.players[jersey] = dict.fromkeys(
+                    _LIVE_COUNTERS, 0)
+            for name in _touch_counters(column, ttype, result):
+                player[name] += sign
+                rot[name] += sign
+
+    def add(self, row: dict) -> None:
+        """Count a newly recorded rally."""
+        self._apply(row, 1)
+
+    def remove(self, row: dict) -> None:
+        """Reverse ``add`` for an undone rally."""
+        self._apply(row, -1)
+
+    def player_frame(self) -> pd.DataFrame:
+        frame = pd.DataFrame.from_dict(self.players, orient="index",
+                                       columns=_LIVE_COUNTERS)
+        frame.index.name = "jersey"
+        return frame.sort_index()
+
+    def rotation_frame(self) -> pd.DataFrame:
+        frame = pd.DataFrame.from_dict(self.rotations, orient="index")
+        frame.index.name = "rotation"
+        return frame.sort_index()
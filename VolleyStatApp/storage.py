@@ -0,0 +1,353 @@
+"""
+SQLite storage for teams, players, the schedule and archived matches.
+
+Every save is a small transaction on the rows that changed (one team's
+players, one match) instead of a rewrite of a whole JSON file. Rallies of
+archived matches are stored with their touches int-coded (see ``touches``)
+and a ``lineup_id`` into the match's ``lineups`` rows instead of six
+position columns; reads join the positions back. The old ``teams.json``
+and ``schedule.json`` files are imported once.
+"""
+
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from lineups import POSITION_COLUMNS, LineupTable
+from models import ARCHIVE_COLUMNS, match_id
+from touches import TOUCH_COLUMNS, encode_touch, decode_touch
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS teams (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    season TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS players (
+    team_id INTEGER NOT NULL REFERENCES teams(id) ON DELETE CASCADE,
+    jersey INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    position TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (team_id, jersey)
+);
+CREATE TABLE IF NOT EXISTS matches (
+    id TEXT PRIMARY KEY,
+    our_team TEXT NOT NULL,
+    opponent TEXT NOT NULL,
+    date TEXT NOT NULL,
+    set_format TEXT,
+    points_to_win INTEGER,
+    last_set_points INTEGER,
+    status TEXT NOT NULL DEFAULT 'scheduled'
+);
+CREATE INDEX IF NOT EXISTS matches_status_date ON matches(status, date);
+CREATE INDEX IF NOT EXISTS matches_team ON matches(our_team);
+CREATE TABLE IF NOT EXISTS lineups (
+    match_id TEXT NOT NULL REFERENCES matches(id) ON DELETE CASCADE,
+    id INTEGER NOT NULL,
+    position_1 INTEGER, position_2 INTEGER, position_3 INTEGER,
+    position_4 INTEGER, position_5 INTEGER, position_6 INTEGER,
+    PRIMARY KEY (match_id, id)
+);
+CREATE TABLE IF NOT EXISTS rallies (
+    match_id TEXT NOT NULL REFERENCES matches(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    lineup_id INTEGER,
+    rotation INTEGER,
+    touch_serve INTEGER, touch_block INTEGER, touch_block_asst INTEGER,
+    touch_1 INTEGER, touch_2 INTEGER, touch_3 INTEGER,
+    sanctions TEXT,
+    point TEXT,
+    "set" INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (match_id, seq)
+);
+"""
+
+MATCH_FIELDS = ["our_team", "opponent", "date", "set_format",
+                "points_to_win", "last_set_points"]
+# Rally columns stored in the rallies table; positions live in lineups.
+_STORED_COLUMNS = [name for name in ARCHIVE_COLUMNS
+                   if name not in POSITION_COLUMNS]
+_STORED_SQL = ", ".join(f'"{name}"' for name in _STORED_COLUMNS)
+_RALLIES_FROM = ("rallies r LEFT JOIN lineups l "
+                 "ON l.match_id = r.match_id AND l.id = r.lineup_id")
+
+
+def _rally_column(name: str) -> str:
+    # Quoted: "set" is an SQL keyword.
+    return f'l."{name}"' if name in POSITION_COLUMNS else f'r."{name}"'
+
+
+class Store:
+    """Thread-safe wrapper around one SQLite database file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Streamlit reruns on different threads; serialize access here.
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # --- Teams ---
+    def load_teams(self) -> List[dict]:
+        with self._lock:
+            teams = {}
+            for row in self._conn.execute(
+                    "SELECT id, name, season FROM teams ORDER BY id"):
+                teams[row["id"]] = {"name": row["name"],
+                                    "season": row["season"], "players": []}
+            for row in self._conn.execute(
+                    "SELECT team_id, jersey, name, position FROM players "
+                    "ORDER BY team_id, jersey"):
+                teams[row["team_id"]]["players"].append(
+                    {"name": row["name"], "jersey": row["jersey"],
+                     "position": row["position"]})
+        return list(teams.values())
+
+    def _team_id(self, name: str) -> Optional[int]:
+        row = self._conn.execute(
+            "SELECT id FROM teams WHERE name = ?", (name,)).fetchone()
+        return row["id"] if row else None
+
+    def upsert_team(self, team: dict) -> None:
+        """Insert or replace one team and its roster in one transaction."""
+        with self._lock, self._conn:
+            self._upsert_team(team)
+
+    def upsert_teams(self, teams: Iterable[dict],
+                     deleted: Iterable[str] = ()) -> None:
+        """Write ``teams`` and delete the ``deleted`` names atomically."""
+        with self._lock, self._conn:
+            for team in teams:
+                self._upsert_team(team)
+            for name in deleted:
+                self._conn.execute("DELETE FROM teams WHERE name = ?",
+                                   (name,))
+
+    def _upsert_team(self, team: dict) -> None:
+        self._conn.execute(
+            "INSERT INTO teams (name, season) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET season = excluded.season",
+            (team["name"], team.get("season", "")))
+        team_id = self._team_id(team["name"])
+        self._conn.execute("DELETE FROM players WHERE team_id = ?",
+                           (team_id,))
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO players "
+            "(team_id, jersey, name, position) VALUES (?, ?, ?, ?)",
+            [(team_id, int(p["jersey"]), p["name"],
+              p.get("position", "")) for p in team.get("players", [])])
+
+    def add_player(self, team_name: str, player: dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO players "
+                "(team_id, jersey, name, position) VALUES (?, ?, ?, ?)",
+                (self._team_id(team_name), int(player["jersey"]),
+                 player["name"], player.get("position", "")))
+
+    def remove_player(self, team_name: str, jersey: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM players WHERE team_id = ? AND jersey = ?",
+                (self._team_id(team_name), int(jersey)))
+
+    def delete_team(self, name: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM teams WHERE name = ?", (name,))
+
+    # --- Matches ---
+    def _match_dict(self, row: sqlite3.Row) -> dict:
+        match = {"id": row["id"]}
+        match.update({f: row[f] for f in MATCH_FIELDS})
+        return match
+
+    def load_matches(self, status: str = "scheduled") -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM matches WHERE status = ? ORDER BY date, id",
+                (status,)).fetchall()
+        return [self._match_dict(r) for r in rows]
+
+    def get_match(self, mid: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM matches WHERE id = ?",
+                                     (mid,)).fetchone()
+        return self._match_dict(row) if row else None
+
+    def add_match(self, match: dict) -> dict:
+        """Insert a scheduled match, assigning it a unique ``id``."""
+        with self._lock, self._conn:
+            return self._add_match(match)
+
+    def _add_match(self, match: dict) -> dict:
+        base = match.get("id") or match_id(match)
+        new_id, n = base, 1
+        while self._conn.execute("SELECT 1 FROM matches WHERE id = ?",
+                                 (new_id,)).fetchone():
+            n += 1
+            new_id = f"{base}-{n}"
+        match["id"] = new_id
+        self._write_match(match, "scheduled")
+        return match
+
+    def _write_match(self, match: dict, status: str) -> None:
+        self._conn.execute(
+            "INSERT INTO matches (id, our_team, opponent, date, "
+            "set_format, points_to_win, last_set_points, status) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            # An upsert, not REPLACE, so the match's rallies don't cascade.
+            "ON CONFLICT(id) DO UPDATE SET our_team = excluded.our_team, "
+            "opponent = excluded.opponent, date = excluded.date, "
+            "set_format = excluded.set_format, "
+            "points_to_win = excluded.points_to_win, "
+            "last_set_points = excluded.last_set_points, "
+            "status = excluded.status",
+            (match_id(match), *[match.get(f) for f in MATCH_FIELDS], status))
+
+    def delete_match(self, mid: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM matches WHERE id = ?", (mid,))
+
+    def archive_match(self, match: dict,
+                      events: Optional[List[dict]] = None) -> None:
+        """Mark a match archived and store its rallies in one transaction."""
+        mid = match_id(match)
+        with self._lock, self._conn:
+            self._write_match(match, "archived")
+            if events is not None:
+                for table in ("rallies", "lineups"):
+                    self._conn.execute(
+                        f"DELETE FROM {table} WHERE match_id = ?", (mid,))
+                self._insert_rallies(mid, events)
+
+    def _insert_rallies(self, mid: str, events: Iterable[dict]) -> None:
+        lineups = LineupTable()
+        rows = [(mid, seq, lineups.intern_row(e), *_encode_row(e))
+                for seq, e in enumerate(events)]
+        self._conn.executemany(
+            f"INSERT INTO rallies (match_id, seq, lineup_id, {_STORED_SQL}) "
+            f"VALUES ({', '.join('?' * (len(_STORED_COLUMNS) + 3))})", rows)
+        self._conn.executemany(
+            f"INSERT INTO lineups (match_id, id, "
+            f"{', '.join(POSITION_COLUMNS)}) VALUES "
+            f"({', '.join('?' * 8)})",
+            [(mid, lid, *jerseys)
+             for lid, jerseys in enumerate(lineups.to_list())])
+
+    def load_rallies(self, mid: str) -> List[dict]:
+        """Return a match's rallies in the wide ``Rally`` schema plus
+        the ``set`` each was played in."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(map(_rally_column, ARCHIVE_COLUMNS))} "
+                f"FROM {_RALLIES_FROM} WHERE r.match_id = ? ORDER BY r.seq",
+                (mid,)).fetchall()
+        return [_decode_row(r) for r in rows]
+
+    def load_lineups(self, mid: str) -> LineupTable:
+        """Return a match's interned lineups; ids match ``lineup_id``."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(POSITION_COLUMNS)} FROM lineups "
+                "WHERE match_id = ? ORDER BY id", (mid,)).fetchall()
+        return LineupTable(tuple(r) for r in rows)
+
+    def scan_rallies(self, columns: Sequence[str],
+                     filters: Optional[Dict[str, Sequence]] = None,
+                     start: Optional[str] = None,
+                     end: Optional[str] = None) -> List[tuple]:
+        """Return ``columns`` of archived rallies, touches int-coded.
+
+        ``columns`` may name rally columns and ``match_id``, ``our_team``,
+        ``opponent`` or ``date``; ``filters`` maps such a column to the
+        values it may take and ``start``/``end`` bound the match date.
+        """
+        def qualify(name: str) -> str:
+            if name == "match_id":
+                return "r.match_id"
+            return f"m.{name}" if name in MATCH_FIELDS else _rally_column(name)
+
+        where, params = ["m.status = 'archived'"], []
+        for name, values in (filters or {}).items():
+            values = list(values)
+            where.append(f"{qualify(name)} IN "
+                         f"({', '.join('?' * len(values))})")
+            params.extend(values)
+        if start:
+            where.append("m.date >= ?")
+            params.append(start)
+        if end:
+            where.append("m.date <= ?")
+            params.append(end)
+        with self._lock:
+            return [tuple(r) for r in self._conn.execute(
+                f"SELECT {', '.join(qualify(c) for c in columns)} "
+                f"FROM {_RALLIES_FROM} JOIN matches m ON m.id = r.match_id "
+                f"WHERE {' AND '.join(where)} ORDER BY r.match_id, r.seq",
+                params)]
+
+    def load_archived(self) -> List[dict]:
+        matches = self.load_matches("archived")
+        for match in matches:
+            match["events"] = self.load_rallies(match["id"])
+        return matches
+
+    # --- Migration ---
+    def migrate_json(self, teams_file: Path, schedule_file: Path) -> bool:
+        """Import the legacy JSON files once; return True if it ran."""
+        with self._lock:
+            if self._conn.execute(
+                    "SELECT 1 FROM meta WHERE key = 'json_migrated'"
+                    ).fetchone():
+                return False
+            with self._conn:
+                if Path(teams_file).exists():
+                    with Path(teams_file).open("r", encoding="utf-8") as f:
+                        for team in json.load(f):
+                            self._upsert_team(team)
+                if Path(schedule_file).exists():
+                    with Path(schedule_file).open("r", encoding="utf-8") as f:
+                        for match in json.load(f):
+                            self._add_match(match)
+                self._conn.execute(
+                    "INSERT INTO meta (key, value) "
+                    "VALUES ('json_migrated', '1')")
+        return True
+
+
+def _encode_row(event: dict) -> list:
+    values = []
+    for name in _STORED_COLUMNS:
+        value = event.get(name)
+        if name in TOUCH_COLUMNS:
+            value = encode_touch(value, TOUCH_COLUMNS[name])
+        elif name == "set":
+            value = int(value or 1)
+        values.append(value)
+    return values
+
+
+def _decode_row(row: sqlite3.Row) -> dict:
+    event = {}
+    for name in ARCHIVE_COLUMNS:
+        value = row[name]
+        if name in TOUCH_COLUMNS:
+            value = decode_touch(value or 0, TOUCH_COLUMNS[name])
+        event[name] = value
+    return event
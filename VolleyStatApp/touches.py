@@ -0,0 +1,180 @@
+"""
+Integer coding for rally touches.
+
+A touch such as ``"10:Pass:OK"`` (or ``"10:Ace"`` for a serve) is packed
+into one int32: ``jersey << 16 | type << 8 | result``. Code 0 means "no
+touch", so missing cells stay cheap and season-wide stats become array
+operations on the packed column instead of string splitting per row.
+"""
+
+
+from enum import IntEnum
+from functools import lru_cache
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class TouchType(IntEnum):
+    SERVE = 1
+    DIG = 2
+    PASS = 3
+    SET = 4
+    ATTACK = 5
+    BLOCK = 6
+
+
+class TouchResult(IntEnum):
+    NONE = 0
+    OK = 1
+    ERROR = 2
+    KILL = 3
+    OVER = 4
+    ACE = 5
+    RETURN = 6
+
+
+NO_TOUCH = 0
+_JERSEY_SHIFT = 16
+_TYPE_SHIFT = 8
+_MASK = 0xFF
+
+_TYPE_BY_LABEL = {t.name.title(): t for t in TouchType}
+_RESULT_BY_LABEL = {r.name.title(): r for r in TouchResult if r}
+# "OK" is the one label that isn't title case in the UI.
+_RESULT_BY_LABEL["OK"] = _RESULT_BY_LABEL.pop("Ok")
+_LABEL_BY_RESULT = {r: label for label, r in _RESULT_BY_LABEL.items()}
+
+
+def type_label(code: int) -> str:
+    return TouchType(code).name.title()
+
+
+def result_label(code: int) -> str:
+    return _LABEL_BY_RESULT[TouchResult(code)]
+
+
+def pack(jersey: int, touch_type: int, result: int = 0) -> int:
+    """Pack jersey, type and result codes into a single int."""
+    if not 0 <= jersey <= 0x7FFF:
+        raise ValueError(f"jersey out of range: {jersey}")
+    return (jersey << _JERSEY_SHIFT) | (int(touch_type) << _TYPE_SHIFT) \
+        | int(result)
+
+
+def unpack(code: int) -> tuple:
+    """Return ``(jersey, type, result)`` codes for one packed touch."""
+    code = int(code)
+    return (code >> _JERSEY_SHIFT, (code >> _TYPE_SHIFT) & _MASK,
+            code & _MASK)
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and value != value) \
+        or value == ""
+
+
+def encode_touch(value, default_type: Optional[TouchType] = None) -> int:
+    """Encode a ``"jersey:Type:Result"`` string (or ``"jersey:Result"``).
+
+    Two-part strings need ``default_type`` (the serve column stores
+    ``"10:Ace"``). Missing values encode to ``NO_TOUCH``.
+    """
+    if value is None or _is_missing(value):
+        return NO_TOUCH
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return _encode_str(str(value), default_type)
+
+
+@lru_cache(maxsize=4096)
+def _encode_str(value: str, default_type: Optional[TouchType]) -> int:
+    # A season has only a few thousand distinct touch strings.
+    parts = value.split(":")
+    try:
+        if len(parts) == 3:
+            jersey, ttype, result = parts
+            return pack(int(jersey), _TYPE_BY_LABEL[ttype],
+                        _RESULT_BY_LABEL[result] if result else 0)
+        if len(parts) == 2 and default_type is not None:
+            jersey, result = parts
+            return pack(int(jersey), default_type,
+                        _RESULT_BY_LABEL[result] if result else 0)
+    except (KeyError, ValueError):
+        pass
+    raise ValueError(f"Unrecognized touch: {value!r}")
+
+
+def decode_touch(code: int, default_type: Optional[TouchType] = None
+                 ) -> Optional[str]:
+    """Inverse of ``encode_touch``; ``NO_TOUCH`` decodes to None."""
+    if int(code) == NO_TOUCH:
+        return None
+    jersey, ttype, result = unpack(code)
+    result_txt = result_label(result) if result else ""
+    if default_type is not None and ttype == default_type:
+        return f"{jersey}:{result_txt}"
+    return f"{jersey}:{type_label(ttype)}:{result_txt}"
+
+
+def encode_column(values: Iterable,
+                  default_type: Optional[TouchType] = None) -> np.ndarray:
+    """Encode an iterable of touch strings to an int32 array."""
+    return np.fromiter((encode_touch(v, default_type) for v in values),
+                       dtype=np.int32)
+
+
+def decode_column(codes: np.ndarray,
+                  default_type: Optional[TouchType] = None) -> np.ndarray:
+    """Decode an int32 array back to an object array of touch strings."""
+    codes = np.asarray(codes)
+    out = np.empty(len(codes), dtype=object)
+    # A match only has a few dozen distinct touches, so decode each once.
+    uniq, inverse = np.unique(codes, return_inverse=True)
+    labels = np.array([decode_touch(c, default_type) for c in uniq],
+                      dtype=object)
+    out[:] = labels[inverse.reshape(-1)]
+    return out
+
+
+def jerseys(codes: np.ndarray) -> np.ndarray:
+    return (np.asarray(codes) >> _JERSEY_SHIFT).astype(np.int16)
+
+
+def types(codes: np.ndarray) -> np.ndarray:
+    return ((np.asarray(codes) >> _TYPE_SHIFT) & _MASK).astype(np.int8)
+
+
+def results(codes: np.ndarray) -> np.ndarray:
+    return (np.asarray(codes) & _MASK).astype(np.int8)
+
+
+# Rally columns holding touches, with the type implied by two-part strings.
+TOUCH_COLUMNS = {
+    "touch_serve": TouchType.SERVE,
+    "touch_block": TouchType.BLOCK,
+    "touch_block_asst": TouchType.BLOCK,
+    "touch_1": None,
+    "touch_2": None,
+    "touch_3": None,
+}
+
+
+def encode_frame(df):
+    """Return a copy of a rally DataFrame with touch columns int-coded."""
+    out = df.copy()
+    for name, default in TOUCH_COLUMNS.items():
+        if name in out.columns:
+            out[name] = encode_column(out[name], default)
+    return out
+
+
+def decode_frame(df):
+    """Return a copy of an int-coded rally DataFrame with string touches."""
+    out = df.copy()
+    for name, default in TOUCH_COLUMNS.items():
+        if name in out.columns:
+            out[name] = pd.Series(decode_column(out[name].to_numpy(), default),
+                                  index=out.index, dtype=object)
+    return out
@@ -5,57 +5,64 @@ Developed by Robert Patchin with assistance from
 """
 
 
-from dataclasses import asdict, dataclass
 from datetime import date
-from typing import Optional, TypedDict, List, cast
+from typing import List, Optional, cast
 from pathlib import Path
 
 import os
+import sys
 import json
+import threading
+import time
+import uuid
 import pandas as pd
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
-
-@dataclass
-class Rally:
-    """Data class representing a single rally sequence."""
-    position_1: int
-    position_2: int
-    position_3: int
-    position_4: int
-    position_5: int
-    position_6: int
-    rotation: int
-    touch_serve: Optional[str] = None
-    touch_block: Optional[str] = None
-    touch_block_asst: Optional[str] = None
-    touch_1: Optional[str] = None
-    touch_2: Optional[str] = None
-    touch_3: Optional[str] = None
-    sanctions: Optional[str] = None
-    point: Optional[str] = None
-
-class Player(TypedDict):
-    name: str
-    jersey: int
-    position: str
-
-class Team(TypedDict):
-    name: str
-    season: str
-    players: List[Player]
+from models import Team, match_id
+from broadcast import Broadcaster
+from engine import MatchEngine
+from journal import MatchState
+from storage import Store
+from cache import ExportCache
+from reports import REPORTS, ReportCache
+from profiler import PROFILE_ENV, Profiler
+from roster import RosterIndex
+from schedule import ScheduleIndex
+from autosave import Autosaver
+from roster_import import POSITIONS, import_rows, read_rows
+from registry import Conflict, MatchClosed, MatchRegistry, SharedMatch
+from rotation import BACK_ROW, FRONT_ROW
+from touches import TOUCH_COLUMNS
+import analytics
+import archive
 
 st.set_page_config(page_title="VStat",
                    layout="wide",
                    page_icon=":volleyball:")
 st.title("🏐 VolleyStat")
 
-tabs = st.tabs([
+# Per session: the toggle and samples of one browser tab stay its own.
+if "profiler" not in st.session_state:
+    st.session_state.profiler = Profiler(enabled=PROFILE_ENV)
+PROFILER = st.session_state.profiler
+PROFILER.enabled = PROFILE_ENV or st.session_state.get("profile_reruns",
+                                                       False)
+rerun_started = time.perf_counter()
+
+# Only the selected view's code runs on a rerun; the others do no work.
+VIEW_NAMES = [
     "Team Setup",
     "Schedule",
     "Live Track",
-    "Archive"
-])
+    "Archive",
+    "Season"
+]
+if "next_view" in st.session_state:
+    # Set by actions (e.g. Start Match) before the picker is drawn.
+    st.session_state.view = st.session_state.pop("next_view")
+view = st.radio("View", VIEW_NAMES, key="view", horizontal=True,
+                label_visibility="collapsed")
 
 
 # -----------------------------------------------------------------------------
@@ -67,62 +74,147 @@ tabs = st.tabs([
 DATA_DIR = Path.cwd() / ".vstat_data"
 TEAMS_FILE = DATA_DIR / "teams.json"
 SCHEDULE_FILE = DATA_DIR / "schedule.json"
+DB_FILE = DATA_DIR / "vstat.db"
+# Port for the scoring API/viewer socket served from this process, if any.
+# Don't also run main.py over the same data directory: both processes
+# would recover and append to the same match journals (the second one to
+# open it fails with wal.JournalDirBusy).
+LIVE_PORT = os.environ.get("VSTAT_LIVE_PORT")
 
 def _ensure_data_dir() -> None:
     DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+@st.cache_resource
+def get_store() -> Store:
+    """Open the shared SQLite store, importing legacy JSON files once."""
+    store = Store(DB_FILE)
+    store.migrate_json(TEAMS_FILE, SCHEDULE_FILE)
+    return store
+
+@st.cache_resource
+def get_registry() -> MatchRegistry:
+    """Live matches shared by every browser session of this server."""
+    registry = MatchRegistry(DATA_DIR)
+    broadcaster = get_broadcaster()
+    broadcaster.watch(registry)
+    # Matches left unfinished by a previous server process.
+    registry.recover()
+    if LIVE_PORT:
+        serve_live(registry, broadcaster, int(LIVE_PORT))
+    return registry
+
+@st.cache_resource
+def get_broadcaster() -> Broadcaster:
+    """Live-score deltas of every match scored in this server process."""
+    return Broadcaster()
+
+def serve_live(registry: MatchRegistry, broadcaster: Broadcaster,
+               port: int) -> None:
+    """Serve this process's matches over the HTTP API on ``port``.
+
+    Viewers then follow matches scored here at ``/ws/matches/<id>``.
+    """
+    root = str(Path(__file__).resolve().parent.parent)
+    if root not in sys.path:
+        sys.path.append(root)
+    from app import create_app, run_async
+
+    api = create_app(DATA_DIR, live=registry, broadcaster=broadcaster)
+    threading.Thread(target=run_async, args=(api,), kwargs={"port": port},
+                     name="vstat-live", daemon=True).start()
+
+def session_id() -> str:
+    """Stable id of this browser session, used as its registry cursor."""
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
+
+def idle_match() -> SharedMatch:
+    """A private, unjournaled match for sessions not scoring anything."""
+    return SharedMatch(MatchEngine())
+
+def recover_live_match() -> None:
+    """Join the most recently opened live match, if any."""
+    try:
+        live = get_registry().live()
+    except Exception:
+        st.error("Failed to recover the unfinished match journal")
+        return
+    if live:
+        shared = live[-1]
+        st.session_state.current_match = shared.match
+        st.session_state.shared = shared
+        shared.seen(session_id())
+
+def close_live_match(finished: bool = False) -> None:
+    """Leave the session's live match; finishing it ends it for everyone."""
+    shared = st.session_state.shared
+    if shared.match is not None:
+        if finished:
+            get_registry().close(match_id(shared.match), finished=True)
+        else:
+            shared.leave(session_id())
+    st.session_state.shared = idle_match()
+
+def submit(action, check: bool = False):
+    """Apply ``action`` to the session's match engine under its lock.
+
+    With ``check``, the action is refused if another scorer changed the
+    match since this session last drew it; returns None in that case.
+    """
+    try:
+        return st.session_state.shared.submit(session_id(), action,
+                                              check=check)
+    except MatchClosed:
+        st.session_state.current_match = None
+        st.session_state.shared = idle_match()
+        st.session_state.flash = "This match was archived by another scorer."
+        st.rerun()
+    except Conflict:
+        st.session_state.flash = ("Another scorer changed the match first; "
+                                  "check the score and try again.")
+        st.rerun()
+
 def initialize_state() -> None:
     """Initialize session state variables."""
-    if "teams" not in st.session_state:
+    if "roster" not in st.session_state:
         try:
-            if TEAMS_FILE.exists():
-                with TEAMS_FILE.open("r", encoding="utf-8") as f:
-                    st.session_state.teams = json.load(f)
-            else:
-                st.session_state.teams = []
+            st.session_state.roster = RosterIndex(get_store().load_teams())
         except Exception:
-            st.session_state.teams = []
+            st.session_state.roster = RosterIndex()
+    if "autosave" not in st.session_state:
+        # Roster edits are written in the background shortly after.
+        st.session_state.autosave = Autosaver(st.session_state.roster,
+                                              get_store())
     if "matches" not in st.session_state:
         try:
-            if SCHEDULE_FILE.exists():
-                with SCHEDULE_FILE.open("r", encoding="utf-8") as f:
-                    st.session_state.matches = json.load(f)
-            else:
-                st.session_state.matches = []
+            st.session_state.matches = ScheduleIndex(
+                get_store().load_matches())
         except Exception:
-            st.session_state.matches = []
+            st.session_state.matches = ScheduleIndex()
     if "archived_matches" not in st.session_state:
-        st.session_state.archived_matches = []
+        try:
+            st.session_state.archived_matches = get_store().load_matches(
+                "archived")
+        except Exception:
+            st.session_state.archived_matches = []
     if "current_match" not in st.session_state:
         st.session_state.current_match = None
-    if "lineup" not in st.session_state:
-        st.session_state.lineup = {
-            f"position_{i}": i for i in range(1, 7)
-        }
-    if "rotation" not in st.session_state:
-        st.session_state.rotation = 1
-    if "score_us" not in st.session_state:
-        st.session_state.score_us = 0
-    if "score_them" not in st.session_state:
-        st.session_state.score_them = 0
-    if "events" not in st.session_state:
-        st.session_state.events = []
-    if "df" not in st.session_state:
-        cols = [f"position_{i}" for i in range(1, 7)] + [
-            "rotation",
-            "touch_serve",
-            "touch_block",
-            "touch_block_asst",
-            "touch_1",
-            "touch_2",
-            "touch_3",
-            "sanctions",
-            "point",
-        ]
-        st.session_state.df = pd.DataFrame(columns=cols)
-
-
-initialize_state()
+    if "export_cache" not in st.session_state:
+        st.session_state.export_cache = ExportCache()
+    if "report_cache" not in st.session_state:
+        st.session_state.report_cache = ReportCache()
+    if "shared" not in st.session_state:
+        st.session_state.shared = idle_match()
+        recover_live_match()
+    elif st.session_state.shared.closed:
+        # Archived from another session.
+        st.session_state.current_match = None
+        st.session_state.shared = idle_match()
+
+
+with PROFILER.section("init_state"):
+    initialize_state()
 
 # -----------------------------------------------------------------------------
 # Team Management
@@ -131,54 +223,73 @@ initialize_state()
 # --- Helper Utilities ---
 def get_team_names() -> list:
     """Return list of team names in session state."""
-    # help the type checker: ensure teams has the expected shape
-    st.session_state.teams = cast(List[Team], st.session_state.get("teams", []))
-    return [t["name"] for t in st.session_state.teams]
+    return st.session_state.roster.names()
 
-def find_team(name: str):
+def find_team(name: str) -> Optional[Team]:
     """Return team dict by name or None."""
-    return next((t for t in st.session_state.teams if t["name"] == name), None)
+    return st.session_state.roster.team(name)
 
 def export_team(team: dict) -> bytes:
     """Return team dict serialized as JSON bytes for download."""
     return json.dumps(team, indent=2).encode("utf-8")
 
+@PROFILER.timed("save:teams")
 def save_teams_to_disk() -> None:
-    """Save teams to disk as JSON file in user data dir."""
-    try:
-        _ensure_data_dir()
-        tmp = TEAMS_FILE.with_suffix(".tmp")
-        with tmp.open("w", encoding="utf-8") as f:
-            json.dump(st.session_state.teams, f, indent=2)
-        tmp.replace(TEAMS_FILE)
-    except Exception:
+    """Write pending roster edits to the SQLite store now."""
+    autosave = st.session_state.autosave
+    autosave.flush()
+    if autosave.last_error is not None:
         st.error("Failed to save teams to disk")
-        pass
 
 def import_team_file(uploaded) -> None:
     """Import a team from uploaded JSON file-like object."""
     try:
         data = json.load(uploaded)
         if isinstance(data, dict) and "name" in data and "players" in data:
-            if any(t["name"] == data["name"] for t in st.session_state.teams):
+            if data["name"] in st.session_state.roster:
                 st.error("A team with that name already exists")
             else:
-                st.session_state.teams.append(data)
+                st.session_state.roster.add_team(data)
                 save_teams_to_disk()
                 st.success("Team imported")
-                st.experimental_rerun()
+                st.rerun()
         else:
             st.error("Invalid team file format")
     except Exception as e:
         st.error(f"Import failed: {e}")
 
+def bulk_import_file(uploaded) -> None:
+    """Stream a league roster file into the roster; save once at the end."""
+    rows = read_rows(uploaded, uploaded.name)
+    # Paused, the autosaver can't flush half an import; it saves on exit.
+    with st.session_state.autosave.paused(), \
+            PROFILER.section("import:rosters"):
+        report = import_rows(st.session_state.roster, rows)
+    if report.touched:
+        save_teams_to_disk()
+    st.session_state.import_report = report
+    st.rerun()
+
+def show_import_report() -> None:
+    report = st.session_state.pop("import_report", None)
+    if report is None:
+        return
+    st.success(f"Imported {report.players_added} players "
+               f"({report.teams_added} new teams)")
+    if report.errors:
+        st.warning(f"{len(report.errors)} rows skipped")
+        st.dataframe(pd.DataFrame(report.errors, columns=["line", "error"]),
+                     use_container_width=True, hide_index=True)
+
 # --- Team Management Page ---
-with tabs[0]:
+def team_setup_view() -> None:
+    """Render the team and roster management view."""
     st.header("Team Management")
 
     st.subheader("Teams & Rosters")
+    roster = st.session_state.roster
     team_names = get_team_names()
-    for t_idx, team in enumerate(st.session_state.teams):
+    for t_idx, team in enumerate(roster.teams):
         with st.expander(f"{team['name']} ({team.get('season','')})"):
             st.write("Roster")
             for p_idx, p in enumerate(team["players"]):
@@ -188,14 +299,11 @@ with tabs[0]:
                 cols[2].write(p["position"])
                 if cols[3].button("Remove",
                                   key=f"remove_{t_idx}_{p_idx}"):
-                    team["players"].pop(p_idx)
-                    #save_teams_to_disk()
-                    st.experimental_rerun()
+                    roster.remove_player(team["name"], p["jersey"])
+                    st.rerun()
 
             st.markdown("Add player")
-            positions = ["Setter", "Outside",
-                         "Middle", "Right-Side",
-                         "Libero", "Defensive", "Utility"]
+            positions = POSITIONS
             cols = st.columns([1, 3, 3, 1])
             with cols[0]:
                 pjersey = st.number_input("Jersey",
@@ -209,10 +317,11 @@ with tabs[0]:
                                 options=positions)
             with cols[3]:
                 if st.button("Add Player", key=f"addplayer{t_idx}") and pname:
-                    if any(x["jersey"] == pjersey for x in team["players"]):
+                    if roster.has_jersey(team["name"], pjersey):
                         st.error("Duplicate jersey")
                     else:
-                        team["players"].append(
+                        roster.add_player(
+                            team["name"],
                             {
                                 "name": pname,
                                 "jersey": int(pjersey),
@@ -220,27 +329,29 @@ with tabs[0]:
                             }
                         )
                         st.success("Player added")
-                        #save_teams_to_disk()
-                        st.experimental_rerun()
-    if team_names:
-        if st.button("Save Changes"):
-            for t_idx, team in enumerate(st.session_state.teams):
-                team["players"] = sorted(
-                    team["players"], key=lambda p: p["jersey"]
-                )
+                        st.rerun()
+    autosave = st.session_state.autosave
+    if autosave.last_error is not None:
+        st.error(f"Saving teams failed: {autosave.last_error}")
+    if autosave.pending:
+        st.caption(f"{autosave.pending} team(s) with unsaved edits "
+                   "(saved automatically)")
+        if st.button("Save Now"):
             save_teams_to_disk()
             st.success("Changes saved")
     st.markdown("---")        
     st.subheader("Create New Team")
-    team_name = st.text_input("Team name")
-    season = st.text_input("Season")
+    team_name = st.text_input("Team name", key="new_team_name")
+    season = st.text_input("Season", key="new_team_season")
     if st.button("Create Team") and team_name:
-        st.session_state.teams.append(
-            {"name": team_name, "season": season, "players": []}
-        )
-        #save_teams_to_disk()
-        st.success("Team created")
-        st.experimental_rerun()
+        if team_name in roster:
+            st.error("A team with that name already exists")
+        else:
+            roster.add_team(
+                {"name": team_name, "season": season, "players": []}
+            )
+            st.success("Team created")
+            st.rerun()
 
     st.markdown("---")
     st.subheader("Import / Export Team")
@@ -248,8 +359,20 @@ with tabs[0]:
     if uploaded is not None:
         import_team_file(uploaded)
 
+    st.markdown("League roster file: one player per row with columns "
+                "`team, season, name, jersey, position` (CSV), or one "
+                "player or team object per line (JSON lines).")
+    bulk = st.file_uploader("Bulk import rosters",
+                            type=["csv", "jsonl", "ndjson"],
+                            key="bulk_import")
+    if bulk is not None and st.button("Import Rosters"):
+        bulk_import_file(bulk)
+    show_import_report()
+
     if team_names:
-        sel = st.selectbox("Export team", options=[""] + team_names, key="export_team_select")
+        drop_stale_choice("export_team_select", [""] + team_names)
+        sel = st.selectbox("Export team", options=[""] + team_names,
+                           key="export_team_select")
         if sel:
             team_obj = find_team(sel)
             if team_obj:
@@ -265,25 +388,42 @@ with tabs[0]:
 # -----------------------------------------------------------------------------
 
 # --- Helper Utilities ---
-def save_matches_to_disk() -> None:
-    """Save matches to disk as JSON file in user data dir."""
+@PROFILER.timed("save:match")
+def save_match_to_disk(match: dict) -> None:
+    """Add a newly scheduled match to the SQLite store."""
     try:
-        _ensure_data_dir()
-        tmp = SCHEDULE_FILE.with_suffix(".tmp")
-        with tmp.open("w", encoding="utf-8") as f:
-            json.dump(st.session_state.matches, f, indent=2)
-        tmp.replace(SCHEDULE_FILE)
+        get_store().add_match(match)
     except Exception:
         st.error("Failed to save schedule to disk")
         pass
 
+@PROFILER.timed("save:archive")
+def archive_match_to_disk(match: dict,
+                          events: Optional[pd.DataFrame] = None) -> None:
+    """Mark a match archived, writing its rallies if any were recorded.
+
+    Rallies go to the Parquet archive, or to SQLite without pyarrow.
+    """
+    try:
+        if events is not None and archive.available():
+            archive.write_match(DATA_DIR, match, events)
+            events = None
+        get_store().archive_match(
+            match, None if events is None else events.to_dict("records"))
+    except Exception:
+        st.error("Failed to save archive to disk")
+        pass
+
+SCHEDULE_PAGE_SIZE = 20
+
 # --- Scheduling Page ---
-with tabs[1]:
+def schedule_view() -> None:
+    """Render the scheduling view."""
     st.header("Scheduling")
     with st.form("add_match"):
         our_team = st.selectbox(
             "Our Team",
-            options=[""] + [t["name"] for t in st.session_state.teams],
+            options=[""] + get_team_names(),
         )
         opponent = st.text_input("Opponent")
         #match_date = st.date_input("Date", value=date.today())
@@ -303,25 +443,45 @@ with tabs[1]:
                 "points_to_win": int(points_to_win),
                 "last_set_points": int(last_set_points),
             }
-            st.session_state.matches.append(match_dict)
-            save_matches_to_disk()
+            save_match_to_disk(match_dict)
+            st.session_state.matches.add(match_dict)
             st.success("Match scheduled")
 
     st.markdown("---")
     st.subheader("Upcoming Matches")
-    for m_idx, match in enumerate(st.session_state.matches):
+    schedule = st.session_state.matches
+    f1, f2, f3 = st.columns([2, 1, 1])
+    team_options = ["All teams"] + schedule.teams()
+    drop_stale_choice("schedule_team", team_options)
+    team_filter = f1.selectbox("Team", team_options, key="schedule_team")
+    hide_past = f2.checkbox("Hide past matches", key="schedule_hide_past")
+    query = {
+        "team": None if team_filter == "All teams" else team_filter,
+        "start": date.today().isoformat() if hide_past else None,
+    }
+    pages = max(1, -(-schedule.count(**query) // SCHEDULE_PAGE_SIZE))
+    if st.session_state.get("schedule_page", 1) > pages:
+        # A kept page from before the filter (or schedule) changed.
+        st.session_state.schedule_page = pages
+    page = f3.number_input("Page", min_value=1, max_value=pages,
+                           key="schedule_page") if pages > 1 else 1
+    # Only the rows on this page create widgets.
+    rows, total = schedule.page(int(page) - 1, SCHEDULE_PAGE_SIZE, **query)
+    if total == 0:
+        st.info("No matches scheduled.")
+    elif pages > 1:
+        st.caption(f"{total} matches, page {page} of {pages}")
+    for match in rows:
+        mid = match_id(match)
         cols = st.columns([3, 1, 1])
         cols[0].write(
             f"{match['our_team']} vs {match['opponent']} "
             f"— {match['date']}"
         )
-        if cols[1].button("Start Match", key=f"start_{m_idx}"):
+        if cols[1].button("Start Match", key=f"start_{mid}"):
             st.session_state.current_match = match
-            team = next(
-                (t for t in st.session_state.teams
-                 if t["name"] == match["our_team"]),
-                None,
-            )
+            team = find_team(match["our_team"])
+            state = MatchState()
             if team:
                 players = sorted(
                     team["players"], key=lambda p: p["jersey"]
@@ -331,21 +491,302 @@ with tabs[1]:
                         jersey = players[i - 1]["jersey"]
                     else:
                         jersey = i
-                    st.session_state.lineup[f"position_{i}"] = jersey
-            st.experimental_rerun()
-        if cols[2].button("Archive", key=f"archive_{m_idx}"):
+                    state.lineup[f"position_{i}"] = jersey
+            close_live_match()
+            try:
+                _ensure_data_dir()
+                # Joins the match instead if another session started it.
+                shared = get_registry().open(match, state)
+            except Exception:
+                st.error("Failed to open the match journal on disk")
+                shared = SharedMatch(MatchEngine(match, state.lineup))
+            shared.seen(session_id())
+            st.session_state.shared = shared
+            st.session_state.next_view = "Live Track"
+            st.rerun()
+        if cols[2].button("Archive", key=f"archive_{mid}"):
+            current = st.session_state.current_match
+            events = None
+            live = get_registry().get(mid)
+            if live is not None:
+                # Possibly being scored from another session.
+                events = live.read(lambda e: e.rally_log.to_frame())
+                get_registry().close(mid, finished=True)
+            if current and match_id(current) == mid:
+                st.session_state.current_match = None
+                st.session_state.shared = idle_match()
             st.session_state.archived_matches.append(match)
-            st.session_state.matches.pop(m_idx)
-            save_matches_to_disk()
+            schedule.remove(mid)
+            archive_match_to_disk(match, events)
+            st.session_state.export_cache.invalidate(mid)
             st.success("Match archived")
-            st.experimental_rerun()
+            st.rerun()
 
 # -----------------------------------------------------------------------------
 # Game Tracking
 # -----------------------------------------------------------------------------
 
+# --- Helper Utilities ---
+def record_substitution(position: int) -> None:
+    """Journal a lineup change made in a position number_input."""
+    jersey = int(st.session_state[f"pos{position}"])
+    # A callback can't st.rerun(); a refused sub just redraws the lineup.
+    try:
+        st.session_state.shared.submit(
+            session_id(), lambda e: e.substitute(position, jersey),
+            check=True)
+    except Conflict:
+        st.session_state.flash = ("Another scorer changed the match first; "
+                                  "the substitution was not made.")
+
+# --- Game Tracking Panels ---
+# Live Track is two fragments: scoring (scoreboard, serve and rally entry,
+# the log tail) and rotation & subs. A fragment in Streamlit 1.37 can only
+# rerun itself or the whole app, so each panel records the state it drew
+# and an action reruns just its own panel unless the other one is now
+# stale. Points, serves and rallies stay in the scoring panel except when
+# they rotate us (our side-out), end a set or take the libero off, since
+# the rotation panel shows the rotation, subs and lineup. Subs and libero
+# swaps change the rally pickers' players, so they rerun the app too.
+# Engines are shared with other sessions scoring the same match: writes go
+# through ``submit`` and reads of the score use the lock-free snapshot.
+def scoring_state(snapshot: dict) -> tuple:
+    """What the scoring panel draws that the rotation panel can change."""
+    return tuple(snapshot["lineup"].items()), snapshot["winner"]
+
+def rotation_state(snapshot: dict) -> tuple:
+    """What the rotation panel draws that scoring can change."""
+    return (tuple(snapshot["lineup"].items()), snapshot["rotation"],
+            snapshot["set_number"], snapshot["subs"], snapshot["libero"],
+            snapshot["libero_slot"])
+
+def rerun_panel(other: str, state: tuple) -> None:
+    """Rerun the calling fragment, or the app if the ``other`` panel drew
+    a different ``state`` or this is a full run (where a fragment-scoped
+    rerun is not allowed)."""
+    ctx = get_script_run_ctx()
+    if (st.session_state.get(other) != state
+            or ctx is None or not ctx.fragment_ids_this_run):
+        st.rerun()
+    st.rerun(scope="fragment")
+
+def scored() -> None:
+    """Finish a scoring-panel action."""
+    rerun_panel("drawn_rotation",
+                rotation_state(st.session_state.shared.snapshot))
+
+def rotated() -> None:
+    """Finish a rotation-panel action."""
+    rerun_panel("drawn_scoring",
+                scoring_state(st.session_state.shared.snapshot))
+
+def scoreboard(shared: SharedMatch, snapshot: dict) -> None:
+    """Score, point buttons, serve toggle, undo/redo and player totals."""
+    with PROFILER.section("panel:scoreboard"):
+        st.markdown("### Scoreboard")
+        sets = " ".join(f"{a}-{b}" for a, b in snapshot["set_scores"])
+        over = snapshot["winner"] is not None
+        if over:
+            who = "We" if snapshot["winner"] == "us" else "They"
+            st.markdown(f"**Match over:** {who} won ({sets})")
+        else:
+            st.markdown(
+                f"**Set {snapshot['set_number']}** (to "
+                f"{snapshot['set_target']}) · **Us:** {snapshot['score_us']}"
+                f"—**Them:** {snapshot['score_them']}"
+                + (f"  \nSets: {sets}" if sets else ""))
+        serving = snapshot["serving"]
+        st.caption("We serve" if serving else "They serve")
+        if st.button("Point Us", disabled=over):
+            submit(lambda e: e.point("us"))
+            scored()
+        if st.button("Point Them", disabled=over):
+            submit(lambda e: e.point("them"))
+            scored()
+        if st.button("Serve to Them" if serving else "Serve to Us"):
+            submit(lambda e: e.set_serving(not serving), check=True)
+            scored()
+        undo_col, redo_col = st.columns(2)
+        if undo_col.button("Undo Last", disabled=not shared.engine.can_undo):
+            changed = submit(lambda e: e.undo(), check=True)
+            if changed is not None:
+                st.toast(f"Undid last {changed.kind}")
+            scored()
+        if redo_col.button("Redo", disabled=not shared.engine.can_redo):
+            changed = submit(lambda e: e.redo(), check=True)
+            if changed is not None:
+                st.toast(f"Redid {changed.kind}")
+            scored()
+        behind = shared.behind(session_id())
+        if behind and st.button(f"Sync ({behind} new from other scorers)"):
+            st.rerun()
+
+        st.markdown("#### Live Stats")
+        live = shared.read(lambda e: e.state.live_stats.player_frame())
+        if live.empty:
+            st.caption("No touches recorded yet.")
+        else:
+            st.dataframe(live[["kills", "errors", "aces"]],
+                         use_container_width=True)
+
+def serve_entry(snapshot: dict) -> None:
+    """Server and serve result pickers with the Record Serve action."""
+    with PROFILER.section("panel:serve_entry"):
+        st.markdown("### Serve Entry")
+        # "Current" follows the rotation without redrawing this picker.
+        server_pos = st.selectbox(
+            "Server position",
+            options=[None] + list(range(1, 7)),
+            format_func=lambda p: "Current server" if p is None else str(p),
+        )
+        serve_result = st.selectbox(
+            "Serve result", ["Ace", "Error", "Return"]
+        )
+        if st.button("Record Serve",
+                     disabled=snapshot["winner"] is not None):
+            submit(lambda e: e.record_serve(serve_result,
+                                            position=server_pos))
+            st.toast("Serve recorded")
+            scored()
+
+def rally_entry(snapshot: dict) -> None:
+    """Three touch pickers with the Record Rally action."""
+    with PROFILER.section("panel:rally_entry"):
+        lineup = snapshot["lineup"]
+        st.markdown("### Rally Entry")
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            player1 = st.selectbox(
+                "Touch 1 - Player",
+                options=list(lineup.values()),
+                index=0,
+            )
+            touch1 = st.selectbox(
+                "Touch 1 - Type",
+                ["Dig", "Pass", "Set", "Attack"],
+            )
+            result1 = st.selectbox(
+                "Touch 1 - Result",
+                ["OK", "Error", "Kill", "Over"],
+            )
+        with c2:
+            player2 = st.selectbox(
+                "Touch 2 - Player",
+                options=list(lineup.values()),
+                index=1,
+            )
+            touch2 = st.selectbox(
+                "Touch 2 - Type",
+                ["Pass", "Set", "Attack"],
+            )
+            result2 = st.selectbox(
+                "Touch 2 - Result",
+                ["OK", "Error", "Kill", "Over"],
+            )
+        with c3:
+            player3 = st.selectbox(
+                "Touch 3 - Player",
+                options=list(lineup.values()),
+                index=2,
+            )
+            touch3 = st.selectbox(
+                "Touch 3 - Type",
+                ["Pass", "Set", "Attack"],
+            )
+            result3 = st.selectbox(
+                "Touch 3 - Result",
+                ["OK", "Error", "Kill", "Over"],
+            )
+
+        if st.button("Record Rally",
+                     disabled=snapshot["winner"] is not None):
+            submit(lambda e: e.record_rally([
+                (player1, touch1, result1),
+                (player2, touch2, result2),
+                (player3, touch3, result3),
+            ]))
+            st.toast("Rally recorded")
+            scored()
+
+@st.fragment
+def scoring_panel() -> None:
+    """Scoreboard, serve and rally entry and the live event log."""
+    with PROFILER.section("fragment:scoring"):
+        shared = st.session_state.shared
+        snapshot = shared.snapshot
+        st.session_state.drawn_scoring = scoring_state(snapshot)
+        board, entry = st.columns([1, 2])
+        with board:
+            scoreboard(shared, snapshot)
+        with entry:
+            serve_entry(snapshot)
+            st.markdown("---")
+            rally_entry(snapshot)
+            st.markdown("---")
+            st.markdown("### Live Event Log")
+            st.dataframe(shared.read(lambda e: e.rally_log.tail(10)),
+                         use_container_width=True)
+
+@st.fragment
+def rotation_panel() -> None:
+    """Rotation, libero and the lineup inputs that journal substitutions."""
+    with PROFILER.section("fragment:rotation"):
+        snapshot = st.session_state.shared.snapshot
+        if ("flash" in st.session_state
+                or scoring_state(snapshot) != st.session_state.get(
+                    "drawn_scoring")):
+            # A refused or accepted sub (made in the number_input
+            # callback) changes what the rally pickers offer.
+            st.rerun()
+        st.session_state.drawn_rotation = rotation_state(snapshot)
+        st.markdown("### Rotation & Subs")
+        lineup, rotation = snapshot["lineup"], snapshot["rotation"]
+        st.caption(f"Rotation {rotation} · "
+                   f"Subs this set: {snapshot['subs']}")
+        st.caption("Front row: " + ", ".join(
+            f"#{lineup.get(f'position_{s}')}"
+            for s in FRONT_ROW[rotation - 1]))
+        if st.button("Rotate"):
+            submit(lambda e: e.rotate(), check=True)
+            rotated()
+        with st.expander("Libero"):
+            if snapshot["libero_slot"] is None:
+                libero = st.number_input(
+                    "Libero jersey", min_value=0,
+                    value=snapshot["libero"] or 0)
+                slot = st.selectbox(
+                    "In for", BACK_ROW[rotation - 1],
+                    format_func=lambda s:
+                        f"Pos {s} (#{lineup.get(f'position_{s}')})")
+                if st.button("Libero In", disabled=not libero):
+                    submit(lambda e: e.libero_in(slot, int(libero)),
+                           check=True)
+                    rotated()
+            else:
+                st.caption(f"#{snapshot['libero']} in for "
+                           f"#{snapshot['libero_for']} at Pos "
+                           f"{snapshot['libero_slot']}; goes off "
+                           "automatically at the front row")
+                if st.button("Libero Out"):
+                    submit(lambda e: e.libero_out(), check=True)
+                    rotated()
+        for i in range(1, 7):
+            cur = lineup.get(f"position_{i}", i)
+            if cur is None:
+                cur = i
+            # Keep the widget in step with the engine after undo/redo.
+            st.session_state[f"pos{i}"] = int(cur)
+            st.number_input(
+                f"Pos {i}",
+                min_value=1,
+                key=f"pos{i}",
+                on_change=record_substitution,
+                args=(i,),
+            )
+
 # --- Game Tracking Page ---
-with tabs[2]:
+def live_track_view() -> None:
+    """Render the live game tracking view."""
     st.header("Game Tracking")
     if not st.session_state.current_match:
         st.info("Start a match from Scheduling to begin tracking")
@@ -355,187 +796,266 @@ with tabs[2]:
             f" vs {st.session_state.current_match['opponent']}"
         )
         st.subheader(header_text)
-        left, mid, right = st.columns([1, 2, 1])
-
-        with left:
-            st.markdown("### Scoreboard")
-            st.markdown(f"**Us:** {st.session_state.score_us}" +
-                        "—" +
-                        f"**Them:** {st.session_state.score_them}")
-            if st.button("Point Us"):
-                st.session_state.score_us += 1
-                st.session_state.events.append({"point": "us"})
-            if st.button("Point Them"):
-                st.session_state.score_them += 1
-                st.session_state.events.append({"point": "them"})
-            if st.button("Undo Last"):
-                if st.session_state.events:
-                    last = st.session_state.events.pop()
-                    if last.get("point") == "us":
-                        st.session_state.score_us = max(0,
-                                            st.session_state.score_us - 1)
-                    elif last.get("point") == "them":
-                        st.session_state.score_them = max(0,
-                                            st.session_state.score_them - 1)
-                    if not st.session_state.df.empty:
-                        st.session_state.df = st.session_state.df.iloc[:-1]
-                    st.success("Undid last event")
-
-        with mid:
-            st.markdown("### Serve Entry")
-            server_pos = st.selectbox(
-                "Server position",
-                options=list(range(1, 7)),
-                index=st.session_state.rotation - 1,
-            )
-            server_jersey = st.session_state.lineup.get(
-                f"position_{server_pos}"
-            )
-            serve_result = st.selectbox(
-                "Serve result", ["Ace", "Error", "Return"]
-            )
-            if st.button("Record Serve"):
-                row = Rally(
-                    **st.session_state.lineup,
-                    rotation=st.session_state.rotation,
-                    touch_serve=f"{server_jersey}:{serve_result}",
-                )
-                if serve_result == "Ace":
-                    row.point = "us"
-                    st.session_state.score_us += 1
-                elif serve_result == "Error":
-                    row.point = "them"
-                    st.session_state.score_them += 1
-                st.session_state.events.append(asdict(row))
-                st.session_state.df = pd.concat(
-                    [st.session_state.df, pd.DataFrame([asdict(row)])],
-                    ignore_index=True,
-                )
-                st.success("Serve recorded")
-
-            st.markdown("---")
-            st.markdown("### Rally Entry")
-            c1, c2, c3 = st.columns(3)
-            with c1:
-                player1 = st.selectbox(
-                    "Touch 1 - Player",
-                    options=list(st.session_state.lineup.values()),
-                    index=0,
-                )
-                touch1 = st.selectbox(
-                    "Touch 1 - Type",
-                    ["Dig", "Pass", "Set", "Attack"],
-                )
-                result1 = st.selectbox(
-                    "Touch 1 - Result",
-                    ["OK", "Error", "Kill", "Over"],
-                )
-            with c2:
-                player2 = st.selectbox(
-                    "Touch 2 - Player",
-                    options=list(st.session_state.lineup.values()),
-                    index=1,
-                )
-                touch2 = st.selectbox(
-                    "Touch 2 - Type",
-                    ["Pass", "Set", "Attack"],
-                )
-                result2 = st.selectbox(
-                    "Touch 2 - Result",
-                    ["OK", "Error", "Kill", "Over"],
-                )
-            with c3:
-                player3 = st.selectbox(
-                    "Touch 3 - Player",
-                    options=list(st.session_state.lineup.values()),
-                    index=2,
-                )
-                touch3 = st.selectbox(
-                    "Touch 3 - Type",
-                    ["Pass", "Set", "Attack"],
-                )
-                result3 = st.selectbox(
-                    "Touch 3 - Result",
-                    ["OK", "Error", "Kill", "Over"],
-                )
-
-            if st.button("Record Rally"):
-                row = Rally(
-                    **st.session_state.lineup,
-                    rotation=st.session_state.rotation,
-                )
-                row.touch_1 = f"{player1}:{touch1}:{result1}"
-                row.touch_2 = f"{player2}:{touch2}:{result2}"
-                row.touch_3 = f"{player3}:{touch3}:{result3}"
-                if (
-                    result1 == "Error"
-                    or result2 == "Error"
-                    or result3 == "Error"
-                ):
-                    row.point = "them"
-                    st.session_state.score_them += 1
-                elif (
-                    result1 == "Kill"
-                    or result2 == "Kill"
-                    or result3 == "Kill"
-                ):
-                    row.point = "us"
-                    st.session_state.score_us += 1
-                st.session_state.events.append(asdict(row))
-                st.session_state.df = pd.concat(
-                    [st.session_state.df, pd.DataFrame([asdict(row)])],
-                    ignore_index=True,
-                )
-                st.success("Rally recorded")
-
-        with right:
-            st.markdown("### Rotation & Subs")
-            for i in range(1, 7):
-                key = f"position_{i}"
-                cur = st.session_state.lineup.get(key, i)
-                if cur is None:
-                    cur = i
-                new_val = st.number_input(
-                    f"Pos {i}",
-                    value=int(cur),
-                    min_value=1,
-                    key=f"pos{i}",
-                )
-                st.session_state.lineup[key] = int(new_val)
-
-            st.markdown("---")
-            st.markdown("### Live Event Log")
-            st.dataframe(st.session_state.df.tail(10),
-                         use_container_width=True)
+        shared = st.session_state.shared
+        if "flash" in st.session_state:
+            st.warning(st.session_state.pop("flash"))
+        if shared.sessions > 1:
+            st.caption(f"{shared.sessions} scorers on this match")
+        scoring, subs = st.columns([3, 1])
+        with scoring:
+            scoring_panel()
+        with subs:
+            rotation_panel()
 
 # -----------------------------------------------------------------------------
 # Archive & Export
 # -----------------------------------------------------------------------------
 
+# --- Helper Utilities ---
+def archived_match_csv(match: dict) -> bytes:
+    """Build one archived match's CSV from the Parquet file or SQLite."""
+    mid = match_id(match)
+    if archive.available() and archive.has_match(DATA_DIR, mid):
+        return archive.to_csv(DATA_DIR, mid)
+    events = get_store().load_rallies(mid)
+    return pd.DataFrame(events).to_csv(index=False).encode("utf-8")
+
+def archived_rallies(columns: List[str]) -> pd.DataFrame:
+    """Return ``columns`` for every archived rally, reading only those."""
+    if archive.available():
+        return archive.scan(DATA_DIR, columns)
+    store = get_store()
+    return pd.DataFrame(
+        [e for m in st.session_state.archived_matches
+         for e in store.load_rallies(match_id(m))],
+        columns=columns,
+    )
+
+def pick_set(key: str) -> Optional[int]:
+    """Set picker over the current match's sets; None means all of them."""
+    played = st.session_state.shared.read(lambda e: [
+        n for n, log in enumerate(e.rally_log.sets, start=1)
+        if not log.empty])
+    options = ["All sets"] + [f"Set {n}" for n in played]
+    drop_stale_choice(key, options)
+    choice = st.selectbox("Sets", options, key=key)
+    return None if choice == "All sets" else int(choice.split()[1])
+
+def current_rallies(engine: MatchEngine, mid: str,
+                    set_number: Optional[int], frame: bool = True):
+    """Return ``(cache key, version, rallies)`` for the whole match or one
+    set; a set's segment has its own version, so finished sets stay
+    cached while the current one is scored."""
+    log = engine.rally_log
+    source = log if set_number is None else log.segment(set_number)
+    key = mid if set_number is None else f"{mid}/set{set_number}"
+    return key, source.version, source.to_frame() if frame else source
+
 # --- Archive & Export Page ---
-with tabs[3]:
+def archive_view() -> None:
+    """Render the archive and export view."""
     st.header("Archive & Export")
     st.subheader("Completed Matches")
+    exports = st.session_state.export_cache
     for a_idx, match in enumerate(st.session_state.archived_matches):
-        st.write(f"{match.get('our_team')} vs {match.get('opponent')}" +
-                 f"— {match.get('date')}")
-        csv = pd.DataFrame(match.get(
-            "events", []
-            )).to_csv(index=False).encode("utf-8")
-        st.download_button(
-            "Download Match JSON/CSV",
-            data=csv,
-            file_name=f"{match.get('our_team')}_{match.get('date')}.csv",
-            mime="text/csv",
-        )
+        cols = st.columns([3, 1])
+        cols[0].write(f"{match.get('our_team')} vs {match.get('opponent')}" +
+                      f"— {match.get('date')}")
+        # Archived rallies don't change, so one version per match is enough.
+        mid = match_id(match)
+        csv = exports.peek(mid, "archived")
+        if csv is None and cols[1].button("Export CSV", key=f"export_{a_idx}"):
+            csv = exports.payload(mid, "archived",
+                                  lambda: archived_match_csv(match))
+        if csv is not None:
+            cols[1].download_button(
+                "Download Match CSV",
+                data=csv,
+                file_name=f"{match.get('our_team')}_{match.get('date')}.csv",
+                mime="text/csv",
+                key=f"download_{a_idx}",
+            )
 
     st.markdown("---")
     st.subheader("Export Current Match")
-    if st.session_state.df.empty:
+    shared = st.session_state.shared
+    current_id = match_id(st.session_state.current_match or {})
+    set_number = pick_set("export_set")
+    key, version, rally_frame = shared.read(
+        lambda e: current_rallies(e, current_id, set_number))
+    if rally_frame.empty:
         st.info("No events recorded yet.")
     else:
-        csv = st.session_state.df.to_csv(index=False).encode("utf-8")
-        st.download_button("Download Current Match CSV",
-                           data=csv,
-                           file_name="current_match.csv",
-                           mime="text/csv")
+        csv = exports.peek(key, version)
+        if csv is None and st.button("Export Current Match"):
+            csv = exports.payload(
+                key, version,
+                lambda: rally_frame.to_csv(index=False).encode("utf-8"))
+        if csv is not None:
+            suffix = f"_set{set_number}" if set_number else ""
+            st.download_button("Download Current Match CSV",
+                               data=csv,
+                               file_name=f"current_match{suffix}.csv",
+                               mime="text/csv")
+
+    st.markdown("---")
+    st.subheader("Reports")
+    stat_source = st.selectbox(
+        "Matches",
+        ["Current match", "All archived matches"],
+        key="stats_source",
+    )
+    report_name = st.selectbox("Report", list(REPORTS), key="report_name")
+    # Reports are rebuilt only when the rallies behind them change.
+    reports = st.session_state.report_cache
+    if stat_source == "Current match":
+        set_number = pick_set("report_set")
+
+        def current_report(engine: MatchEngine) -> pd.DataFrame:
+            key, version, source = current_rallies(engine, current_id,
+                                                   set_number, frame=False)
+            return reports.report(key, version, report_name,
+                                  lambda: source)
+
+        report = shared.read(current_report)
+    else:
+        report = reports.report(
+            "__archive__", len(st.session_state.archived_matches),
+            report_name,
+            lambda: archived_rallies(
+                list(TOUCH_COLUMNS) + ["rotation", "point"]))
+    if report.empty:
+        st.info("No rallies to summarize.")
+    else:
+        st.dataframe(report, use_container_width=True)
+
+# -----------------------------------------------------------------------------
+# Season Analytics
+# -----------------------------------------------------------------------------
+
+# --- Season Analytics Page ---
+def season_view() -> None:
+    """Render filtered group-by stats over every archived rally."""
+    st.header("Season Analytics")
+    archived = st.session_state.archived_matches
+    if not archived:
+        st.info("Archive a match to analyze the season.")
+        return
+    dates = sorted(m["date"] for m in archived)
+    # Seeded here rather than passed as defaults, since keep_view_state
+    # re-assigns these keys every run.
+    if "season_dates" not in st.session_state:
+        st.session_state.season_dates = (date.fromisoformat(dates[0]),
+                                         date.fromisoformat(dates[-1]))
+    st.session_state.setdefault("season_group_by", ["jersey"])
+    with st.form("season_query"):
+        c1, c2, c3 = st.columns(3)
+        teams = c1.multiselect(
+            "Our team", sorted({m["our_team"] for m in archived}),
+            key="season_teams")
+        opponents = c2.multiselect(
+            "Opponent", sorted({m["opponent"] for m in archived}),
+            key="season_opponents")
+        picked = c3.date_input("Dates", key="season_dates")
+        # Mid-selection the range widget holds just one date.
+        start, end = (list(picked) + [None])[:2]
+        c1, c2, c3 = st.columns(3)
+        rotations = c1.multiselect("Rotation", list(range(1, 7)),
+                                   key="season_rotations")
+        touch_types = c2.multiselect(
+            "Touch type", ["Serve", "Pass", "Dig", "Set", "Attack", "Block"],
+            key="season_touch_types")
+        positions = c3.multiselect("Position", POSITIONS,
+                                   key="season_positions")
+        c1, c2 = st.columns(2)
+        jerseys = c1.text_input("Jerseys (comma separated)",
+                                key="season_jerseys")
+        group_by = c2.multiselect("Group by", analytics.GROUP_KEYS,
+                                  key="season_group_by")
+        run = st.form_submit_button("Run Query")
+    if run:
+        query = analytics.SeasonQuery(
+            teams=teams, opponents=opponents,
+            start=start.isoformat() if start else None,
+            end=end.isoformat() if end else None,
+            rotations=rotations, touch_types=touch_types,
+            positions=positions, group_by=group_by,
+            jerseys=[int(j) for j in jerseys.replace(" ", "").split(",")
+                     if j.isdigit()])
+        try:
+            with PROFILER.section("query:season"):
+                st.session_state.season_result = analytics.run(
+                    query, DATA_DIR, get_store(), st.session_state.roster)
+        except Exception as e:
+            st.error(f"Query failed: {e}")
+    result = st.session_state.get("season_result")
+    if result is not None:
+        if result.empty:
+            st.info("No touches match those filters.")
+        else:
+            st.dataframe(result, use_container_width=True)
+
+# -----------------------------------------------------------------------------
+# View Dispatch
+# -----------------------------------------------------------------------------
+
+# Filters, pickers and half-filled inputs of every view. Streamlit deletes
+# the state of a widget that isn't drawn on a run, and only the selected
+# view is drawn, so these are re-assigned each run to survive a view
+# switch. Buttons, uploads, the Live Track lineup (reseeded from the
+# match) and its touch pickers are not kept.
+KEPT_WIDGETS = (
+    "new_team_name", "new_team_season", "export_team_select",
+    "schedule_team", "schedule_hide_past", "schedule_page",
+    "stats_source", "report_name", "report_set", "export_set",
+    "season_teams", "season_opponents", "season_dates", "season_rotations",
+    "season_touch_types", "season_positions", "season_jerseys",
+    "season_group_by",
+)
+# Per-team "Add player" inputs, keyed by team index.
+KEPT_WIDGET_PREFIXES = ("pjersey", "pname", "ppos")
+
+def drop_stale_choice(key: str, options: List) -> None:
+    """Forget a kept choice that is no longer among ``options``."""
+    if key in st.session_state and st.session_state[key] not in options:
+        del st.session_state[key]
+
+def keep_view_state() -> None:
+    """Carry hidden views' widget state over to the next run."""
+    for key in list(st.session_state):
+        if key in KEPT_WIDGETS or key.startswith(KEPT_WIDGET_PREFIXES):
+            st.session_state[key] = st.session_state[key]
+
+keep_view_state()
+VIEWS = {
+    "Team Setup": team_setup_view,
+    "Schedule": schedule_view,
+    "Live Track": live_track_view,
+    "Archive": archive_view,
+    "Season": season_view,
+}
+with PROFILER.section(f"view:{view}"):
+    VIEWS[view]()
+# The page now shows this version; checked actions on the next run are
+# refused if another scorer changes the match in between.
+st.session_state.shared.seen(session_id())
+
+# -----------------------------------------------------------------------------
+# Rerun Profiling
+# -----------------------------------------------------------------------------
+
+with st.sidebar.expander("Diagnostics", expanded=False):
+    st.checkbox("Profile reruns", key="profile_reruns",
+                disabled=PROFILE_ENV)
+    if PROFILER.enabled:
+        PROFILER.record("rerun", time.perf_counter() - rerun_started)
+        st.dataframe(PROFILER.summary(), use_container_width=True)
+        if st.button("Dump timings"):
+            _ensure_data_dir()
+            path = DATA_DIR / f"profile-{int(time.time())}.jsonl"
+            count = PROFILER.dump(path)
+            st.success(f"Wrote {count} samples to {path.name}")
+    st.dataframe(pd.DataFrame({
+        "exports": st.session_state.export_cache.stats(),
+        "reports": st.session_state.report_cache.stats(),
+    }), use_container_width=True)
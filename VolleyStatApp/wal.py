@@ -0,0 +1,187 @@
+"""
+Write-ahead match journal on disk.
+
+Each live match gets a JSON-lines file under ``<data dir>/journals``. The
+first line records the scheduled match and starting lineup; every journal
+change after that is one short appended line (a command, "undo" or
+"redo"), so a save never rewrites the match. Lines are flushed to the OS
+as they are written and fsync'd every ``fsync_every`` appends. A finished
+match gets an "end" line; anything without one is replayed on startup.
+
+Only one process may journal into a data dir: ``lock`` takes an exclusive
+lock on ``<data dir>/journals.lock`` and fails fast if another holds it.
+"""
+
+
+import json
+import os
+from pathlib import Path
+from typing import IO, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from journal import Journal, MatchState
+from models import match_id
+
+FSYNC_EVERY = int(os.environ.get("VSTAT_FSYNC_EVERY", "8"))
+
+
+class JournalDirBusy(RuntimeError):
+    """Another process (or registry) already journals into the data dir."""
+
+
+def lock(data_dir: Path) -> IO:
+    """Take the data dir's journal lock; release it by closing the file.
+
+    Raises ``JournalDirBusy`` if it is already held.
+    """
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    handle = (data_dir / "journals.lock").open("a")
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            raise JournalDirBusy(
+                f"{data_dir} is already journaled by another process; "
+                "give each process its own data dir") from None
+    return handle
+
+
+class MatchWAL:
+    """Append-only journal file for one match; usable as a Journal listener."""
+
+    def __init__(self, path: Path, fsync_every: int = FSYNC_EVERY) -> None:
+        self.path = Path(path)
+        self.fsync_every = max(1, int(fsync_every))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            # Appending after a torn line would glue the next record to it.
+            _truncate_torn(self.path)
+        self._file = self.path.open("a", encoding="utf-8")
+        self._pending = 0
+
+    @classmethod
+    def for_match(cls, data_dir: Path, match: dict,
+                  fsync_every: int = FSYNC_EVERY) -> "MatchWAL":
+        return cls(Path(data_dir) / "journals" / f"{match_id(match)}.jsonl",
+                   fsync_every)
+
+    def append(self, record: dict) -> None:
+        """Write one record; fsync once ``fsync_every`` are pending."""
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+        self._pending += 1
+        if self._pending >= self.fsync_every:
+            self.sync()
+
+    __call__ = append
+
+    def start(self, match: dict, state: MatchState) -> None:
+        self.append({"kind": "start", "match": match,
+                     "lineup": dict(state.lineup),
+                     "rotation": state.rotation})
+
+    def sync(self) -> None:
+        if self._pending:
+            os.fsync(self._file.fileno())
+            self._pending = 0
+
+    def finish(self) -> None:
+        """Mark the match complete so it is not recovered again."""
+        self.append({"kind": "end"})
+        self.close()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+
+def read_records(path: Path) -> List[dict]:
+    """Return the records in ``path``, skipping a torn final line."""
+    records = []
+    with Path(path).open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Only the last write can be partial; stop there.
+                break
+    return records
+
+
+def _truncate_torn(path: Path) -> None:
+    """Cut ``path`` back to the end of its last complete record."""
+    good = 0
+    with path.open("rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                json.loads(line)
+            except ValueError:
+                break
+            good += len(line)
+    if good < path.stat().st_size:
+        with path.open("r+b") as f:
+            f.truncate(good)
+
+
+def load(path: Path) -> Tuple[Optional[dict], Journal, bool]:
+    """Replay a journal file into ``(match, journal, finished)``."""
+    records = read_records(path)
+    match = None
+    state = MatchState()
+    if records and records[0].get("kind") == "start":
+        header = records.pop(0)
+        match = header.get("match")
+        state = MatchState(lineup=header.get("lineup") or state.lineup,
+                           rotation=header.get("rotation", 1))
+    finished = bool(records) and records[-1].get("kind") == "end"
+    if finished:
+        records.pop()
+    return match, Journal.replay(records, state), finished
+
+
+def unfinished(data_dir: Path) -> List[Path]:
+    """Return journal files without an "end" line, newest first."""
+    folder = Path(data_dir) / "journals"
+    if not folder.exists():
+        return []
+    paths = sorted(folder.glob("*.jsonl"),
+                   key=lambda p: p.stat().st_mtime, reverse=True)
+    return [p for p in paths if not _is_finished(p)]
+
+
+def _is_finished(path: Path) -> bool:
+    # The end marker is always the last (short) line, so read only the tail.
+    with path.open("rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 64))
+        tail = f.read().decode("utf-8", errors="ignore")
+    return tail.rstrip().endswith('{"kind":"end"}')
+
+
+def open_match(data_dir: Path, match: dict,
+               state: MatchState) -> Tuple[Journal, "MatchWAL"]:
+    """Resume ``match`` from its journal file, or start a new one."""
+    wal = MatchWAL.for_match(data_dir, match)
+    journal = None
+    if wal.path.stat().st_size:
+        _, journal, finished = load(wal.path)
+        if finished:
+            # Re-opened after it was archived; start a fresh file.
+            wal.close()
+            wal.path.unlink()
+            wal = MatchWAL.for_match(data_dir, match)
+            journal = None
+    if journal is None:
+        journal = Journal(state)
+        wal.start(match, state)
+    journal.listeners.append(wal)
+    return journal, wal
@@ -0,0 +1,263 @@
+"""
+HTTP scoring API for VolleyStat.
+
+A small Flask service over the same storage and ``MatchEngine`` the
+Streamlit app uses, so several scorers' devices can post events to one
+process without a Streamlit rerun per event. Run it with ``python
+main.py`` (Flask dev server) or ``python main.py --async`` (uvicorn).
+
+Under the dev server each viewer socket holds a thread (flask-sock), which
+is fine for a handful of viewers. ``run_async`` serves the viewer socket
+from a native ASGI route instead, so a crowd of idle phones costs one
+small task each rather than a thread.
+
+Endpoints (all JSON):
+    GET  /api/teams
+    GET  /api/matches                      scheduled matches
+    POST /api/matches/<id>/start           {"lineup": {...}} optional
+    GET  /api/matches/<id>/score
+    POST /api/matches/<id>/events          one event or a list of events
+    GET  /api/matches/<id>/stats?by=rotation
+    WS   /ws/matches/<id>                      live deltas
+"""
+
+
+import asyncio
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from flask import Flask, jsonify, request
+
+try:
+    from flask_sock import Sock
+except ImportError:  # pragma: no cover - depends on the environment
+    Sock = None
+
+APP_DIR = Path(__file__).resolve().parent / "VolleyStatApp"
+if str(APP_DIR) not in sys.path:
+    # The app modules import each other as siblings.
+    sys.path.insert(0, str(APP_DIR))
+
+from broadcast import Broadcaster  # noqa: E402
+from engine import MatchEngine  # noqa: E402
+from journal import MatchState  # noqa: E402
+from registry import Conflict, MatchRegistry  # noqa: E402
+from stats import BY_KEYS, player_stats  # noqa: E402
+from storage import Store  # noqa: E402
+
+DATA_DIR = Path(os.environ.get("VSTAT_DATA_DIR",
+                               Path.cwd() / ".vstat_data"))
+# Seconds a viewer socket may sit idle before it is sent a keepalive.
+WS_KEEPALIVE = 25.0
+
+
+def _sub(engine: MatchEngine, event: dict) -> None:
+    engine.substitute(int(event["position"]), int(event["jersey"]))
+
+
+def _libero(engine: MatchEngine, event: dict) -> None:
+    if event.get("slot") is None:
+        engine.libero_out()
+    else:
+        jersey = event.get("jersey")
+        engine.libero_in(int(event["slot"]),
+                         None if jersey is None else int(jersey))
+
+
+# Event "action" -> engine call; each takes (engine, event dict).
+ACTIONS: Dict[str, Callable[[MatchEngine, dict], object]] = {
+    "point": lambda e, ev: e.point(ev["side"]),
+    "serve": lambda e, ev: e.record_serve(ev["result"], ev.get("position")),
+    "rally": lambda e, ev: e.record_rally(
+        [tuple(t) for t in ev["touches"]], ev.get("point")),
+    "sub": _sub,
+    "rotate": lambda e, ev: e.rotate(int(ev.get("steps", 1))),
+    "serving": lambda e, ev: e.set_serving(bool(ev["serving"])),
+    "libero": _libero,
+    "end_set": lambda e, ev: e.end_set(),
+    "undo": lambda e, ev: e.undo(),
+    "redo": lambda e, ev: e.redo(),
+}
+
+# Actions that only make sense against the state the scorer saw; an event
+# carrying "version" is rejected with 409 if the match has moved on.
+CHECKED = {"sub", "libero", "rotate", "serving", "end_set", "undo", "redo"}
+
+
+def create_app(data_dir: Optional[Path] = None,
+               live: Optional[MatchRegistry] = None,
+               broadcaster: Optional[Broadcaster] = None) -> Flask:
+    """Build the Flask app over the SQLite store in ``data_dir``.
+
+    ``live`` and ``broadcaster`` let a process that already scores matches
+    (the Streamlit app) serve them; by default the app owns its own. Two
+    processes must never journal into the same ``data_dir``: each would
+    recover and append to the other's match journals, so the registry
+    locks it and this raises ``wal.JournalDirBusy`` if another holds it.
+    """
+    data_dir = Path(data_dir or DATA_DIR)
+    store = Store(data_dir / "vstat.db")
+    if live is None:
+        live = MatchRegistry(data_dir)
+    if broadcaster is None:
+        broadcaster = Broadcaster()
+        broadcaster.watch(live)
+    app = Flask(__name__)
+    app.config["STORE"] = store
+    app.config["LIVE"] = live
+    app.config["BROADCASTER"] = broadcaster
+
+    def error(message: str, status: int = 400):
+        return jsonify({"error": message}), status
+
+    @app.get("/api/teams")
+    def teams():
+        return jsonify(store.load_teams())
+
+    @app.get("/api/matches")
+    def matches():
+        return jsonify(store.load_matches())
+
+    @app.post("/api/matches/<mid>/start")
+    def start(mid: str):
+        match = store.get_match(mid)
+        if match is None:
+            return error("unknown match", 404)
+        body = request.get_json(silent=True) or {}
+        state = MatchState()
+        lineup = body.get("lineup") or {}
+        if not isinstance(lineup, dict) or set(lineup) - set(state.lineup):
+            return error("lineup keys must be position_1..position_6")
+        state.lineup.update(lineup)
+        return jsonify(live.open(match, state).snapshot)
+
+    @app.get("/api/matches/<mid>/score")
+    def score(mid: str):
+        shared = live.get(mid)
+        if shared is None:
+            return error("match not started", 404)
+        return jsonify(shared.snapshot)
+
+    @app.post("/api/matches/<mid>/events")
+    def events(mid: str):
+        shared = live.get(mid)
+        if shared is None:
+            return error("match not started", 404)
+        body = request.get_json(silent=True)
+        batch = body if isinstance(body, list) else [body]
+        scorer = request.headers.get("X-Scorer", "api")
+        for applied, event in enumerate(batch):
+            try:
+                action = ACTIONS[event["action"]]
+                shared.submit(scorer, lambda e: action(e, event),
+                              check=event["action"] in CHECKED
+                              and "version" in event,
+                              expected=event.get("version"))
+            except Conflict as e:
+                return jsonify({"error": f"event {applied}: {e}",
+                                "score": e.snapshot}), 409
+            except (KeyError, TypeError, ValueError) as e:
+                return error(f"event {applied}: bad event ({e!r})")
+        return jsonify(shared.snapshot)
+
+    @app.get("/api/matches/<mid>/stats")
+    def stats(mid: str):
+        shared = live.get(mid)
+        if shared is None:
+            return error("match not started", 404)
+        by = request.args.getlist("by") or None
+        unknown = set(by or ()) - set(BY_KEYS)
+        if unknown:
+            return error(f"cannot group by {sorted(unknown)}; "
+                         f"use {', '.join(BY_KEYS)}")
+        table = shared.read(lambda e: player_stats(e.rally_log, by=by))
+        return app.response_class(
+            table.reset_index().to_json(orient="records"),
+            mimetype="application/json")
+
+    if Sock is not None:
+        sock = Sock(app)
+
+        @sock.route("/ws/matches/<mid>")
+        def watch(ws, mid: str):
+            sub = broadcaster.subscribe(mid)
+            try:
+                while True:
+                    message = sub.get(timeout=WS_KEEPALIVE)
+                    if sub.closed:
+                        break
+                    ws.send(message or '{"kind":"ping"}')
+            finally:
+                broadcaster.unsubscribe(mid, sub)
+
+    return app
+
+
+_WATCH_PATH = re.compile(r"/ws/matches/([^/]+)")
+
+
+async def _watch(broadcaster: Broadcaster, mid: str, receive, send) -> None:
+    """Stream ``mid``'s deltas to one ASGI websocket without a thread."""
+    if (await receive())["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+    sub = broadcaster.subscribe(
+        mid, on_put=lambda: loop.call_soon_threadsafe(ready.set))
+    incoming = asyncio.ensure_future(receive())
+    try:
+        while not sub.closed:
+            message = sub.get(timeout=0)
+            if message is None:
+                ready.clear()
+                waiter = asyncio.ensure_future(ready.wait())
+                done, _ = await asyncio.wait(
+                    {waiter, incoming}, timeout=WS_KEEPALIVE,
+                    return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                if incoming in done:
+                    if incoming.result()["type"] == "websocket.disconnect":
+                        break
+                    # Viewers have nothing to say; ignore what they send.
+                    incoming = asyncio.ensure_future(receive())
+                if done:
+                    continue
+                message = '{"kind":"ping"}'
+            await send({"type": "websocket.send", "text": message})
+    finally:
+        incoming.cancel()
+        broadcaster.unsubscribe(mid, sub)
+
+
+def asgi_app(app: Flask):
+    """Wrap ``app`` for an ASGI server, with a native viewer socket route.
+
+    HTTP requests go to Flask through ``WsgiToAsgi``, which cannot carry
+    websockets; ``/ws/matches/<id>`` is served here on the event loop.
+    """
+    from asgiref.wsgi import WsgiToAsgi
+
+    http = WsgiToAsgi(app)
+    broadcaster = app.config["BROADCASTER"]
+
+    async def asgi(scope, receive, send):
+        if scope["type"] != "websocket":
+            return await http(scope, receive, send)
+        route = _WATCH_PATH.fullmatch(scope["path"])
+        if route is None:
+            await send({"type": "websocket.close", "code": 1008})
+            return
+        await _watch(broadcaster, route.group(1), receive, send)
+
+    return asgi
+
+
+def run_async(app: Flask, host: str = "127.0.0.1", port: int = 8000) -> None:
+    """Serve ``app`` from uvicorn's event loop instead of the dev server."""
+    import uvicorn
+
+    uvicorn.run(asgi_app(app), host=host, port=port)
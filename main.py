@@ -1,8 +1,15 @@
-from app import create_app
+import sys
+
+from app import create_app, run_async
 
 
 app = create_app()
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    # --async serves viewer sockets on uvicorn's event loop; the dev
+    # server spends a thread on each one.
+    if "--async" in sys.argv:
+        run_async(app)
+    else:
+        app.run(debug=True)
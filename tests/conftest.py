@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# The app modules import each other as siblings (streamlit runs the script
+# with VolleyStatApp/ on sys.path), so mirror that for the test session.
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "VolleyStatApp"))
+sys.path.insert(0, str(ROOT))
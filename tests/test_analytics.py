@@ -0,0 +1,103 @@
+import pytest
+
+import analytics
+import archive
+from analytics import SeasonQuery
+from roster import RosterIndex
+from storage import Store
+
+LINEUP = {f"position_{i}": i for i in range(1, 7)}
+
+
+def _rally(rotation, serve=None, touches=(), block=None, set_number=1):
+    row = {**LINEUP, "rotation": rotation, "touch_serve": serve,
+           "touch_block": block, "set": set_number}
+    for i, touch in enumerate(touches, start=1):
+        row[f"touch_{i}"] = touch
+    return row
+
+
+MATCHES = [
+    ({"id": "m1", "our_team": "Hawks", "opponent": "Owls",
+      "date": "2026-01-10"},
+     [_rally(4, touches=["2:Pass:OK", "1:Set:OK", "4:Attack:Kill"]),
+      _rally(4, touches=["2:Pass:OK", "4:Attack:Error"]),
+      _rally(4, touches=["2:Pass:OK", "1:Set:Kill"]),
+      _rally(1, serve="1:Ace", set_number=2)]),
+    ({"id": "m2", "our_team": "Hawks", "opponent": "Crows",
+      "date": "2026-02-10"},
+     [_rally(4, touches=["3:Dig:OK", "4:Attack:Kill"], block="5:Kill"),
+      _rally(2, serve="1:Error")]),
+    ({"id": "m3", "our_team": "Eagles", "opponent": "Owls",
+      "date": "2026-03-10"},
+     [_rally(4, touches=["4:Attack:Kill"])]),
+]
+
+
+@pytest.fixture(params=["parquet", "sqlite"])
+def season(request, tmp_path, monkeypatch):
+    store = Store(tmp_path / "vstat.db")
+    for match, events in MATCHES:
+        store.add_match(dict(match))
+        if request.param == "parquet":
+            pytest.importorskip("pyarrow")
+            archive.write_match(tmp_path, match, events)
+            store.archive_match(match)
+        else:
+            store.archive_match(match, events)
+    if request.param == "sqlite":
+        monkeypatch.setattr(archive, "available", lambda: False)
+    return tmp_path, store
+
+
+def test_outside_hitter_kill_pct_in_rotation_4(season):
+    data_dir, store = season
+    roster = RosterIndex([{"name": "Hawks", "season": "2026", "players": [
+        {"name": "Oz", "jersey": 4, "position": "Outside"},
+        {"name": "Sy", "jersey": 1, "position": "Setter"}]}])
+    query = SeasonQuery(rotations=[4], touch_types=["Attack"],
+                        positions=["Outside"], group_by=["jersey"])
+    result = analytics.run(query, data_dir, store, roster)
+    assert list(result.index) == [4]
+    row = result.loc[4]
+    assert (row["attacks"], row["kills"]) == (3, 2)
+    assert row["kill_pct"] == pytest.approx(2 / 3)
+
+
+def test_filters_and_grouping(season):
+    data_dir, store = season
+    by_team = analytics.run(SeasonQuery(group_by=["our_team", "type"],
+                                        touch_types=["Attack", "Serve"]),
+                            data_dir, store)
+    assert by_team.loc[("Hawks", "Serve"), "aces"] == 1
+    assert by_team.loc[("Hawks", "Attack"), "attacks"] == 3
+    assert by_team.loc[("Eagles", "Attack"), "kills"] == 1
+
+    ranged = analytics.run(SeasonQuery(start="2026-02-01", end="2026-02-28",
+                                       teams=["Hawks"], group_by=[]),
+                           data_dir, store)
+    assert ranged.loc["all", "blocks"] == 1
+    assert ranged.loc["all", "serve_errors"] == 1
+    assert ranged.loc["all", "kills"] == 1
+
+    owls = analytics.run(SeasonQuery(opponents=["Owls"], jerseys=[4],
+                                     group_by=["match_id"]), data_dir, store)
+    assert list(owls.index) == ["m1", "m3"]
+
+    m1 = analytics.run(SeasonQuery(opponents=["Owls"], teams=["Hawks"],
+                                   group_by=[]), data_dir, store)
+    assert (m1.loc["all", "kills"], m1.loc["all", "attacks"]) == (2, 2)
+    assert m1.loc["all", "kill_pct"] == 0.5
+
+    by_set = analytics.run(SeasonQuery(teams=["Hawks"], touch_types=["Serve"],
+                                       group_by=["match_id", "set"]),
+                           data_dir, store)
+    assert by_set.loc[("m1", 2), "aces"] == 1
+    assert by_set.loc[("m2", 1), "serve_errors"] == 1
+
+
+def test_query_validation():
+    assert SeasonQuery(touch_types=["Serve"]).touch_columns() == [
+        "touch_serve"]
+    with pytest.raises(ValueError):
+        analytics.run(SeasonQuery(group_by=["shoe_size"]), ".")
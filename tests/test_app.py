@@ -0,0 +1,124 @@
+import json
+
+import pytest
+
+pytest.importorskip("flask")
+
+from app import create_app  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app(tmp_path)
+    store = app.config["STORE"]
+    store.upsert_team({"name": "Hawks", "season": "2026", "players": []})
+    match = store.add_match({"our_team": "Hawks", "opponent": "Owls",
+                             "date": "2026-03-01"})
+    client = app.test_client()
+    client.mid = match["id"]
+    return client
+
+
+def test_record_events_and_read_score(client):
+    url = f"/api/matches/{client.mid}"
+    assert client.get(f"{url}/score").status_code == 404
+    lineup = {f"position_{i}": 10 + i for i in range(1, 7)}
+    res = client.post(f"{url}/start", json={"lineup": lineup})
+    assert res.status_code == 200
+    res = client.post(f"{url}/events", json=[
+        {"action": "serve", "result": "Ace"},
+        {"action": "rally", "touches": [[12, "Pass", "OK"],
+                                        [14, "Attack", "Kill"]]},
+        {"action": "point", "side": "them"},
+        {"action": "undo"},
+    ])
+    assert res.status_code == 200
+    body = res.get_json()
+    assert (body["score_us"], body["score_them"], body["rallies"]) == (2, 0, 2)
+    assert client.get(f"{url}/score").get_json() == body
+
+    stats = client.get(f"{url}/stats?by=rotation").get_json()
+    assert {"jersey": 14, "rotation": 1}.items() <= next(
+        s for s in stats if s["jersey"] == 14).items()
+    by_set = client.get(f"{url}/stats?by=set").get_json()
+    assert {s["set"] for s in by_set} == {1}
+    assert client.get(f"{url}/stats?by=shoe_size").status_code == 400
+    assert client.get("/api/teams").get_json()[0]["name"] == "Hawks"
+    assert client.get("/api/matches").get_json()[0]["id"] == client.mid
+
+
+def test_bad_events_are_rejected(client):
+    url = f"/api/matches/{client.mid}"
+    client.post(f"{url}/start")
+    dance = client.post(f"{url}/events", json={"action": "dance"})
+    assert dance.status_code == 400
+    assert client.post(f"{url}/events", data="nope").status_code == 400
+    stale = client.post(f"{url}/events", json={"action": "undo", "version": 5})
+    assert stale.status_code == 409
+    assert stale.get_json()["score"]["version"] == 0
+    assert client.post("/api/matches/missing/start").status_code == 404
+    for event in ({"action": "sub", "position": 9, "jersey": 20},
+                  {"action": "libero", "slot": 9, "jersey": 1},
+                  {"action": "serve", "result": "Ace", "position": 0},
+                  {"action": "point", "side": "x"},
+                  {"action": "rally", "touches": [], "point": "draw"}):
+        assert client.post(f"{url}/events", json=event).status_code == 400
+    body = client.get(f"{url}/score").get_json()
+    assert set(body["lineup"]) == {f"position_{i}" for i in range(1, 7)}
+    assert body["version"] == 0
+    ace = client.post(f"{url}/events", json={"action": "serve",
+                                             "result": "Ace"})
+    assert ace.status_code == 200
+    bad = client.post(f"{url}/start", json={"lineup": {"position_9": 1}})
+    assert bad.status_code == 400
+
+
+def test_serves_matches_scored_by_another_registry(tmp_path):
+    from broadcast import Broadcaster
+    from registry import MatchRegistry
+
+    live, hub = MatchRegistry(tmp_path), Broadcaster()
+    hub.watch(live)
+    app = create_app(tmp_path, live=live, broadcaster=hub)
+    match = app.config["STORE"].add_match({"our_team": "Hawks",
+                                           "opponent": "Owls",
+                                           "date": "2026-03-01"})
+    shared = live.open(match)
+    sub = hub.subscribe(match["id"])
+    shared.submit("streamlit", lambda e: e.point("us"))
+    score = app.test_client().get(f"/api/matches/{match['id']}/score")
+    assert score.get_json()["score_us"] == 1
+    assert sub.get(timeout=0) and '"kind":"point"' in sub.get(timeout=0)
+
+
+def test_asgi_viewer_socket_streams_deltas(client):
+    import asyncio
+
+    from app import asgi_app
+
+    pytest.importorskip("asgiref")
+    app = client.application
+    url = f"/api/matches/{client.mid}"
+    client.post(f"{url}/start")
+    incoming = [{"type": "websocket.connect"}]
+    sent = []
+
+    async def receive():
+        while not incoming:
+            await asyncio.sleep(0.01)
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+        if len(sent) == 2:  # accepted and got the snapshot
+            client.post(f"{url}/events", json={"action": "point",
+                                               "side": "us"})
+        elif len(sent) == 3:
+            incoming.append({"type": "websocket.disconnect"})
+
+    scope = {"type": "websocket", "path": f"/ws/matches/{client.mid}"}
+    asyncio.run(asyncio.wait_for(asgi_app(app)(scope, receive, send), 5))
+    assert sent[0] == {"type": "websocket.accept"}
+    assert [json.loads(m["text"])["kind"] for m in sent[1:]] == [
+        "snapshot", "point"]
+    assert app.config["BROADCASTER"].viewers(client.mid) == 0
@@ -0,0 +1,64 @@
+import pytest
+
+archive = pytest.importorskip("archive")
+pytest.importorskip("pyarrow")
+
+import pandas as pd  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+from stats import player_stats  # noqa: E402
+
+MATCH = {"id": "Hawks-2026-03-01-Owls", "our_team": "Hawks",
+         "opponent": "Owls", "date": "2026-03-01"}
+EVENTS = [
+    {"position_1": 1, "position_2": 2, "position_3": 3, "position_4": 4,
+     "position_5": 5, "position_6": 6, "rotation": 1,
+     "touch_serve": "4:Ace", "point": "us"},
+    {"position_1": 1, "position_2": 2, "position_3": 3, "position_4": 4,
+     "position_5": 5, "position_6": 6, "rotation": 2,
+     "touch_1": "2:Pass:OK", "touch_3": "5:Attack:Kill", "point": "us"},
+]
+
+
+def test_write_and_read_back(tmp_path):
+    archive.write_match(tmp_path, MATCH, EVENTS)
+    assert archive.rally_count(tmp_path, MATCH["id"]) == 2
+    events = archive.read_events(tmp_path, MATCH["id"])
+    assert events[0]["touch_serve"] == "4:Ace"
+    assert events[1]["touch_3"] == "5:Attack:Kill"
+    assert events[0]["touch_1"] is None
+    csv = archive.to_csv(tmp_path, MATCH["id"]).decode()
+    assert csv.splitlines()[0].startswith("position_1,")
+    assert "5:Attack:Kill" in csv
+
+
+def test_scan_reads_only_requested_columns(tmp_path):
+    archive.write_match(tmp_path, MATCH, EVENTS)
+    other = dict(MATCH, id="Hawks-2026-03-08-Jays", opponent="Jays")
+    archive.write_match(tmp_path, other, EVENTS[:1])
+    df = archive.scan(tmp_path, ["opponent", "rotation", "touch_serve"])
+    assert list(df.columns) == ["opponent", "rotation", "touch_serve"]
+    assert len(df) == 3
+    stats = player_stats(df)
+    assert stats.loc[4, "aces"] == 2
+
+
+def test_positions_are_interned_and_expanded(tmp_path):
+    path = archive.write_match(tmp_path, MATCH, EVENTS)
+    names = pq.read_schema(path).names
+    assert "lineup_id" in names and "position_1" not in names
+    assert archive.lineups(path).to_list() == [[1, 2, 3, 4, 5, 6]]
+    df = archive.read_match(tmp_path, MATCH["id"], ["position_3", "rotation"])
+    assert list(df.columns) == ["position_3", "rotation"]
+    assert df["position_3"].tolist() == [3, 3]
+
+
+
+def test_set_numbers_round_trip(tmp_path):
+    events = [dict(EVENTS[0], set=1), dict(EVENTS[1], set=2)]
+    archive.write_match(tmp_path, MATCH, pd.DataFrame(events))
+    assert [e["set"] for e in archive.read_events(tmp_path, MATCH["id"])] \
+        == [1, 2]
+    csv = archive.to_csv(tmp_path, MATCH["id"]).decode()
+    assert csv.splitlines()[0].endswith(",set")
+    assert archive.scan(tmp_path, ["set"])["set"].tolist() == [1, 2]
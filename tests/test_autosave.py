@@ -0,0 +1,108 @@
+import threading
+
+from autosave import Autosaver
+from roster import RosterIndex
+from storage import Store
+
+
+class CountingStore(Store):
+    def __init__(self, path):
+        super().__init__(path)
+        self.writes = []
+
+    def upsert_teams(self, teams, deleted=()):
+        self.writes.append(([t["name"] for t in teams], list(deleted)))
+        super().upsert_teams(teams, deleted)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _roster():
+    return RosterIndex([
+        {"name": "Hawks", "season": "2026", "players": []},
+        {"name": "Owls", "season": "2026", "players": []},
+    ])
+
+
+def test_flush_writes_only_dirty_teams(tmp_path):
+    store = CountingStore(tmp_path / "vstat.db")
+    roster = _roster()
+    saver = Autosaver(roster, store, delay=60, background=False)
+    for jersey in (7, 3, 5):
+        roster.add_player("Hawks", {"name": f"P{jersey}", "jersey": jersey,
+                                    "position": "Setter"})
+    assert saver.pending == 1 and store.writes == []
+
+    assert saver.flush() == 1
+    assert store.writes == [(["Hawks"], [])]
+    assert [p["jersey"] for p in store.load_teams()[0]["players"]] == [3, 5, 7]
+    assert saver.flush() == 0
+
+    roster.remove_team("Hawks")
+    saver.flush()
+    assert store.writes[-1] == ([], ["Hawks"])
+    assert store.load_teams() == []
+    saver.close()
+
+
+def test_edits_are_debounced_into_one_write(tmp_path):
+    store = CountingStore(tmp_path / "vstat.db")
+    roster = _roster()
+    clock = FakeClock()
+    saver = Autosaver(roster, store, delay=2, max_delay=10, clock=clock,
+                      background=False)
+    roster.add_player("Hawks", {"name": "A", "jersey": 1, "position": ""})
+    clock.now = 1.5
+    roster.add_player("Owls", {"name": "B", "jersey": 2, "position": ""})
+    clock.now = 3.0
+    assert saver.flush_due() == 0  # the second edit pushed it to 3.5
+    clock.now = 3.5
+    assert saver.flush_due() == 2
+    assert len(store.writes) == 1
+    assert sorted(store.writes[0][0]) == ["Hawks", "Owls"]
+
+    # Steady edits can't postpone a flush past max_delay.
+    for t in range(10, 21):
+        clock.now = float(t)
+        roster.add_player("Hawks", {"name": f"P{t}", "jersey": t,
+                                    "position": ""})
+        if t < 20:
+            assert saver.flush_due() == 0
+    assert saver.flush_due() == 1
+
+
+def test_worker_flushes_without_a_thread_per_edit(tmp_path):
+    store = CountingStore(tmp_path / "vstat.db")
+    roster = _roster()
+    saved = threading.Event()
+    store.upsert_teams = lambda teams, deleted=(): saved.set()
+    saver = Autosaver(roster, store, delay=0)
+    threads = threading.active_count()
+    with saver.paused():
+        for jersey in range(500):
+            roster.add_player("Hawks", {"name": f"P{jersey}",
+                                        "jersey": jersey, "position": ""})
+        assert threading.active_count() == threads
+        assert not saved.is_set()  # held back until the import ends
+    assert saved.is_set() and saver.saves == 1 and saver.pending == 0
+
+    saved.clear()
+    roster.add_player("Owls", {"name": "B", "jersey": 2, "position": ""})
+    assert saved.wait(5)
+    saver.close()
+
+
+def test_failed_flush_keeps_teams_dirty(tmp_path):
+    store = Store(tmp_path / "vstat.db")
+    roster = _roster()
+    saver = Autosaver(roster, store, delay=60, background=False)
+    roster.add_player("Owls", {"name": "B", "jersey": 2, "position": ""})
+    store.close()
+    assert saver.flush() == 0
+    assert saver.pending == 1 and saver.last_error is not None
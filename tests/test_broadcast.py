@@ -0,0 +1,77 @@
+import json
+
+from broadcast import Broadcaster
+from engine import MatchEngine
+
+
+def _messages(sub):
+    out = []
+    while len(sub):
+        out.append(json.loads(sub.get(timeout=0)))
+    return out
+
+
+def test_viewers_get_snapshot_then_deltas():
+    engine = MatchEngine(lineup={"position_1": 7})
+    hub = Broadcaster()
+    hub.attach("m1", engine)
+    subs = [hub.subscribe("m1") for _ in range(3)]
+    engine.record_serve("Ace")
+    engine.substitute(2, 12)
+    engine.undo()
+
+    for sub in subs:
+        snap, rally, sub_msg, undo = _messages(sub)
+        assert snap["kind"] == "snapshot" and snap["score_us"] == 0
+        assert rally == {"kind": "rally", "version": 1, "score": [1, 0],
+                         "set_number": 1, "rotation": 1, "serving": True,
+                         "point": "us"}
+        assert (sub_msg["position"], sub_msg["jersey_in"]) == (2, 12)
+        assert undo["kind"] == "undo"
+    assert hub.viewers("m1") == 3
+    assert hub.subscribe("other").get(timeout=0) == '{"kind":"snapshot"}'
+
+
+def test_slow_viewer_is_coalesced_to_a_snapshot():
+    engine = MatchEngine()
+    hub = Broadcaster(max_pending=4)
+    hub.attach("m1", engine)
+    fast, slow = hub.subscribe("m1"), hub.subscribe("m1")
+    for _ in range(10):
+        engine.point("us")
+        _messages(fast)
+
+    # Points 4 and 8 each found the queue full and reset it to a snapshot.
+    snapshot, *deltas = _messages(slow)
+    assert slow.coalesced == 2
+    assert snapshot["kind"] == "snapshot"
+    assert (snapshot["score_us"], snapshot["version"]) == (8, 8)
+    assert [(m["kind"], m["score"]) for m in deltas] == [
+        ("point", [9, 0]), ("point", [10, 0])]
+
+    hub.unsubscribe("m1", slow)
+    assert slow.get(timeout=0) is None
+    assert hub.publish("m1", {"kind": "ping"}) == 1
+
+
+def test_watch_attaches_opened_and_recovered_matches(tmp_path):
+    from registry import MatchRegistry
+
+    match = {"id": "m1", "our_team": "A", "opponent": "B",
+             "date": "2026-01-01"}
+    hub = Broadcaster()
+    registry = MatchRegistry(tmp_path)
+    hub.watch(registry)
+    shared = registry.open(dict(match))
+    sub = hub.subscribe("m1")
+    shared.submit("tab", lambda e: e.point("us"))
+    assert [m["kind"] for m in _messages(sub)] == ["snapshot", "point"]
+
+    registry.release()
+    resumed = MatchRegistry(tmp_path)
+    hub = Broadcaster()
+    hub.watch(resumed)
+    assert resumed.recover() == 1
+    sub = hub.subscribe("m1")
+    resumed.get("m1").submit("tab", lambda e: e.point("them"))
+    assert _messages(sub)[-1]["score"] == [1, 1]
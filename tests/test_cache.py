@@ -0,0 +1,32 @@
+from cache import ExportCache, LRUCache
+
+
+def test_lru_evicts_oldest_within_byte_budget():
+    cache = LRUCache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") == b"1234"  # "b" is now least recently used
+    cache.put("c", b"1234")
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.bytes == 8 and cache.evictions == 1
+    cache.put("huge", b"x" * 11)
+    assert "huge" not in cache and len(cache) == 2
+
+
+def test_export_cache_builds_once_per_version():
+    cache = ExportCache(max_bytes=1000)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return b"csv"
+
+    assert cache.payload("m1", 1, build) == b"csv"
+    assert cache.payload("m1", 1, build) == b"csv"
+    assert len(builds) == 1 and cache.hits == 1
+    assert cache.peek("m1", 2) is None
+    cache.payload("m1", 2, build)
+    assert len(builds) == 2
+    assert cache.peek("m1", 1) is None  # stale version dropped
+    cache.invalidate("m1")
+    assert len(cache) == 0
@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+from engine import MatchEngine, rally_point, serve_point
+
+LINEUP = {f"position_{i}": 10 + i for i in range(1, 7)}
+
+
+def test_engine_has_no_streamlit_dependency():
+    source = (Path(sys.modules["engine"].__file__)).read_text()
+    assert "streamlit" not in source
+
+
+def test_point_rules():
+    assert serve_point("Ace") == "us"
+    assert serve_point("Error") == "them"
+    assert serve_point("Return") is None
+    assert rally_point(["OK", "Kill", "Error"]) == "them"
+    assert rally_point(["OK", "OK", "Kill"]) == "us"
+    assert rally_point(["OK", "Over"]) is None
+
+
+def test_scoring_actions_and_undo():
+    engine = MatchEngine(lineup=LINEUP)
+    row = engine.record_serve("Ace")
+    assert row.touch_serve == "11:Ace"
+    engine.record_rally([(12, "Pass", "OK"), (13, "Set", "OK"),
+                         (14, "Attack", "Error")])
+    engine.point("us")
+    assert engine.score == (2, 1)
+    assert engine.substitute(2, 99) and not engine.substitute(2, 99)
+    # Winning the serve back rotates us into slot 2.
+    assert engine.rotation == 2 and engine.server() == 99
+    engine.end_set()
+    assert engine.score == (0, 0) and engine.state.set_scores == [(2, 1)]
+    engine.undo()
+    assert engine.score == (2, 1) and engine.state.set_number == 1
+
+
+def test_replay_matches_original():
+    engine = MatchEngine(lineup=LINEUP)
+    for _ in range(50):
+        engine.record_serve("Return")
+        engine.record_rally([(12, "Pass", "OK"), (15, "Attack", "Kill")])
+        engine.point("them")
+        engine.rotate()
+    copy = MatchEngine.replay(engine.to_records(), lineup=LINEUP)
+    assert copy.score == engine.score == (50, 50)
+    assert copy.rotation == engine.rotation
+    assert len(copy.rally_log) == 100
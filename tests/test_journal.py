@@ -0,0 +1,59 @@
+from dataclasses import asdict
+
+from models import Rally
+from journal import (Journal, MatchState, Point, RecordRally, Rotate,
+                     Substitution)
+
+
+def _row(point=None, **kw) -> dict:
+    return asdict(Rally(1, 2, 3, 4, 5, 6, rotation=1, point=point, **kw))
+
+
+def test_undo_redo_keeps_score_and_log_in_step():
+    journal = Journal()
+    journal.do(Point("us"))
+    journal.do(RecordRally(_row("them", touch_serve="1:Error")))
+    journal.do(RecordRally(_row("us", touch_3="4:Attack:Kill")))
+    state = journal.state
+    assert (state.score_us, state.score_them,
+            len(state.rally_log)) == (2, 1, 2)
+
+    journal.undo()
+    journal.undo()
+    assert (state.score_us, state.score_them,
+            len(state.rally_log)) == (1, 0, 0)
+    # Undoing the point must not drop a rally that was never there.
+    journal.undo()
+    assert state.score_us == 0 and journal.undo() is None
+
+    journal.redo()
+    journal.redo()
+    assert (state.score_us, state.score_them,
+            len(state.rally_log)) == (1, 1, 1)
+    assert state.live_stats.players[1]["serve_errors"] == 1
+
+
+def test_new_command_drops_redo_tail():
+    journal = Journal()
+    journal.do(Point("us"))
+    journal.undo()
+    journal.do(Point("them"))
+    assert not journal.can_redo
+    assert [c.kind for c in journal.commands()] == ["point"]
+    assert journal.state.score_them == 1
+
+
+def test_sub_and_rotation_revert_and_replay():
+    journal = Journal(MatchState(lineup={f"position_{i}": 10 + i
+                                         for i in range(1, 7)}))
+    journal.do(Substitution(3, 99))
+    journal.do(Rotate())
+    assert journal.state.lineup["position_3"] == 99
+    assert journal.state.rotation == 2
+    copy = Journal.replay(journal.to_records(), MatchState(
+        lineup={f"position_{i}": 10 + i for i in range(1, 7)}))
+    assert copy.state.lineup == journal.state.lineup
+    journal.undo()
+    journal.undo()
+    assert journal.state.lineup["position_3"] == 13
+    assert journal.state.rotation == 1
@@ -1,7 +1,7 @@
 import pandas as pd
 from dataclasses import asdict
 
-from VolleyStatApp.volleyStat import Rally
+from models import Rally
 
 
 def test_rallyrow_asdict_and_fields():
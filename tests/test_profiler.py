@@ -0,0 +1,31 @@
+import json
+
+from profiler import Profiler
+
+
+def test_disabled_profiler_records_nothing():
+    prof = Profiler()
+    with prof.section("tab"):
+        pass
+    assert prof.summary().empty
+
+
+def test_sections_summary_and_dump(tmp_path):
+    prof = Profiler(window=3, enabled=True)
+
+    @prof.timed("save")
+    def save():
+        return [0] * 1000
+
+    for _ in range(5):
+        save()
+    with prof.section("tab"):
+        pass
+    summary = prof.summary().set_index("section")
+    assert summary.loc["save", "n"] == 3  # rolling window
+    assert summary.loc["save", "p95_ms"] >= summary.loc["save", "p50_ms"]
+    path = tmp_path / "profile.jsonl"
+    assert prof.dump(path) == 4
+    first = json.loads(path.read_text().splitlines()[0])
+    assert set(first) == {"section", "ts", "ms", "net_blocks"}
+    assert "p50_net_blocks" in summary.columns
@@ -0,0 +1,73 @@
+import pytest
+
+from models import Rally, RALLY_COLUMNS
+from rally_log import MatchLog, RallyLog
+
+
+def _rally(n: int, **kw) -> Rally:
+    return Rally(
+        position_1=n,
+        position_2=2,
+        position_3=3,
+        position_4=4,
+        position_5=5,
+        position_6=6,
+        rotation=1,
+        **kw,
+    )
+
+
+def test_append_grows_past_capacity_and_keeps_order():
+    log = RallyLog(capacity=2)
+    for n in range(1, 11):
+        log.append(_rally(n, touch_1=f"{n}:Pass:OK"))
+    assert len(log) == 10
+    df = log.to_frame()
+    assert list(df.columns) == RALLY_COLUMNS
+    assert df["position_1"].tolist() == list(range(1, 11))
+    assert df["touch_1"].iloc[-1] == "10:Pass:OK"
+
+
+def test_frame_view_is_cached_until_next_write():
+    log = RallyLog()
+    log.append(_rally(1))
+    first = log.to_frame()
+    assert log.to_frame() is first
+    log.append(_rally(2))
+    assert log.to_frame() is not first
+    assert len(log.to_frame()) == 2
+
+
+def test_pop_and_tail():
+    log = RallyLog()
+    for n in range(1, 6):
+        log.append(_rally(n, point="us"))
+    last = log.pop()
+    assert last["position_1"] == 5 and last["point"] == "us"
+    tail = log.tail(2)
+    assert tail["position_1"].tolist() == [3, 4]
+    assert tail.index.tolist() == [2, 3]
+    while log.pop() is not None:
+        pass
+    assert log.empty and log.to_frame().empty
+
+
+def test_match_log_segments_by_set():
+    log = MatchLog()
+    for n in range(1, 4):
+        log.append(_rally(n))
+    log.new_set()
+    log.append(_rally(4))
+    assert len(log) == 4 and len(log.current) == 1
+    assert log.row(3)["position_1"] == 4 and log.row(-2)["position_1"] == 3
+    assert log.column("position_1").tolist() == [1, 2, 3, 4]
+    tail = log.tail(2)
+    assert tail["set"].tolist() == [1, 2] and tail.index.tolist() == [2, 3]
+    with pytest.raises(ValueError):
+        log.drop_set()
+    stale = log.segment(2).version
+    log.pop()
+    log.drop_set()
+    log.new_set()
+    assert log.segment(2).version > stale
+    assert log.to_frame()["set"].tolist() == [1, 1, 1]
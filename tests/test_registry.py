@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from journal import MatchState
+from registry import Conflict, MatchClosed, MatchRegistry
+from wal import JournalDirBusy
+
+MATCH = {"id": "m1", "our_team": "A", "opponent": "B", "date": "2026-01-01"}
+
+
+def test_sessions_share_one_match(tmp_path):
+    registry = MatchRegistry(tmp_path)
+    state = MatchState()
+    state.lineup["position_1"] = 9
+    serves = registry.open(dict(MATCH), state)
+    rallies = registry.open(dict(MATCH))
+    assert serves is rallies and len(registry) == 1
+
+    serves.submit("tab1", lambda e: e.record_serve("Ace"))
+    rallies.submit("tab2", lambda e: e.point("them"))
+    assert serves.snapshot["score_us"] == 1
+    assert serves.snapshot["score_them"] == 1
+    assert serves.behind("tab1") == 1 and serves.behind("tab2") == 0
+
+
+def test_checked_actions_conflict_until_seen(tmp_path):
+    shared = MatchRegistry(tmp_path).open(dict(MATCH))
+    shared.seen("tab1")
+    shared.submit("tab2", lambda e: e.point("them"))
+    with pytest.raises(Conflict) as info:
+        shared.submit("tab1", lambda e: e.undo(), check=True)
+    assert info.value.snapshot["score_them"] == 1
+    # Appends don't conflict; they also don't hide the unseen change.
+    shared.submit("tab1", lambda e: e.point("us"))
+    assert shared.behind("tab1") == 2
+    shared.seen("tab1")
+    shared.submit("tab1", lambda e: e.undo(), check=True)
+    assert shared.snapshot["score_us"] == 0
+
+
+def test_concurrent_appends_are_serialized(tmp_path):
+    shared = MatchRegistry(tmp_path).open(dict(MATCH))
+
+    def score(session):
+        for _ in range(200):
+            shared.submit(session, lambda e: e.record_serve("Return"))
+
+    threads = [threading.Thread(target=score, args=(f"s{i}",))
+               for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert shared.snapshot["rallies"] == 800
+    assert shared.snapshot["version"] == 800
+
+
+def test_recover_and_close(tmp_path):
+    registry = MatchRegistry(tmp_path)
+    registry.open(dict(MATCH)).submit("tab1", lambda e: e.point("us"))
+    with pytest.raises(JournalDirBusy):
+        MatchRegistry(tmp_path)
+    registry.release()
+
+    restarted = MatchRegistry(tmp_path)
+    assert restarted.recover() == 1
+    shared = restarted.get("m1")
+    assert shared.snapshot["score_us"] == 1
+
+    restarted.close("m1", finished=True)
+    assert "m1" not in restarted
+    with pytest.raises(MatchClosed):
+        shared.submit("tab1", lambda e: e.point("us"))
+    restarted.release()
+    assert MatchRegistry(tmp_path).recover() == 0
@@ -0,0 +1,46 @@
+from engine import MatchEngine
+from reports import REPORTS, ReportCache
+
+
+def _engine():
+    engine = MatchEngine(lineup={f"position_{i}": i for i in range(1, 7)})
+    engine.record_rally([(2, "Pass", "OK"), (1, "Set", "OK"),
+                         (4, "Attack", "Kill")])
+    engine.rotate()
+    engine.record_rally([(3, "Pass", "Over"), (4, "Attack", "Error")])
+    return engine
+
+
+def test_reports():
+    log = _engine().rally_log
+    rotation = REPORTS["Rotation efficiency"](log)
+    assert rotation.loc[1, "won"] == 1 and rotation.loc[2, "lost"] == 1
+    assert rotation.loc[2, "win_pct"] == 0
+    passing = REPORTS["Serve receive"](log)
+    assert list(passing.index) == [2, 3]
+    assert passing.loc[3, "pass_rating"] == 1.0
+
+
+def test_cache_rebuilds_only_when_rallies_change():
+    engine = _engine()
+    cache = ReportCache(max_bytes=1 << 20)
+    builds = []
+
+    def get(name="Player summary"):
+        return cache.report("m1", engine.rally_log.version, name,
+                            lambda: builds.append(name) or engine.rally_log)
+
+    first = get()
+    engine.point("us")
+    engine.rotate()
+    assert get() is first and builds == ["Player summary"]
+    get("Rotation efficiency")
+    assert cache.stats()["entries"] == 2
+
+    engine.undo()
+    engine.undo()
+    engine.undo()  # the second rally
+    summary = get()
+    assert summary is not first and summary.loc[4, "attacks"] == 1
+    assert cache.stats()["entries"] == 1  # stale reports dropped
+    assert cache.hits == 1 and cache.misses == 3
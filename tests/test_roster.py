@@ -0,0 +1,45 @@
+import pytest
+
+from roster import RosterIndex
+
+
+def _teams():
+    return [
+        {"name": "Hawks", "season": "2026", "players": [
+            {"name": "Ana", "jersey": 4, "position": "Setter"},
+            {"name": "Bea", "jersey": 9, "position": "Libero"}]},
+        {"name": "Owls", "season": "2026", "players": [
+            {"name": "Cy", "jersey": 4, "position": "Setter"}]},
+    ]
+
+
+def test_lookups():
+    roster = RosterIndex(_teams())
+    assert roster.names() == ["Hawks", "Owls"] and "Owls" in roster
+    assert roster.team("Owls")["players"][0]["name"] == "Cy"
+    assert roster.team("Eagles") is None
+    assert roster.player("Hawks", 9)["name"] == "Bea"
+    assert roster.has_jersey("Owls", "4") and not roster.has_jersey("Owls", 9)
+    assert [p["name"] for p in roster.by_position("Setter")] == ["Ana", "Cy"]
+    assert [p["name"] for p in roster.by_position("Setter", "Owls")] == ["Cy"]
+
+
+def test_edits_keep_index_in_step():
+    roster = RosterIndex(_teams())
+    roster.add_player("Owls", {"name": "Di", "jersey": "2",
+                               "position": "Libero"})
+    with pytest.raises(ValueError):
+        roster.add_player("Owls", {"name": "Ed", "jersey": 2,
+                                   "position": "Middle"})
+    with pytest.raises(ValueError):
+        roster.add_team({"name": "Owls", "season": "", "players": []})
+    assert [p["jersey"] for p in roster.team("Owls")["players"]] == [2, 4]
+
+    assert roster.remove_player("Hawks", 9)["name"] == "Bea"
+    assert roster.remove_player("Hawks", 9) is None
+    assert [p["name"] for p in roster.by_position("Libero")] == ["Di"]
+
+    roster.remove_team("Owls")
+    assert roster.names() == ["Hawks"] and len(roster.teams) == 1
+    assert roster.player("Owls", 2) is None
+    assert roster.by_position("Libero") == []
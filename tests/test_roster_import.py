@@ -0,0 +1,44 @@
+import io
+import json
+
+from roster import RosterIndex
+from roster_import import import_rows, read_rows
+
+CSV = b"""\xef\xbb\xbfTeam,Season,Name,Jersey,Position
+Hawks,2026,Ana,4,setter
+Hawks,2026,Bea,4,Libero
+Owls,2026,Cy,x,Middle
+,2026,Di,7,Middle
+Owls,2026,Ed,12,
+Owls,2026,Flo,13,Goalie
+"""
+
+
+def test_csv_import_reports_bad_rows():
+    roster = RosterIndex([{"name": "Owls", "season": "2025", "players": [
+        {"name": "Gus", "jersey": 1, "position": "Outside"}]}])
+    report = import_rows(roster, read_rows(io.BytesIO(CSV), "league.csv"))
+    assert (report.teams_added, report.players_added) == (1, 2)
+    assert [line for line, _ in report.errors] == [3, 4, 5, 7]
+    assert "already on Hawks" in report.errors[0][1]
+    assert sorted(report.touched) == ["Hawks", "Owls"]
+    assert roster.player("Hawks", 4)["position"] == "Setter"
+    assert roster.player("Owls", 12)["position"] == "Utility"
+    assert len(roster.team("Owls")["players"]) == 2
+
+
+def test_jsonl_import_accepts_teams_and_players():
+    lines = [
+        json.dumps({"name": "Hawks", "season": "2026", "players": [
+            {"name": "Ana", "jersey": 4, "position": "Setter"}]}),
+        "",
+        json.dumps({"team": "Hawks", "name": "Bea", "jersey": 9}),
+        "{not json",
+        json.dumps({"name": "Empty", "season": "2026", "players": []}),
+    ]
+    stream = io.BytesIO("\n".join(lines).encode("utf-8"))
+    roster = RosterIndex()
+    report = import_rows(roster, read_rows(stream, "league.jsonl"))
+    assert roster.names() == ["Hawks", "Empty"]
+    assert report.players_added == 2
+    assert [line for line, _ in report.errors] == [4]
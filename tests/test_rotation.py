@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from engine import MatchEngine
+from models import Rally
+from rally_log import RallyLog
+from rotation import (BACK_ROW, FRONT_ROW, SERVER_SLOT, court, is_front_row,
+                      next_rotation, server_slot, zone_of)
+
+LINEUP = {f"position_{i}": 10 + i for i in range(1, 7)}
+
+
+def test_tables_cover_every_rotation():
+    assert SERVER_SLOT.tolist() == [1, 2, 3, 4, 5, 6]
+    assert FRONT_ROW[0] == (4, 3, 2) and BACK_ROW[0] == (5, 6, 1)
+    assert FRONT_ROW[1] == (5, 4, 3)
+    for r in range(1, 7):
+        assert sorted(FRONT_ROW[r - 1] + BACK_ROW[r - 1]) == [1, 2, 3, 4, 5, 6]
+        assert zone_of(server_slot(r), r) == 1
+        assert not is_front_row(server_slot(r), r)
+    assert next_rotation(6) == 1 and next_rotation(1, -1) == 6
+    assert court(LINEUP, 2)[1] == 12
+
+
+def test_side_out_rotates_and_undoes():
+    engine = MatchEngine(lineup=LINEUP)
+    engine.point("us")
+    assert engine.rotation == 1 and engine.state.serving
+    engine.record_serve("Error")
+    assert not engine.state.serving and engine.rotation == 1
+    engine.point("us")
+    assert engine.rotation == 2 and engine.server() == 12
+    engine.undo()
+    assert engine.rotation == 1 and not engine.state.serving
+    engine.set_serving(True)
+    engine.point("us")
+    assert engine.rotation == 1
+
+
+def test_libero_goes_off_at_the_front_row():
+    engine = MatchEngine(lineup=LINEUP)
+    with pytest.raises(ValueError):
+        engine.libero_in(2, jersey=1)
+    assert engine.can_undo is False
+    engine.libero_in(6, jersey=1)
+    assert engine.lineup["position_6"] == 1
+    engine.substitute(6, 20)
+    assert engine.state.libero_for == 20 and engine.state.subs == 1
+    engine.rotate()
+    assert engine.lineup["position_6"] == 1
+    engine.rotate()  # slot 6 reaches zone 4
+    assert engine.lineup["position_6"] == 20
+    assert engine.state.libero_slot is None
+    engine.undo()
+    assert engine.lineup["position_6"] == 1 and engine.state.libero_slot == 6
+    engine.end_set()
+    assert engine.state.subs == 0
+    engine.undo()
+    assert engine.state.subs == 1
+
+
+def test_replay_restores_side_out_and_libero_state():
+    engine = MatchEngine(lineup=LINEUP)
+    engine.libero_in(6, jersey=1)
+    for _ in range(20):
+        engine.point("them")
+        engine.record_rally([(12, "Pass", "OK"), (13, "Attack", "Kill")])
+    assert all("_undo" not in r for r in engine.to_records())
+    copy = MatchEngine.replay(engine.to_records(), lineup=LINEUP)
+    assert copy.snapshot() == engine.snapshot()
+    while copy.can_undo:
+        copy.undo()
+    assert copy.lineup == LINEUP and copy.rotation == 1
+
+
+def test_rally_log_stores_lineup_ids():
+    log = RallyLog()
+    for n in range(10):
+        lineup = dict(LINEUP, position_1=99) if n % 2 else LINEUP
+        log.append(Rally(**lineup, rotation=1, point="us"))
+    assert len(log.lineups) == 2
+    assert log.column("lineup_id").tolist() == [0, 1] * 5
+    assert log.column("position_1").tolist() == [11, 99] * 5
+    assert log.row(1)["position_1"] == 99 and log.lineup(0) == LINEUP
+    frame = log.to_frame()
+    assert np.array_equal(frame["position_2"].to_numpy(), [12] * 10)
@@ -0,0 +1,39 @@
+import pytest
+
+from schedule import ScheduleIndex
+
+
+def _match(i, team="Hawks", day=None):
+    return {"id": f"m{i}", "our_team": team, "opponent": f"Opp{i}",
+            "date": day or f"2026-03-{i:02d}"}
+
+
+def test_queries_are_date_ordered():
+    schedule = ScheduleIndex([_match(5), _match(1, "Owls"), _match(3),
+                              _match(2), _match(4, "Owls")])
+    assert [m["id"] for m in schedule] == ["m1", "m2", "m3", "m4", "m5"]
+    assert [m["id"] for m in schedule.next(2, "2026-03-03")] == ["m3", "m4"]
+    assert [m["id"] for m in schedule.between("2026-03-02", "2026-03-04",
+                                              team="Hawks")] == ["m2", "m3"]
+    assert schedule.count(team="Owls") == 2 and schedule.teams() == [
+        "Hawks", "Owls"]
+
+    rows, total = schedule.page(1, 2)
+    assert [m["id"] for m in rows] == ["m3", "m4"] and total == 5
+    rows, total = schedule.page(2, 2, team="Hawks")
+    assert rows == [] and total == 3
+
+
+def test_ids_are_stable_across_edits():
+    schedule = ScheduleIndex()
+    schedule.add({"our_team": "Hawks", "opponent": "Owls",
+                  "date": "2026-04-01"})
+    schedule.add(_match(1, day="2026-04-01"))
+    assert "Hawks-2026-04-01-Owls" in schedule
+    with pytest.raises(ValueError):
+        schedule.add(_match(1))
+
+    assert schedule.remove("m1")["opponent"] == "Opp1"
+    assert schedule.remove("m1") is None
+    assert [m["id"] for m in schedule] == ["Hawks-2026-04-01-Owls"]
+    assert schedule.count(team="Hawks") == 1
@@ -0,0 +1,70 @@
+import pytest
+
+from engine import MatchEngine
+from sets import SetRules
+
+MATCH = {"id": "m1", "our_team": "A", "opponent": "B", "date": "2026-01-01",
+         "set_format": "Best of 3", "points_to_win": 25,
+         "last_set_points": 15}
+
+
+def _win_set(engine: MatchEngine, side: str = "us") -> None:
+    set_number = engine.state.set_number
+    while engine.state.set_number == set_number:
+        engine.point(side)
+
+
+def test_rules_from_match():
+    rules = SetRules.from_match(MATCH)
+    assert (rules.sets, rules.sets_to_win, rules.play_all) == (3, 2, False)
+    assert rules.target(1) == 25 and rules.target(3) == 15
+    assert rules.set_winner(1, 25, 23) == "us"
+    assert rules.set_winner(1, 25, 24) is None
+    assert rules.set_winner(1, 26, 28) == "them"
+    assert rules.set_winner(3, 15, 10) == "us"
+    assert rules.match_winner([(25, 20), (25, 20)]) == "us"
+    always = SetRules.from_match(dict(MATCH, set_format="Always Play 3"))
+    assert always.match_winner([(25, 20), (25, 20)]) is None
+    assert always.match_winner([(25, 20), (25, 20), (10, 15)]) == "us"
+    assert SetRules.from_match(None) == SetRules()
+
+
+def test_winning_point_ends_the_set_and_undo_reopens_it():
+    engine = MatchEngine(MATCH)
+    for _ in range(24):
+        engine.point("us")
+    engine.point("them")
+    engine.point("us")
+    assert engine.state.set_scores == [(25, 1)]
+    assert engine.score == (0, 0) and engine.state.set_number == 2
+    engine.undo()
+    assert engine.score == (24, 1) and engine.state.set_number == 1
+    assert len(engine.rally_log.sets) == 1
+    engine.redo()
+    assert engine.state.set_scores == [(25, 1)]
+
+
+def test_match_ends_and_refuses_more_points():
+    engine = MatchEngine(MATCH)
+    _win_set(engine, "us")
+    _win_set(engine, "them")
+    assert engine.set_target() == 15
+    _win_set(engine, "us")
+    assert engine.state.set_scores[-1] == (15, 0)
+    assert engine.winner == "us" and engine.snapshot()["winner"] == "us"
+    with pytest.raises(ValueError):
+        engine.point("us")
+
+
+def test_rallies_are_partitioned_per_set():
+    engine = MatchEngine(MATCH)
+    engine.record_serve("Return")
+    _win_set(engine)
+    row = engine.record_serve("Ace")
+    log = engine.rally_log
+    assert [len(s) for s in log.sets] == [1, 1]
+    assert log.to_frame(2)["touch_serve"].tolist() == [row.touch_serve]
+    assert log.to_frame()["set"].tolist() == [1, 2]
+    first = log.segment(1).version
+    engine.undo()
+    assert log.segment(1).version == first and len(log.sets[1]) == 0
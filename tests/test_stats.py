@@ -0,0 +1,90 @@
+import numpy as np
+
+from models import Rally
+from rally_log import MatchLog, RallyLog
+import stats as stats_module
+from stats import LiveStats, player_stats, STAT_COLUMNS
+
+
+def _log() -> RallyLog:
+    log = RallyLog()
+    base = dict(position_1=1, position_2=2, position_3=3,
+                position_4=4, position_5=5, position_6=6)
+    log.append(Rally(**base, rotation=1, touch_serve="1:Ace", point="us"))
+    log.append(Rally(**base, rotation=1, touch_serve="1:Error", point="them"))
+    log.append(Rally(**base, rotation=2,
+                     touch_1="2:Pass:OK", touch_2="3:Set:OK",
+                     touch_3="4:Attack:Kill", point="us"))
+    log.append(Rally(**base, rotation=2,
+                     touch_1="2:Pass:Over", touch_2="3:Set:OK",
+                     touch_3="4:Attack:Error", point="them"))
+    log.append(Rally(**base, rotation=2, touch_block="5:Kill",
+                     touch_block_asst="6:OK", point="us"))
+    return log
+
+
+def test_player_stats_counts():
+    stats = player_stats(_log())
+    assert list(stats.columns) == STAT_COLUMNS
+    assert stats.loc[1, "aces"] == 1 and stats.loc[1, "serve_errors"] == 1
+    assert stats.loc[4, "kills"] == 1 and stats.loc[4, "attacks"] == 2
+    assert stats.loc[4, "attack_eff"] == 0.0
+    assert stats.loc[2, "pass_rating"] == 1.5
+    assert stats.loc[5, "blocks"] == 1 and stats.loc[6, "block_assists"] == 1
+
+
+def test_attack_eff_ignores_non_attack_kills():
+    stats = player_stats([{"touch_1": "4:Set:Kill", "touch_2": "4:Pass:Kill",
+                           "touch_3": "4:Attack:OK"}])
+    assert stats.loc[4, "kills"] == 2 and stats.loc[4, "attack_kills"] == 0
+    assert stats.loc[4, "attack_eff"] == 0.0
+
+
+def test_player_stats_by_rotation_from_records():
+    records = _log().to_records() + [{"point": "us"}]
+    stats = player_stats(records, by=["rotation"])
+    assert stats.loc[(1, 1), "serves"] == 2
+    assert stats.loc[(4, 2), "attack_errors"] == 1
+
+
+def test_season_sized_log_is_vectorized(monkeypatch):
+    rows = _log().to_records() * 20000
+    log = RallyLog.from_records(rows)
+
+    def per_touch(*args):
+        raise AssertionError("decoded a touch in Python")
+
+    # The batch path must stay on whole columns, never one touch at a time.
+    monkeypatch.setattr(stats_module, "encode_touch", per_touch)
+    monkeypatch.setattr(stats_module, "unpack", per_touch)
+    monkeypatch.setattr(stats_module, "encode_column", per_touch)
+    stats = player_stats(log, by=["rotation"])
+    assert stats.loc[(4, 2), "kills"] == 20000
+    assert np.isclose(stats.loc[(2, 2), "pass_rating"], 1.5)
+
+
+def test_live_stats_add_and_remove_match_batch_stats():
+    live = LiveStats()
+    rows = _log().to_records()
+    for row in rows:
+        live.add(row)
+    batch = player_stats(rows)
+    frame = live.player_frame()
+    for col in ["kills", "attack_kills", "errors", "aces", "serve_errors",
+                "blocks"]:
+        assert frame[col].tolist() == batch[col].tolist()
+    assert live.rotations[2]["points_us"] == 2
+    live.remove(rows[-1])
+    assert live.players[5]["blocks"] == 0
+    assert live.rotations[2]["points_us"] == 1
+
+
+def test_player_stats_by_set():
+    log = MatchLog()
+    rallies = _log().to_records()
+    log.extend(rallies[:2])
+    log.new_set()
+    log.extend(rallies[2:])
+    stats = player_stats(log, by=["set"])
+    assert stats.loc[(1, 1), "aces"] == 1
+    assert stats.loc[(4, 2), "kills"] == 1
@@ -0,0 +1,72 @@
+import json
+
+from storage import Store
+
+TEAM = {"name": "Hawks", "season": "2026",
+        "players": [{"name": "Ana", "jersey": 4, "position": "Setter"}]}
+
+
+def test_team_round_trip_and_single_player_updates(tmp_path):
+    store = Store(tmp_path / "v.db")
+    store.upsert_team(TEAM)
+    store.add_player("Hawks", {"name": "Bo", "jersey": 9,
+                               "position": "Middle"})
+    store.remove_player("Hawks", 4)
+    teams = store.load_teams()
+    assert [t["name"] for t in teams] == ["Hawks"]
+    assert [p["jersey"] for p in teams[0]["players"]] == [9]
+
+
+def test_matches_get_unique_ids_and_archive_keeps_rallies(tmp_path):
+    store = Store(tmp_path / "v.db")
+    m1 = store.add_match({"our_team": "Hawks", "opponent": "Owls",
+                          "date": "2026-03-01"})
+    m2 = store.add_match({"our_team": "Hawks", "opponent": "Owls",
+                          "date": "2026-03-01"})
+    assert m1["id"] != m2["id"]
+    events = [{"position_1": 1, "rotation": 1, "touch_serve": "4:Ace",
+               "point": "us"}]
+    store.archive_match(m1, events)
+    store.archive_match(m1)
+    assert [m["id"] for m in store.load_matches()] == [m2["id"]]
+    archived = store.load_archived()
+    assert archived[0]["events"][0]["touch_serve"] == "4:Ace"
+
+
+def test_json_migration_runs_once(tmp_path):
+    teams_file = tmp_path / "teams.json"
+    schedule_file = tmp_path / "schedule.json"
+    teams_file.write_text(json.dumps([TEAM]))
+    schedule_file.write_text(json.dumps([
+        {"our_team": "Hawks", "opponent": "Owls", "date": "2026-03-01"}]))
+    store = Store(tmp_path / "v.db")
+    assert store.migrate_json(teams_file, schedule_file)
+    assert not store.migrate_json(teams_file, schedule_file)
+    assert len(store.load_teams()) == 1
+    assert len(store.load_matches()) == 1
+
+
+def test_rallies_share_interned_lineups(tmp_path):
+    store = Store(tmp_path / "v.db")
+    match = store.add_match({"our_team": "Hawks", "opponent": "Owls",
+                             "date": "2026-03-01"})
+    lineup = {f"position_{i}": i for i in range(1, 7)}
+    events = [dict(lineup, rotation=r, point="us") for r in range(1, 7)]
+    events.append(dict(lineup, position_2=20, rotation=1, point="them"))
+    store.archive_match(match, events)
+    assert len(store.load_lineups(match["id"])) == 2
+    rallies = store.load_rallies(match["id"])
+    assert [r["position_2"] for r in rallies] == [2] * 6 + [20]
+    rows = store.scan_rallies(["position_2", "rotation"], {"rotation": [1]})
+    assert rows == [(2, 1), (20, 1)]
+
+
+def test_set_numbers_round_trip(tmp_path):
+    store = Store(tmp_path / "v.db")
+    match = store.add_match({"our_team": "Hawks", "opponent": "Owls",
+                             "date": "2026-03-01"})
+    events = [{"position_1": 1, "rotation": 1, "point": "us", "set": s}
+              for s in (1, 1, 2, 3)]
+    store.archive_match(match, events)
+    assert [r["set"] for r in store.load_rallies(match["id"])] == [1, 1, 2, 3]
+    assert store.scan_rallies(["set"], {"set": [2, 3]}) == [(2,), (3,)]
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from touches import (TouchType, TouchResult, NO_TOUCH, encode_touch,
+                     decode_touch, encode_column, decode_frame, encode_frame,
+                     jerseys, types, results)
+from rally_log import RallyLog
+from models import Rally
+
+
+def test_touch_round_trip():
+    code = encode_touch("10:Pass:OK")
+    assert decode_touch(code) == "10:Pass:OK"
+    serve = encode_touch("7:Ace", TouchType.SERVE)
+    assert decode_touch(serve, TouchType.SERVE) == "7:Ace"
+    assert encode_touch(None) == NO_TOUCH
+    assert encode_touch(float("nan")) == NO_TOUCH
+    assert decode_touch(NO_TOUCH) is None
+
+
+def test_column_unpacking_is_vectorized():
+    codes = encode_column(["10:Attack:Kill", None, "4:Dig:Error"])
+    assert codes.dtype == np.int32
+    assert jerseys(codes).tolist() == [10, 0, 4]
+    assert types(codes).tolist() == [TouchType.ATTACK, 0, TouchType.DIG]
+    assert results(codes).tolist() == [TouchResult.KILL, 0, TouchResult.ERROR]
+
+
+def test_csv_frames_round_trip():
+    df = pd.DataFrame({
+        "touch_serve": ["3:Ace", None],
+        "touch_1": [None, "10:Pass:OK"],
+    })
+    back = decode_frame(encode_frame(df))
+    assert back["touch_serve"].tolist() == ["3:Ace", None]
+    assert back["touch_1"].tolist() == [None, "10:Pass:OK"]
+
+
+def test_rally_log_stores_codes():
+    log = RallyLog()
+    log.append(Rally(1, 2, 3, 4, 5, 6, rotation=1,
+                     touch_3="12:Attack:Kill"))
+    assert log.column("touch_3").dtype == np.int32
+    assert log.row(0)["touch_3"] == "12:Attack:Kill"
+    assert log.to_frame()["touch_3"].iloc[0] == "12:Attack:Kill"
@@ -0,0 +1,81 @@
+from dataclasses import asdict
+
+from models import Rally
+from journal import MatchState, Point, RecordRally, Substitution
+import wal
+
+MATCH = {"our_team": "Hawks", "opponent": "Owls", "date": "2026-03-01"}
+
+
+def test_journal_is_replayed_after_crash(tmp_path):
+    journal, match_wal = wal.open_match(tmp_path, MATCH, MatchState())
+    journal.do(Point("us"))
+    journal.do(RecordRally(asdict(Rally(1, 2, 3, 4, 5, 6, rotation=1,
+                                        touch_serve="1:Ace", point="us"))))
+    journal.do(Substitution(2, 20))
+    journal.undo()
+    # Simulate a crash: a half-written line and no close().
+    match_wal._file.write('{"kind":"poi')
+    match_wal._file.flush()
+
+    assert wal.unfinished(tmp_path) == [match_wal.path]
+    match, recovered, finished = wal.load(match_wal.path)
+    assert match == MATCH and not finished
+    assert recovered.state.score_us == 2
+    assert len(recovered.state.rally_log) == 1
+    assert recovered.state.lineup["position_2"] == 2
+    assert recovered.can_redo
+
+
+def test_finished_match_is_not_recovered(tmp_path):
+    journal, match_wal = wal.open_match(tmp_path, MATCH, MatchState())
+    journal.do(Point("them"))
+    match_wal.finish()
+    assert wal.unfinished(tmp_path) == []
+    _, recovered, finished = wal.load(match_wal.path)
+    assert finished and recovered.state.score_them == 1
+
+
+def test_reopening_resumes_and_appends_only(tmp_path):
+    journal, match_wal = wal.open_match(tmp_path, MATCH, MatchState(),)
+    journal.do(Point("us"))
+    match_wal.close()
+    size = match_wal.path.stat().st_size
+    journal, match_wal = wal.open_match(tmp_path, MATCH, MatchState())
+    assert journal.state.score_us == 1
+    journal.do(Point("us"))
+    match_wal.close()
+    lines = match_wal.path.read_text().splitlines()
+    assert len(lines) == 3
+    assert match_wal.path.stat().st_size - size == len(lines[-1]) + 1
+
+
+def test_rally_records_leave_out_the_lineup_on_court(tmp_path):
+    journal, match_wal = wal.open_match(tmp_path, MATCH, MatchState())
+    journal.do(RecordRally(asdict(Rally(1, 2, 3, 4, 5, 6, rotation=1,
+                                        point="us"))))
+    journal.do(RecordRally(asdict(Rally(1, 9, 3, 4, 5, 6, rotation=1,
+                                        point="us"))))
+    match_wal.close()
+    records = wal.read_records(match_wal.path)
+    assert "position_1" not in records[1]["row"]
+    assert records[2]["row"]["position_2"] == 9
+    _, recovered, _ = wal.load(match_wal.path)
+    log = recovered.state.rally_log
+    assert log.row(0)["position_2"] == 2 and log.row(1)["position_2"] == 9
+
+
+def test_appends_after_recovery_survive_the_next_restart(tmp_path):
+    journal, match_wal = wal.open_match(tmp_path, MATCH, MatchState())
+    journal.do(Point("us"))
+    match_wal._file.write('{"kind":"poi')
+    match_wal._file.flush()
+
+    journal, match_wal = wal.open_match(tmp_path, MATCH, MatchState())
+    assert journal.state.score_us == 1
+    journal.do(Point("us"))
+    journal.do(Point("them"))
+    match_wal.close()
+
+    _, recovered, _ = wal.load(match_wal.path)
+    assert (recovered.state.score_us, recovered.state.score_them) == (2, 1)